@@ -0,0 +1,227 @@
+"""
+Offline video analysis: scores recorded exercise videos with the same pose
+settings and exercise processors the live server uses.
+
+    python analyze_videos.py SQUATS recordings/ --out results/ --jobs 4
+
+For each video, per-frame feedback goes to <name>.frames.<fmt> and one row
+per completed rep goes to <name>.reps.<fmt> (fmt is jsonl or parquet).
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2 as cv
+import mediapipe as mp
+
+from exercises import EXERCISES, get_exercise, landmark_filter
+from landmark_filter import DEFAULT_FILTER, FILTERS
+from landmarks import landmarks_to_array
+from landmark_store import LandmarkWriter
+from pose_pool import DEFAULT_POSE_KWARGS
+
+VIDEO_EXTENSIONS = {'.mp4', '.mov', '.avi', '.mkv', '.webm', '.m4v'}
+
+# Live clients resize to 480px wide before sending, so score at the same size
+DEFAULT_WIDTH = 480
+DEFAULT_CHUNK_SIZE = 32
+
+
+# =====================================================================
+# --- Streaming Decode ---
+# =====================================================================
+def read_chunks(path, chunk_size, width, chunks):
+    """
+    Decoder thread: reads the video in chunks of frames so decoding overlaps
+    with inference instead of alternating with it. Puts None when finished.
+    """
+    cap = cv.VideoCapture(path)
+    fps = cap.get(cv.CAP_PROP_FPS) or 30.0
+    index = 0
+    try:
+        while True:
+            chunk = []
+            while len(chunk) < chunk_size:
+                ok, img_bgr = cap.read()
+                if not ok:
+                    break
+                if width and img_bgr.shape[1] > width:
+                    height = round(img_bgr.shape[0] * width / img_bgr.shape[1])
+                    img_bgr = cv.resize(img_bgr, (width, height), interpolation=cv.INTER_AREA)
+                chunk.append((index, index / fps, img_bgr))
+                index += 1
+            if chunk:
+                chunks.put(chunk)
+            if len(chunk) < chunk_size:
+                break
+    finally:
+        cap.release()
+        chunks.put(None)
+
+
+# =====================================================================
+# --- Per-video Analysis ---
+# =====================================================================
+def analyze_video(path, exercise_name, chunk_size=DEFAULT_CHUNK_SIZE, width=DEFAULT_WIDTH,
+                  landmark_writer=None, smoothing=DEFAULT_FILTER):
+    """
+    Runs pose + the exercise processor over one video.
+    Returns (frame_rows, rep_rows).
+    """
+    frame_processor, state = get_exercise(exercise_name)
+    if frame_processor is None:
+        raise ValueError(f"Unknown exercise: {exercise_name}")
+    smoother = landmark_filter(exercise_name, smoothing)
+
+    chunks = queue.Queue(maxsize=4)
+    reader = threading.Thread(target=read_chunks, args=(path, chunk_size, width, chunks), daemon=True)
+    reader.start()
+
+    frame_rows = []
+    rep_rows = []
+    last_reps = 0
+    rep_start = (0, 0.0)
+    rep_errors = []
+
+    with mp.solutions.pose.Pose(**DEFAULT_POSE_KWARGS) as pose:
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                break
+
+            for index, timestamp, img_bgr in chunk:
+                imgRGB = cv.cvtColor(img_bgr, cv.COLOR_BGR2RGB)
+                results = pose.process(imgRGB)
+                landmarks = landmarks_to_array(results.pose_landmarks)
+                if landmark_writer:
+                    landmark_writer.append(index, timestamp, landmarks)
+
+                # Video time drives the timers (plank hold, curl tempo) and the smoothing
+                if smoother:
+                    landmarks = smoother(landmarks, timestamp)
+                feedback, state = frame_processor(landmarks, state, now=timestamp)
+                frame_rows.append({'frame': index, 't': round(timestamp, 3), **feedback})
+
+                if feedback['error'] and feedback['error'] not in rep_errors:
+                    rep_errors.append(feedback['error'])
+
+                # --- Rep Summaries (plank reports seconds held, not reps) ---
+                if exercise_name != "PLANK" and feedback['reps'] > last_reps:
+                    rep_rows.append({
+                        'rep': feedback['reps'],
+                        'start_frame': rep_start[0],
+                        'end_frame': index,
+                        'start_t': round(rep_start[1], 3),
+                        'end_t': round(timestamp, 3),
+                        'perfect_rep': feedback['perfect_rep'],
+                        'errors': rep_errors,
+                    })
+                    last_reps = feedback['reps']
+                    rep_start = (index + 1, timestamp)
+                    rep_errors = []
+
+    reader.join()
+    return frame_rows, rep_rows
+
+
+# =====================================================================
+# --- Output ---
+# =====================================================================
+def write_rows(rows, path, fmt):
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise SystemExit("Parquet output needs pyarrow (pip install pyarrow)")
+        pq.write_table(pa.Table.from_pylist(rows), path)
+        return
+
+    with open(path, "w") as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+
+
+def process_file(path, exercise_name, out_dir, fmt, chunk_size, width, landmarks_dir=None,
+                 smoothing=DEFAULT_FILTER):
+    """Worker-process entry point: analyzes one video and writes its outputs."""
+    start = time.time()
+    stem = os.path.splitext(os.path.basename(path))[0]
+
+    landmark_writer = LandmarkWriter(landmarks_dir, stem, exercise_name) if landmarks_dir else None
+    try:
+        frame_rows, rep_rows = analyze_video(path, exercise_name, chunk_size, width, landmark_writer, smoothing)
+    finally:
+        if landmark_writer:
+            landmark_writer.close()
+
+    write_rows(frame_rows, os.path.join(out_dir, f"{stem}.frames.{fmt}"), fmt)
+    write_rows(rep_rows, os.path.join(out_dir, f"{stem}.reps.{fmt}"), fmt)
+
+    return path, len(frame_rows), len(rep_rows), time.time() - start
+
+
+def collect_videos(paths):
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if os.path.splitext(name)[1].lower() in VIDEO_EXTENSIONS:
+                    videos.append(os.path.join(path, name))
+        else:
+            videos.append(path)
+    return videos
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score recorded exercise videos offline.")
+    parser.add_argument("exercise", help=f"One of: {', '.join(EXERCISES)}")
+    parser.add_argument("paths", nargs="+", help="Video files and/or directories of videos")
+    parser.add_argument("--out", default="analysis", help="Output directory")
+    parser.add_argument("--format", choices=["jsonl", "parquet"], default="jsonl")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1, help="Videos analyzed in parallel")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="Frames decoded per chunk")
+    parser.add_argument("--width", type=int, default=DEFAULT_WIDTH, help="Resize frames to this width (0 keeps size)")
+    parser.add_argument("--landmarks-dir", help="Also store landmarks here for rescore.py")
+    parser.add_argument("--smoothing", choices=[*FILTERS, "none"], default=DEFAULT_FILTER,
+                        help="Landmark filter, as the server's LANDMARK_FILTER")
+    args = parser.parse_args()
+
+    exercise_name = args.exercise.upper().strip()
+    if exercise_name not in EXERCISES:
+        parser.error(f"Unknown exercise: {args.exercise}")
+
+    videos = collect_videos(args.paths)
+    if not videos:
+        parser.error("No videos found")
+    # Outputs (and stored landmarks) are named after the file stem, so it must be unique
+    stems = {}
+    for path in videos:
+        stems.setdefault(os.path.splitext(os.path.basename(path))[0], []).append(path)
+    clashes = [paths for paths in stems.values() if len(paths) > 1]
+    if clashes:
+        parser.error("Videos with the same name would overwrite each other's outputs: "
+                     + "; ".join(", ".join(paths) for paths in clashes))
+    os.makedirs(args.out, exist_ok=True)
+
+    print(f"Analyzing {len(videos)} video(s) as {exercise_name} with {args.jobs} job(s)")
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        futures = {
+            pool.submit(process_file, path, exercise_name, args.out, args.format,
+                        args.chunk_size, args.width, args.landmarks_dir, args.smoothing): path
+            for path in videos
+        }
+        for future in as_completed(futures):
+            try:
+                path, frames, reps, elapsed = future.result()
+                print(f"{path}: {frames} frames, {reps} reps in {elapsed:.1f}s ({frames / max(elapsed, 1e-6):.0f} fps)")
+            except Exception as e:
+                print(f"{futures[future]}: failed: {e}")
+
+
+if __name__ == "__main__":
+    main()
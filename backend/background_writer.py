@@ -0,0 +1,63 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# =====================================================================
+# --- Background File Writer ---
+# =====================================================================
+# Per-frame records (recorded JPEGs, stored landmarks) are buffered in
+# memory and appended by a background thread every FLUSH_INTERVAL seconds,
+# so the event loop never waits on disk (the scheme session_store.py uses
+# for checkpoints).
+FLUSH_INTERVAL = 1.0
+
+
+class BackgroundWriter:
+    """Appends records to a set of open binary files from a background thread."""
+
+    def __init__(self, files, name="background-writer", flush_interval=FLUSH_INTERVAL):
+        self.files = files
+        self.flush_interval = flush_interval
+
+        self._pending = []  # one tuple of chunks (one per file) per record
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+
+        self._writer = threading.Thread(target=self._run, name=name, daemon=True)
+        self._writer.start()
+
+    def write(self, *chunks):
+        """Queues one record: a bytes chunk for each file, in order."""
+        with self._lock:
+            self._pending.append(chunks)
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        try:
+            for i, f in enumerate(self.files):
+                f.write(b"".join(record[i] for record in pending))
+                f.flush()
+        except OSError as e:
+            logger.error("Write to %s failed (%d records): %s", self.files[0].name, len(pending), e)
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self.flush()
+
+    def close(self):
+        """
+        Writes what is still buffered and closes the files.
+        Blocks on disk; call it from a thread, not the event loop.
+        """
+        self._closed = True
+        self._wakeup.set()
+        self._writer.join()
+        self.flush()
+        for f in self.files:
+            f.close()
@@ -0,0 +1,89 @@
+import numpy as np
+
+from utils import AngleEngine
+from landmarks import (
+    LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE,
+    RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST, RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE,
+    VISIBILITY,
+)
+
+# =====================================================================
+# --- Exercise Recognition ---
+# =====================================================================
+# Four numbers per frame, from the better-visible side of the body:
+#   upright   torso direction, 1 = vertical (standing), 0 = horizontal (floor)
+#   elbow     elbow angle, degrees
+#   knee      knee angle, degrees (180 when the legs are out of view)
+#   overhead  wrist height above the shoulder, in torso lengths
+# kept in a ring buffer over the last WINDOW frames. The exercise is read
+# off the spread of each feature across the window (10th to 90th percentile):
+# reps show up as a joint swinging through a wide range, holds don't.
+WINDOW = 45            # frames, ~3 s at 15 fps
+MIN_FRAMES = 15        # frames with a visible torso before any guess
+VIS_THRESHOLD = 0.5
+UPRIGHT_MIN = 0.5      # median torso direction below this = on the floor
+ELBOW_RANGE_MIN = 40   # degrees of elbow travel that make reps
+KNEE_RANGE_MIN = 40    # degrees of knee travel that make squats
+OVERHEAD_MIN = 0.3     # wrists this far above the shoulders = pressing
+
+UPRIGHT, ELBOW, KNEE, OVERHEAD = range(4)
+
+# Per side: shoulder, elbow, wrist, hip, knee, ankle
+_SIDES = (
+    (LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE),
+    (RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST, RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE),
+)
+
+
+class ExerciseClassifier:
+    """
+    Streaming guess of which supported exercise is being performed. Costs
+    one small angle pass and one sort of a (WINDOW, 4) array per frame;
+    `update` returns the exercise name, or None while unsure.
+    """
+
+    def __init__(self, window=WINDOW):
+        self._features = np.zeros((window, 4), dtype=np.float32)
+        self._count = 0
+        self._engines = [AngleEngine([(s, e, w), (h, k, a)]) for s, e, w, h, k, a in _SIDES]
+
+    def update(self, landmarks):
+        """Adds one (33, 4) landmark array (or None) and returns the current guess."""
+        if landmarks is not None and self._push(landmarks):
+            return self.classify()
+        return None
+
+    def _push(self, landmarks):
+        side = 0 if landmarks[LEFT_SHOULDER, VISIBILITY] >= landmarks[RIGHT_SHOULDER, VISIBILITY] else 1
+        shoulder, elbow, wrist, hip, knee, ankle = _SIDES[side]
+        visible = landmarks[:, VISIBILITY] >= VIS_THRESHOLD
+        if not (visible[shoulder] and visible[hip]):
+            return False
+
+        torso = landmarks[shoulder, :2] - landmarks[hip, :2]
+        length = float(np.hypot(*torso)) or 1e-6
+        elbow_angle, knee_angle = self._engines[side].angles(landmarks)
+
+        row = self._features[self._count % len(self._features)]
+        row[UPRIGHT] = abs(torso[1]) / length
+        row[ELBOW] = elbow_angle if visible[elbow] and visible[wrist] else 180.0
+        row[KNEE] = knee_angle if visible[knee] and visible[ankle] else 180.0
+        row[OVERHEAD] = (landmarks[shoulder, 1] - landmarks[wrist, 1]) / length
+        self._count += 1
+        return True
+
+    def classify(self):
+        if self._count < MIN_FRAMES:
+            return None
+        n = min(self._count, len(self._features))
+        window = np.sort(self._features[:n], axis=0)  # each column separately
+        low, median, high = window[n // 10], window[n // 2], window[n - 1 - n // 10]
+        moving_elbows = high[ELBOW] - low[ELBOW] >= ELBOW_RANGE_MIN
+
+        if median[UPRIGHT] < UPRIGHT_MIN:
+            return "PUSHUPS" if moving_elbows else "PLANK"
+        if high[KNEE] - low[KNEE] >= KNEE_RANGE_MIN:
+            return "SQUATS"
+        if moving_elbows:
+            return "SHOULDER PRESS" if high[OVERHEAD] >= OVERHEAD_MIN else "BARBELL CURLS"
+        return None
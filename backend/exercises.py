@@ -0,0 +1,194 @@
+import logging
+import time
+
+from shoulder_press_logic import process_shoulder_press, SHOULDER_PRESS_RULES
+from barbell_curl_logic import process_barbell_curl, BARBELL_CURL_RULES
+from plank_logic import process_plank, PlankState
+from pushups_logic import process_pushups, PushupsState
+from squats_logic import process_squats, SquatsState
+from session_state import SessionState
+from exercise_classifier import ExerciseClassifier
+from landmark_filter import make_filter
+
+logger = logging.getLogger(__name__)
+
+# =====================================================================
+# --- Exercise Router Table ---
+# =====================================================================
+# Name sent by the client -> (frame processor, session state factory)
+EXERCISES = {
+    "SHOULDER PRESS": (process_shoulder_press, SHOULDER_PRESS_RULES.new_state),
+    "BARBELL CURLS": (process_barbell_curl, BARBELL_CURL_RULES.new_state),
+    "PLANK": (process_plank, PlankState),
+    "PUSHUPS": (process_pushups, PushupsState),
+    "SQUATS": (process_squats, SquatsState),
+}
+
+
+# =====================================================================
+# --- Automatic Exercise Recognition ("AUTO") ---
+# =====================================================================
+# One session for a whole workout: ExerciseClassifier watches the
+# landmarks and the session switches processors once a new exercise has
+# been recognised for AUTO_SWITCH_AFTER seconds straight. Each exercise
+# keeps its own state, so its reps carry on when the user comes back to it.
+AUTO_SWITCH_AFTER = 1.5  # seconds
+
+
+class AutoState(SessionState):
+    __slots__ = ('exercise', 'states', 'reps', 'candidate', 'candidate_since', 'classifier')
+
+    def __init__(self):
+        self.exercise = None  # exercise being scored, once recognised
+        self.states = {}      # exercise -> its own session state
+        self.reps = {}        # exercise -> reps so far (plank: seconds held)
+        self.candidate = None
+        self.candidate_since = 0.0
+        self.classifier = ExerciseClassifier()
+
+    def snapshot(self):
+        """The recognised exercises and their states; the classifier starts over on restore."""
+        return {
+            'exercise': self.exercise,
+            'states': {name: state.snapshot() for name, state in self.states.items()},
+            'reps': dict(self.reps),
+        }
+
+    @classmethod
+    def restore(cls, snapshot):
+        state = cls()
+        for name, saved in snapshot.get('states', {}).items():
+            if name in EXERCISES:
+                state.states[name] = type(EXERCISES[name][1]()).restore(saved)
+        state.reps = {name: reps for name, reps in snapshot.get('reps', {}).items() if name in state.states}
+        if snapshot.get('exercise') in state.states:
+            state.exercise = snapshot['exercise']
+        return state
+
+
+def process_auto(landmarks, state, now=None):
+    """
+    Scores whichever exercise the classifier recognises. Feedback is that
+    exercise's, plus 'exercise' (None until one is recognised) and
+    'workout' (reps per exercise so far).
+    """
+    now = time.time() if now is None else now
+
+    if landmarks is not None:
+        guess = state.classifier.update(landmarks)
+        if guess != state.candidate:
+            state.candidate, state.candidate_since = guess, now
+        elif guess not in (None, state.exercise) and now - state.candidate_since >= AUTO_SWITCH_AFTER:
+            if state.exercise is not None:
+                # Like a gap in the stream for the one being left (pauses the plank timer)
+                previous_processor = EXERCISES[state.exercise][0]
+                previous_processor(None, state.states[state.exercise], now=now)
+            logger.info("Recognised exercise: %s (was %s)", guess, state.exercise)
+            state.exercise = guess
+            if guess not in state.states:
+                state.states[guess] = EXERCISES[guess][1]()
+                state.reps[guess] = 0
+
+    if state.exercise is None:
+        feedback = {'reps': 0, 'error': "", 'adjustment': "Detecting exercise...", 'perfect_rep': False}
+    else:
+        frame_processor = EXERCISES[state.exercise][0]
+        feedback, state.states[state.exercise] = frame_processor(landmarks, state.states[state.exercise], now=now)
+        state.reps[state.exercise] = feedback['reps']
+    feedback['exercise'] = state.exercise
+    feedback['workout'] = dict(state.reps)
+    return feedback, state
+
+
+EXERCISES["AUTO"] = (process_auto, AutoState)
+
+# Run pose inference on every Nth frame (landmarks are extrapolated in
+# between, see LandmarkPredictor). Static holds only need a few angle
+# readings a second; anything with reps keeps full-rate inference.
+INFERENCE_CADENCE = {
+    "PLANK": 4,
+}
+
+# Landmark smoothing overrides, per filter kind (see landmark_filter.DEFAULT_PARAMS).
+# A plank barely moves, so it can smooth hard; pushups keep a higher base
+# cutoff, close to the fixed EMA their processor used to apply itself.
+LANDMARK_SMOOTHING = {
+    "PLANK": {
+        "one_euro": {"min_cutoff": 0.5, "beta": 5.0},
+        "kalman": {"process_noise": 0.03},
+    },
+    "PUSHUPS": {
+        "one_euro": {"min_cutoff": 2.5},
+    },
+}
+
+
+def get_exercise(name):
+    """
+    Looks up an exercise by client name (case/whitespace-insensitive).
+    Returns (frame_processor, fresh_state), or (None, None) if unknown.
+    Processors return (feedback dict, state); the state object is updated
+    in place on every frame.
+    """
+    entry = EXERCISES.get(name.upper().strip())
+    if entry is None:
+        return None, None
+    frame_processor, new_state = entry
+    return frame_processor, new_state()
+
+
+def inference_cadence(name):
+    """Frames per pose inference for an exercise (1 = every frame)."""
+    return INFERENCE_CADENCE.get(name.upper().strip(), 1)
+
+
+def landmark_filter(name, kind):
+    """A fresh landmark filter of `kind` tuned for an exercise, or None if `kind` is "none"."""
+    params = LANDMARK_SMOOTHING.get(name.upper().strip(), {}).get(kind, {})
+    return make_filter(kind, **params)
+
+
+# =====================================================================
+# --- Multi-person Sessions ---
+# =====================================================================
+class PeopleState(SessionState):
+    """One exercise state and landmark filter per tracked person (by track id)."""
+    __slots__ = ('exercise', 'smoothing', 'people', 'filters')
+
+    def __init__(self, exercise="AUTO", smoothing=None):
+        self.exercise = exercise
+        self.smoothing = smoothing  # landmark filter kind for each person, None for raw landmarks
+        self.people = {}
+        self.filters = {}
+
+
+def process_people(people, state, now=None):
+    """
+    Runs the session's exercise for everyone in `people` ({track id: (33, 4)
+    landmarks}, or None); feedback is {'people': {track id: feedback}}.
+    People who are no longer tracked are forgotten.
+    """
+    now = time.time() if now is None else now
+    people = people or {}
+    for track_id in [t for t in state.people if t not in people]:
+        del state.people[track_id], state.filters[track_id]
+
+    frame_processor, new_state = EXERCISES[state.exercise]
+    feedback = {}
+    for track_id, landmarks in people.items():
+        if track_id not in state.people:
+            state.people[track_id] = new_state()
+            state.filters[track_id] = landmark_filter(state.exercise, state.smoothing)
+        smoother = state.filters[track_id]
+        if smoother:
+            landmarks = smoother(landmarks, now)
+        feedback[str(track_id)], state.people[track_id] = frame_processor(landmarks, state.people[track_id], now=now)
+    return {'people': feedback}, state
+
+
+def get_people_exercise(name, smoothing=None):
+    """get_exercise for a multi-person camera: (process_people, fresh PeopleState), or (None, None)."""
+    name = name.upper().strip()
+    if name not in EXERCISES:
+        return None, None
+    return process_people, PeopleState(name, smoothing)
@@ -0,0 +1,67 @@
+import json
+
+try:
+    import msgpack
+except ImportError:  # optional: only clients asking for 'encoding': 'msgpack' need it
+    msgpack = None
+
+# =====================================================================
+# --- Feedback Output Stage ---
+# =====================================================================
+# Processors return a plain feedback dict (reps, error, adjustment,
+# perfect_rep); FeedbackEncoder turns it into one client's message.
+#
+#   mode "full":   the whole dict on every frame (the original protocol)
+#   mode "delta":  only the fields that changed since the last message, and
+#                  no message at all on steady frames; the whole dict is
+#                  resent every `keyframe_interval` seconds as a keyframe
+#   encoding "json" (text messages) or "msgpack" (binary messages)
+#
+# Both modes echo the frame's seq (binary protocol) in every message sent.
+FEEDBACK_MODES = ("full", "delta")
+ENCODINGS = ("json", "msgpack")
+
+
+def negotiate_feedback(hello):
+    """
+    (mode, encoding) for a client hello. Old clients never ask, so they get
+    full JSON; so does anyone asking for msgpack when it isn't installed.
+    """
+    mode = hello.get('feedback')
+    encoding = hello.get('encoding')
+    if encoding == "msgpack" and msgpack is None:
+        encoding = "json"
+    return (mode if mode in FEEDBACK_MODES else "full",
+            encoding if encoding in ENCODINGS else "json")
+
+
+class FeedbackEncoder:
+    def __init__(self, mode="full", encoding="json", keyframe_interval=1.0):
+        self.mode = mode
+        self.encoding = encoding
+        self.keyframe_interval = keyframe_interval
+        self._dumps = msgpack.packb if encoding == "msgpack" else json.dumps
+        self._sent = {}  # what the client has, as of our last message (delta mode)
+        self._last_keyframe = None
+
+    def encode(self, feedback, seq=None, now=0.0):
+        """
+        Returns the message for this frame's feedback dict (str for JSON,
+        bytes for msgpack), or None when there is nothing to send.
+        `feedback` must be a fresh dict per frame (it may be extended in place).
+        """
+        if self.mode == "delta":
+            if self._last_keyframe is None or now - self._last_keyframe >= self.keyframe_interval:
+                self._last_keyframe = now
+                self._sent = dict(feedback)
+            else:
+                sent = self._sent
+                feedback = {key: value for key, value in feedback.items()
+                            if key not in sent or sent[key] != value}
+                if not feedback:
+                    return None
+                sent.update(feedback)
+
+        if seq is not None:
+            feedback['seq'] = seq
+        return self._dumps(feedback)
@@ -0,0 +1,119 @@
+import cv2 as cv
+import numpy as np
+
+# =====================================================================
+# --- JPEG -> RGB for Pose ---
+# =====================================================================
+# Backends: "opencv" (always available) or "turbojpeg" (PyTurboJPEG on
+# libturbojpeg, decodes straight to RGB). Both can decode at 1/2, 1/4 or
+# 1/8 scale inside the JPEG decoder, which skips most of the IDCT work,
+# when frames arrive far larger than the inference target.
+DECODERS = ("opencv", "turbojpeg")
+
+_REDUCED_FLAGS = {
+    1: cv.IMREAD_COLOR,
+    2: cv.IMREAD_REDUCED_COLOR_2,
+    4: cv.IMREAD_REDUCED_COLOR_4,
+    8: cv.IMREAD_REDUCED_COLOR_8,
+}
+_rgb_flag = None  # IMREAD_COLOR_RGB if this OpenCV honours it (with scaling too), else 0
+
+
+def _opencv_rgb_flag():
+    """
+    Checks once whether imdecode can output RGB directly (OpenCV 4.10+),
+    by decoding a small red JPEG at half scale and looking at the channels.
+    """
+    global _rgb_flag
+    if _rgb_flag is None:
+        _rgb_flag = 0
+        flag = getattr(cv, "IMREAD_COLOR_RGB", None)
+        if flag is not None:
+            red = np.zeros((16, 16, 3), dtype=np.uint8)
+            red[..., 2] = 255  # BGR
+            ok, jpeg = cv.imencode(".jpg", red)
+            img = cv.imdecode(jpeg, cv.IMREAD_REDUCED_COLOR_2 | flag) if ok else None
+            if img is not None and img.shape[:2] == (8, 8) and img[4, 4, 0] > 200 > img[4, 4, 2]:
+                _rgb_flag = flag
+    return _rgb_flag
+
+
+def _open_turbojpeg():
+    try:
+        from turbojpeg import TurboJPEG, TJPF_RGB
+    except ImportError:
+        raise RuntimeError("JPEG_DECODER=turbojpeg needs PyTurboJPEG (pip install PyTurboJPEG)")
+    try:
+        return TurboJPEG(), TJPF_RGB
+    except (OSError, RuntimeError) as e:
+        raise RuntimeError(f"JPEG_DECODER=turbojpeg: libturbojpeg not usable ({e})")
+
+
+class FrameDecoder:
+    """
+    Decodes one session's JPEG frames into RGB arrays for Pose.process.
+
+    `target_width` enables reduced-scale decoding: the scale is the largest
+    of 1/2, 1/4, 1/8 that keeps frames at least that wide, picked from the
+    previous frame's size. Conversions and ROI crops are written into a
+    buffer reused across frames (Pose copies its input, so that's safe);
+    the returned image is only valid until the next decode.
+    """
+
+    def __init__(self, backend="opencv", target_width=None):
+        if backend not in DECODERS:
+            raise ValueError(f"Unknown JPEG decoder {backend!r} (expected one of {', '.join(DECODERS)})")
+        self.backend = backend
+        self.target_width = target_width
+        self.scale = 1
+
+        self._turbo = None
+        self._rgb_flag = 0
+        if backend == "turbojpeg":
+            self._turbo, self._turbo_rgb = _open_turbojpeg()
+        else:
+            self._rgb_flag = _opencv_rgb_flag()
+        self._out = None
+
+    def _buffer(self, shape):
+        if self._out is None or self._out.shape != shape:
+            self._out = np.empty(shape, dtype=np.uint8)
+        return self._out
+
+    def _pick_scale(self, full_width):
+        scale = 1
+        if self.target_width:
+            while scale < 8 and full_width // (scale * 2) >= self.target_width:
+                scale *= 2
+        return scale
+
+    def decode(self, jpeg, roi=None):
+        """
+        Returns (RGB image, ROI window or None), cropped by `roi` (a RoiTracker)
+        when given. Raises ValueError for data that isn't a decodable JPEG.
+        """
+        scale = self.scale
+        if self._turbo is not None:
+            try:
+                img = self._turbo.decode(
+                    jpeg, pixel_format=self._turbo_rgb, scaling_factor=(1, scale) if scale > 1 else None,
+                )
+            except OSError:
+                img = None
+            rgb = True
+        else:
+            img = cv.imdecode(np.frombuffer(jpeg, np.uint8), _REDUCED_FLAGS[scale] | self._rgb_flag)
+            rgb = bool(self._rgb_flag)
+        if img is None:
+            raise ValueError("Failed to decode image frame")
+        self.scale = self._pick_scale(img.shape[1] * scale)
+
+        view, window = roi.crop(img) if roi else (img, None)
+        if not rgb:
+            return cv.cvtColor(view, cv.COLOR_BGR2RGB, dst=self._buffer(view.shape)), window
+        if window is None:
+            return img, None
+        # Pose wants a contiguous image; a crop is a strided view
+        out = self._buffer(view.shape)
+        np.copyto(out, view)
+        return out, window
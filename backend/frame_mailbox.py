@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+
+class FrameMailbox:
+    """
+    One-slot, latest-frame-wins mailbox between a session's socket reader
+    and its inference loop. A frame that arrives before the previous one was
+    taken replaces it, and the replaced frame is counted as dropped.
+    """
+
+    def __init__(self):
+        self._message = None
+        self._received_at = 0.0
+        self._ready = asyncio.Event()
+        self.closed = False
+        self.stopped = False
+
+        # --- Stats ---
+        self.received = 0
+        self.dropped = 0
+        self.max_queue_age = 0.0
+
+    def put(self, message):
+        if self.stopped:
+            return
+        if self._message is not None:
+            self.dropped += 1
+        self._message = message
+        self._received_at = time.monotonic()
+        self.received += 1
+        self._ready.set()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    def stop(self):
+        """Ends the inference loop at its next get(), dropping any pending frame."""
+        self.stopped = True
+        self._message = None
+        self.close()
+
+    async def get(self):
+        """
+        Waits for the newest frame. Returns (message, queue_age_seconds),
+        or None once the reader has closed the mailbox and nothing is pending.
+        """
+        while self._message is None:
+            if self.closed:
+                return None
+            self._ready.clear()
+            await self._ready.wait()
+
+        message, self._message = self._message, None
+        queue_age = time.monotonic() - self._received_at
+        self.max_queue_age = max(self.max_queue_age, queue_age)
+        return message, queue_age
+
+
+async def read_into_mailbox(websocket, mailbox, recorder=None):
+    """
+    Reader task: drains the socket as fast as frames arrive. When recording,
+    every frame is captured here, including the ones the mailbox later drops.
+    """
+    try:
+        async for message in websocket:
+            if recorder:
+                recorder.write_message(message)
+            mailbox.put(message)
+    finally:
+        mailbox.close()
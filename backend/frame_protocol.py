@@ -0,0 +1,74 @@
+import base64
+import json
+import struct
+from collections import namedtuple
+
+# =====================================================================
+# --- Binary Frame Format ---
+# =====================================================================
+# Little-endian header followed directly by the raw JPEG bytes:
+#   magic (4s) | width (H) | height (H) | seq (I) | timestamp_ms (Q)
+FRAME_MAGIC = b"GBF1"
+FRAME_HEADER = struct.Struct("<4sHHIQ")
+
+PROTOCOL_JSON = "json"
+PROTOCOL_BINARY = "binary"
+
+Frame = namedtuple("Frame", ["jpeg", "width", "height", "seq", "timestamp_ms"])
+
+
+class FrameFormatError(ValueError):
+    """Raised when a client message is not a valid frame."""
+
+
+def negotiate_protocol(hello):
+    """Returns the frame protocol requested in the exercise-selection message."""
+    if hello.get('protocol') == PROTOCOL_BINARY:
+        return PROTOCOL_BINARY
+    return PROTOCOL_JSON
+
+
+def decode_binary_frame(message):
+    """
+    Splits a binary frame into header fields and a zero-copy JPEG view
+    that can be handed straight to cv.imdecode.
+    """
+    view = memoryview(message)
+    if len(view) <= FRAME_HEADER.size:
+        raise FrameFormatError("Binary frame too short")
+
+    magic, width, height, seq, timestamp_ms = FRAME_HEADER.unpack_from(view)
+    if magic != FRAME_MAGIC:
+        raise FrameFormatError("Bad binary frame magic")
+
+    return Frame(view[FRAME_HEADER.size:], width, height, seq, timestamp_ms)
+
+
+def encode_binary_frame(jpeg, width, height, seq, timestamp_ms):
+    """Builds a binary frame (used by tools that replay recorded sessions)."""
+    return FRAME_HEADER.pack(FRAME_MAGIC, width, height, seq, timestamp_ms) + bytes(jpeg)
+
+
+def decode_json_frame(message):
+    """
+    Legacy format: {"frame": "<base64 jpeg>", "width": ..., "height": ...}.
+    Returns None for messages without a frame.
+    """
+    try:
+        data = json.loads(message)
+    except json.JSONDecodeError:
+        raise FrameFormatError("Failed to decode JSON from client")
+
+    b64_string = data.get('frame')
+    if not b64_string:
+        return None
+
+    jpeg = base64.b64decode(b64_string)
+    return Frame(jpeg, data.get('width', 0), data.get('height', 0), None, None)
+
+
+def decode_frame(message):
+    """Accepts either wire format; websockets hands us bytes for binary messages."""
+    if isinstance(message, (bytes, bytearray, memoryview)):
+        return decode_binary_frame(message)
+    return decode_json_frame(message)
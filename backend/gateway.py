@@ -0,0 +1,285 @@
+"""
+WebSocket gateway: spreads client sessions over several server.py nodes.
+
+Reads each client's first (exercise) message, picks the healthy node with
+the most free pose estimators (from its /status on the metrics port) and
+proxies the connection to it for the rest of the session. Clients that
+reconnect with a session_id go back to the node that served it, where its
+live state / checkpoint is. Local test setup:
+
+    PORT=9001 METRICS_PORT=9101 python server.py &
+    PORT=9002 METRICS_PORT=9102 python server.py &
+    GATEWAY_NODES=localhost:9001:9101,localhost:9002:9102 python gateway.py
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+
+import websockets
+
+from structured_log import configure_logging, shutdown_logging
+
+logger = logging.getLogger("gateway")
+
+# --- Listen Address (what clients connect to) ---
+# Not server.py's 8765 / 8766, so a gateway and a node can share a host.
+GATEWAY_HOST = os.environ.get("GATEWAY_HOST", "0.0.0.0")
+GATEWAY_PORT = int(os.environ.get("GATEWAY_PORT", 8760))
+
+# --- Nodes ---
+# Comma-separated host:port[:status_port]; status_port (the node's METRICS_PORT)
+# defaults to port + 1, matching server.py's 8765 / 8766. The default is one
+# server.py on this host. A node at the gateway's own address is refused at startup.
+GATEWAY_NODES = os.environ.get("GATEWAY_NODES", "localhost:8765")
+
+# --- Health Checks ---
+# Every node's /status is polled every GATEWAY_HEALTH_INTERVAL seconds; a node
+# that doesn't answer within GATEWAY_HEALTH_TIMEOUT, or is still warming up,
+# gets no new sessions.
+GATEWAY_HEALTH_INTERVAL = float(os.environ.get("GATEWAY_HEALTH_INTERVAL", 2.0))
+GATEWAY_HEALTH_TIMEOUT = float(os.environ.get("GATEWAY_HEALTH_TIMEOUT", 1.0))
+
+# --- Sticky Sessions ---
+# How long a session id keeps routing to its node (server.py's SESSION_TTL)
+GATEWAY_STICKY_TTL = float(os.environ.get("GATEWAY_STICKY_TTL", 6 * 3600))
+
+# --- Logging (same meaning as in server.py) ---
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text").lower()
+LOG_RATE_LIMIT = float(os.environ.get("LOG_RATE_LIMIT", 1.0))
+
+
+# =====================================================================
+# --- Nodes ---
+# =====================================================================
+class Node:
+    def __init__(self, host, port, status_port):
+        self.host = host
+        self.port = port
+        self.status_port = status_port
+        self.url = f"ws://{host}:{port}"
+        self.healthy = False
+        self.status = {}
+        self.assigned = 0  # sessions sent here since the last /status (not in it yet)
+        self.proxied = 0   # sessions currently proxied through this gateway
+
+    def __repr__(self):
+        return self.url
+
+    @property
+    def free(self):
+        """Estimators left for new sessions: the node's last report, or our own count if that's higher."""
+        capacity = self.status.get('capacity', 0)
+        busy = capacity - self.status.get('available', 0) + self.status.get('waiting', 0) + self.assigned
+        return capacity - max(busy, self.proxied)
+
+    async def check(self, timeout):
+        try:
+            status = await asyncio.wait_for(_get_json(self.host, self.status_port, "/status"), timeout)
+        except (OSError, ValueError, asyncio.TimeoutError) as e:
+            if self.healthy:
+                logger.warning("Node %s failed its health check: %s", self, e or type(e).__name__)
+            self.healthy = False
+            return
+        # Still warming up (nodes older than the 'ready' field count as ready)
+        if not status.get('ready', True):
+            self.healthy = False
+            return
+        if not self.healthy:
+            logger.info("Node %s is up: %s", self, status)
+        self.status = status
+        self.assigned = 0
+        self.healthy = True
+
+    def mark_down(self, reason):
+        logger.warning("Node %s unreachable: %s", self, reason)
+        self.healthy = False
+
+
+async def _get_json(host, port, path):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: close\r\n\r\n".encode())
+        response = await reader.read()
+    finally:
+        writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    if not head.startswith(b"HTTP/1.1 200"):
+        raise ValueError(head.split(b"\r\n", 1)[0].decode(errors="replace") or "empty response")
+    return json.loads(body)
+
+
+def parse_nodes(spec):
+    nodes = []
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        host, port, *status_port = entry.split(":")
+        nodes.append(Node(host, int(port), int(status_port[0]) if status_port else int(port) + 1))
+    return nodes
+
+
+_LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1", "0.0.0.0", "::", ""}
+
+
+def own_address(node, host, port):
+    """Whether `node` is the gateway listening on host:port (it would proxy every session to itself)."""
+    if node.port != port:
+        return False
+    local = node.host in _LOCAL_HOSTS or node.host == socket.gethostname()
+    return node.host == host or (local and host in _LOCAL_HOSTS)
+
+
+# =====================================================================
+# --- Routing ---
+# =====================================================================
+class Router:
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.sticky = {}  # session id -> (node, last seen)
+
+    def pick(self, session_id=None, exclude=()):
+        """The session's own node if it is still up, else the least-loaded healthy node."""
+        if session_id in self.sticky:
+            node, _ = self.sticky[session_id]
+            if node.healthy and node not in exclude:
+                return node
+        candidates = [n for n in self.nodes if n.healthy and n not in exclude]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda n: (n.free, -n.proxied))
+
+    def remember(self, session_id, node):
+        self.sticky[session_id] = (node, time.time())
+
+    async def run_health_checks(self):
+        while True:
+            await asyncio.gather(*(n.check(GATEWAY_HEALTH_TIMEOUT) for n in self.nodes))
+            cutoff = time.time() - GATEWAY_STICKY_TTL
+            for session_id in [s for s, (_, seen) in self.sticky.items() if seen < cutoff]:
+                del self.sticky[session_id]
+            await asyncio.sleep(GATEWAY_HEALTH_INTERVAL)
+
+
+router = Router(parse_nodes(GATEWAY_NODES))
+
+
+# =====================================================================
+# --- Proxy ---
+# =====================================================================
+async def _client_to_node(client, upstream):
+    async for message in client:
+        await upstream.send(message)
+
+
+# Replies server.py sends to the hello before any feedback; the session id ack is the last
+_HANDSHAKE_KEYS = {'protocol', 'feedback', 'encoding', 'people'}
+
+
+def _learn_session(message, node):
+    """Remembers the node's session id from a handshake reply; returns whether to keep looking."""
+    if not isinstance(message, str):
+        return False
+    try:
+        reply = json.loads(message)
+    except ValueError:
+        return False
+    if not isinstance(reply, dict):
+        return False
+    if 'session' in reply:
+        if isinstance(reply['session'], str):
+            router.remember(reply['session'], node)
+        return False
+    return set(reply) <= _HANDSHAKE_KEYS
+
+
+async def _node_to_client(upstream, client, node, learning):
+    async for message in upstream:
+        if learning:
+            learning = _learn_session(message, node)
+        await client.send(message)
+
+
+async def handler(client):
+    try:
+        hello = await client.recv()
+        data = json.loads(hello)
+        session_id = data.get('session_id')
+        # The node only acks a session id (new or resumed) when the hello has one
+        learning = 'session_id' in data
+        if not isinstance(session_id, str):
+            session_id = None
+    except (ValueError, AttributeError):
+        await client.close(reason="Expected an exercise message")
+        return
+    except websockets.exceptions.ConnectionClosed:
+        return
+
+    # --- Pick a node; fall through to the next one if it refuses the connection ---
+    tried = []
+    while True:
+        node = router.pick(session_id, exclude=tried)
+        if node is None:
+            logger.warning("No inference node available for %s", client.remote_address)
+            await client.close(code=1013, reason="Server busy, try again later")
+            return
+        # Count it before connecting, so concurrent handshakes spread out
+        node.assigned += 1
+        node.proxied += 1
+        try:
+            upstream = await websockets.connect(node.url, max_size=None, open_timeout=GATEWAY_HEALTH_TIMEOUT)
+            break
+        except (OSError, asyncio.TimeoutError, websockets.exceptions.InvalidHandshake) as e:
+            node.assigned -= 1
+            node.proxied -= 1
+            node.mark_down(e)
+            tried.append(node)
+
+    logger.info("Routing %s to %s", client.remote_address, node)
+
+    try:
+        await upstream.send(hello)
+        pumps = [
+            asyncio.create_task(_client_to_node(client, upstream)),
+            asyncio.create_task(_node_to_client(upstream, client, node, learning)),
+        ]
+        await asyncio.wait(pumps, return_when=asyncio.FIRST_COMPLETED)
+        for task in pumps:
+            task.cancel()
+        # Either side closing ends the session; its close code is handled below
+        await asyncio.gather(*pumps, return_exceptions=True)
+    except websockets.exceptions.ConnectionClosed:
+        pass
+    finally:
+        node.proxied -= 1
+        await upstream.close()
+        # Pass the node's close code (e.g. 1013 busy) on to the client
+        code, reason = upstream.close_code, upstream.close_reason
+        if code in (None, 1005, 1006):  # no close frame: the node went away
+            code, reason = 1011, "Inference node disconnected"
+        await client.close(code=code, reason=reason or "")
+
+
+# =====================================================================
+# --- Main ---
+# =====================================================================
+async def main():
+    for node in router.nodes:
+        if own_address(node, GATEWAY_HOST, GATEWAY_PORT):
+            raise SystemExit(f"GATEWAY_NODES includes the gateway's own address ({node}); "
+                             f"change GATEWAY_PORT or GATEWAY_NODES")
+    health_checks = asyncio.create_task(router.run_health_checks())
+    logger.info("Gateway on ws://%s:%d for nodes %s", GATEWAY_HOST, GATEWAY_PORT, router.nodes)
+    try:
+        async with websockets.serve(handler, GATEWAY_HOST, GATEWAY_PORT, max_size=None):
+            await asyncio.Future()  # Run forever
+    finally:
+        health_checks.cancel()
+
+if __name__ == "__main__":
+    configure_logging(LOG_LEVEL, LOG_FORMAT, LOG_RATE_LIMIT)
+    try:
+        asyncio.run(main())
+    finally:
+        shutdown_logging()
@@ -0,0 +1,85 @@
+import asyncio
+
+
+class InferenceScheduler:
+    """
+    Collects frames from many sessions for up to `max_wait` seconds (or until
+    `max_batch` frames are waiting) and hands them to the engine as one batch,
+    then fans each result back out to the session that submitted it.
+    """
+
+    def __init__(self, engine, max_batch=8, max_wait=0.005):
+        self.engine = engine
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait
+
+        self._queue = None
+        self._task = None
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue else 0
+
+    def bind(self, session):
+        """Wraps a checked-out session so its frames go through the scheduler."""
+        return BatchedSession(self, session)
+
+    async def submit(self, session, jpeg):
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((session, jpeg, future))
+        return await future
+
+    # --- Batch Collection ---
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Don't hold up the next batch while this one runs
+            asyncio.create_task(self._dispatch(batch))
+
+    async def _dispatch(self, batch):
+        try:
+            results = await self.engine.process_batch([(s, jpeg) for s, jpeg, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, _, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+
+class BatchedSession:
+    """Same process(jpeg) interface as PoseSession / WorkerSession."""
+
+    def __init__(self, scheduler, session):
+        self.scheduler = scheduler
+        self.session = session
+
+    async def process(self, jpeg):
+        return await self.scheduler.submit(self.session, jpeg)
+
+    async def set_complexity(self, complexity):
+        await self.session.set_complexity(complexity)
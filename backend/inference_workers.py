@@ -0,0 +1,397 @@
+import asyncio
+import contextlib
+import itertools
+import logging
+import math
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from pose_pool import PoolExhausted, EstimatorLost
+from landmarks import landmarks_to_array
+from metrics import STAGE_SECONDS
+from roi_tracker import RoiTracker
+from frame_decoder import FrameDecoder
+from warmup import warm_up, warmup_jpeg
+
+logger = logging.getLogger(__name__)
+
+# Largest JPEG a session may hand over (480px wide frames are ~20-60 KB)
+FRAME_BUFFER_SIZE = 1 << 20
+
+
+# =====================================================================
+# --- Worker Process ---
+# =====================================================================
+def _worker_main(conn, buffer_names, pose_kwargs, roi_padding=None, decoder_args=("opencv", None),
+                 complexities=(), warmup=None):
+    """
+    Entry point of one inference process. Owns one Pose per session slot and
+    reads JPEG bytes for a slot straight out of that slot's shared buffer.
+    Every slot starts with a warm Pose per model_complexity in `complexities`
+    (plus the base one), warmed up on the `warmup` JPEG (see warmup.py).
+    """
+    import mediapipe as mp
+
+    def build(complexity):
+        return mp.solutions.pose.Pose(**{**pose_kwargs, 'model_complexity': complexity})
+
+    base = pose_kwargs.get('model_complexity', 1)
+    complexities = sorted({base, *complexities})
+    buffers = [shared_memory.SharedMemory(name=name) for name in buffer_names]
+    rois = [RoiTracker(roi_padding) if roi_padding else None for _ in buffer_names]
+    decoders = [FrameDecoder(*decoder_args) for _ in buffer_names]
+
+    # --- Warm-up: first inferences build the graph ---
+    warmup = warmup or warmup_jpeg()
+    models = []  # per slot: model_complexity -> Pose
+    for decoder in decoders:
+        slot_models = {complexity: build(complexity) for complexity in complexities}
+        for pose in slot_models.values():
+            warm_up(pose, decoder, warmup)
+        models.append(slot_models)
+    poses = [slot_models[base] for slot_models in models]  # the one each slot uses now
+    conn.send(("ready", None))
+
+    def infer(slot, nbytes):
+        start = time.perf_counter()
+        jpeg = np.ndarray((nbytes,), dtype=np.uint8, buffer=buffers[slot].buf)
+        roi = rois[slot]
+        try:
+            imgRGB, window = decoders[slot].decode(jpeg, roi)
+        except ValueError as e:
+            return e
+        decoded = time.perf_counter()
+        results = poses[slot].process(imgRGB)
+        landmarks = landmarks_to_array(results.pose_landmarks)
+        if roi and roi.update(landmarks, window):
+            poses[slot].reset()  # tracking state refers to the old crop
+        # A 528-byte array pickles far cheaper than the landmark protobuf.
+        # Stage timings ride along so the parent can export them.
+        return landmarks, decoded - start, time.perf_counter() - decoded
+
+    try:
+        while True:
+            msg = conn.recv()
+            if msg is None:
+                break
+
+            op, req_id, payload = msg
+            try:
+                if op == "frame":
+                    conn.send((req_id, infer(*payload)))
+                elif op == "batch":
+                    # One reply for the whole batch; per-frame errors travel as values
+                    replies = []
+                    for slot, nbytes in payload:
+                        try:
+                            replies.append(infer(slot, nbytes))
+                        except Exception as e:
+                            replies.append(RuntimeError(f"Worker error: {e}"))
+                    conn.send((req_id, replies))
+                elif op == "complexity":
+                    slot, complexity = payload
+                    pose = models[slot].get(complexity)
+                    if pose is None:
+                        pose = models[slot][complexity] = build(complexity)
+                    else:
+                        pose.reset()
+                    poses[slot] = pose
+                    if rois[slot]:
+                        rois[slot].reset()
+                    conn.send((req_id, None))
+                elif op == "reset":
+                    for pose in models[payload].values():
+                        pose.reset()
+                    poses[payload] = models[payload][base]
+                    decoders[payload] = FrameDecoder(*decoder_args)
+                    if rois[payload]:
+                        rois[payload].reset()
+                    conn.send((req_id, None))
+            except Exception as e:
+                conn.send((req_id, RuntimeError(f"Worker error: {e}")))
+    finally:
+        for slot_models in models:
+            for pose in slot_models.values():
+                pose.close()
+        for buf in buffers:
+            buf.close()
+
+
+# =====================================================================
+# --- Parent-side Handles ---
+# =====================================================================
+class InferenceWorker:
+    """One worker process plus the shared buffers of its session slots."""
+
+    def __init__(self, ctx, slots, pose_kwargs, roi_padding=None, decoder_args=("opencv", None),
+                 complexities=(), warmup=None):
+        self.buffers = [
+            shared_memory.SharedMemory(create=True, size=FRAME_BUFFER_SIZE)
+            for _ in range(slots)
+        ]
+        self.free_slots = list(range(slots))
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, [b.name for b in self.buffers], pose_kwargs, roi_padding, decoder_args,
+                  complexities, warmup),
+            daemon=True,
+        )
+
+        self._pending = {}
+        self._req_ids = itertools.count()
+        self._loop = None
+        self._reader = None
+        self._exited = False  # pipe closed: the process is gone even if not reaped yet
+
+    @property
+    def alive(self):
+        return not self._exited and self.process.is_alive()
+
+    @property
+    def active_sessions(self):
+        return len(self.buffers) - len(self.free_slots)
+
+    def start(self):
+        """Spawns the process and blocks until its estimators are warm."""
+        self.process.start()
+        status, _ = self.conn.recv()
+        if status != "ready":
+            raise RuntimeError("Inference worker failed to start")
+
+    def attach(self, loop):
+        self._loop = loop
+        self._reader = threading.Thread(target=self._read_responses, daemon=True)
+        self._reader.start()
+
+    def _read_responses(self):
+        while True:
+            try:
+                req_id, result = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            future = self._pending.pop(req_id, None)
+            if future is not None:
+                self._loop.call_soon_threadsafe(_resolve, future, result)
+
+        # Worker died: fail everything still in flight (on the loop, so no
+        # request can slip in between)
+        self._exited = True
+        self._loop.call_soon_threadsafe(self._fail_pending)
+
+    def _fail_pending(self):
+        if self._pending:
+            logger.error("Inference worker %s exited; failing %d request(s)", self.process.pid, len(self._pending))
+        for future in self._pending.values():
+            _resolve(future, EstimatorLost("Inference worker exited"))
+        self._pending.clear()
+
+    def request(self, op, payload):
+        """Sends one request; returns a future for its reply. Raises EstimatorLost if the worker is gone."""
+        if not self.alive:
+            raise EstimatorLost("Inference worker exited")
+        req_id = next(self._req_ids)
+        future = self._loop.create_future()
+        self._pending[req_id] = future
+        try:
+            self.conn.send((op, req_id, payload))
+        except OSError:
+            del self._pending[req_id]
+            self._exited = True
+            raise EstimatorLost("Inference worker exited")
+        return future
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+        for buf in self.buffers:
+            buf.close()
+            buf.unlink()
+
+
+def _unpack(result):
+    """Records a worker reply's stage timings and returns its landmarks."""
+    if isinstance(result, Exception):
+        return result
+    landmarks, decode_seconds, pose_seconds = result
+    STAGE_SECONDS.observe(decode_seconds, stage="decode")
+    STAGE_SECONDS.observe(pose_seconds, stage="pose")
+    return landmarks
+
+
+def _resolve(future, result):
+    if future.done():
+        return
+    if isinstance(result, Exception):
+        future.set_exception(result)
+    else:
+        future.set_result(result)
+
+
+class WorkerSession:
+    """A session pinned to one slot of one worker (sticky routing)."""
+
+    def __init__(self, worker, slot, complexity):
+        self.worker = worker
+        self.slot = slot
+        self.complexity = complexity
+        self._buffer = worker.buffers[slot].buf
+
+    def stage(self, jpeg):
+        """Copies a JPEG frame into the slot's shared buffer; returns its size."""
+        nbytes = len(jpeg)
+        if nbytes > len(self._buffer):
+            raise ValueError(f"Frame too large ({nbytes} bytes)")
+        self._buffer[:nbytes] = jpeg
+        return nbytes
+
+    async def process(self, jpeg):
+        """
+        Runs decode + pose for one JPEG frame in the session's worker.
+        Returns a (33, 4) landmark array, or None when nobody is in frame.
+        """
+        nbytes = self.stage(jpeg)
+        return _unpack(await self.worker.request("frame", (self.slot, nbytes)))
+
+    async def set_complexity(self, complexity):
+        """Switches the slot to a Pose with another model_complexity (built in the worker on first use)."""
+        if complexity == self.complexity:
+            return
+        await self.worker.request("complexity", (self.slot, complexity))
+        self.complexity = complexity
+
+
+# =====================================================================
+# --- Worker Pool ---
+# =====================================================================
+class WorkerPool:
+    """
+    N inference processes, each owning a MediaPipe Pose per session slot.
+    Same session() interface as PosePool, so server.py can use either.
+    """
+
+    def __init__(self, workers, size, max_waiters=0, acquire_timeout=10.0, roi_padding=None,
+                 jpeg_decoder="opencv", decode_width=None, **pose_kwargs):
+        self.workers_count = max(1, workers)
+        self.slots_per_worker = max(1, math.ceil(size / self.workers_count))
+        self.size = self.workers_count * self.slots_per_worker
+        self.max_waiters = max_waiters
+        self.acquire_timeout = acquire_timeout
+        self.roi_padding = roi_padding
+        self.decoder_args = (jpeg_decoder, decode_width)
+        self.pose_kwargs = pose_kwargs
+
+        self.workers = []
+        self._slot_freed = None
+        self._waiters = 0
+
+    # --- Startup ---
+    async def start(self, complexities=(), jpeg=None):
+        """Spawns the workers and waits until each has warmed up its estimators (see PosePool.start)."""
+        ctx = multiprocessing.get_context("spawn")
+        self.workers = [
+            InferenceWorker(ctx, self.slots_per_worker, self.pose_kwargs, self.roi_padding, self.decoder_args,
+                            complexities, jpeg)
+            for _ in range(self.workers_count)
+        ]
+        await asyncio.gather(*(asyncio.to_thread(w.start) for w in self.workers))
+
+        loop = asyncio.get_running_loop()
+        for worker in self.workers:
+            worker.attach(loop)
+        self._slot_freed = asyncio.Condition()
+
+    # --- Checkout ---
+    @property
+    def healthy(self):
+        """Whether any worker is still running (dead ones are not respawned)."""
+        return any(w.alive for w in self.workers)
+
+    @property
+    def available(self):
+        return sum(len(w.free_slots) for w in self.workers if w.alive)
+
+    @property
+    def waiting(self):
+        return self._waiters
+
+    def _pick_worker(self):
+        candidates = [w for w in self.workers if w.free_slots and w.alive]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda w: w.active_sessions)
+
+    @contextlib.asynccontextmanager
+    async def session(self):
+        """
+        Pins the session to the least-loaded worker with a free slot.
+        Raises PoolExhausted if the waiting line is full or the wait times out.
+        """
+        worker = self._pick_worker()
+        if worker is None:
+            if self._waiters >= self.max_waiters:
+                raise PoolExhausted("All inference workers are busy")
+
+            self._waiters += 1
+            try:
+                async with self._slot_freed:
+                    await asyncio.wait_for(
+                        self._slot_freed.wait_for(lambda: self._pick_worker() is not None),
+                        self.acquire_timeout,
+                    )
+                    worker = self._pick_worker()
+            except asyncio.TimeoutError:
+                raise PoolExhausted("Timed out waiting for an inference worker")
+            finally:
+                self._waiters -= 1
+
+        slot = worker.free_slots.pop()
+        try:
+            yield WorkerSession(worker, slot, self.pose_kwargs.get('model_complexity', 1))
+        finally:
+            # Drop the previous user's tracking state before reusing the slot
+            with contextlib.suppress(Exception):
+                await worker.request("reset", slot)
+            worker.free_slots.append(slot)
+            async with self._slot_freed:
+                self._slot_freed.notify()
+
+    async def process_batch(self, items):
+        """
+        Runs a list of (session, jpeg) pairs with one pipe round trip per
+        worker. Returns results in order; failed frames come back as exceptions.
+        """
+        results = [None] * len(items)
+        by_worker = {}
+        for i, (session, jpeg) in enumerate(items):
+            try:
+                nbytes = session.stage(jpeg)
+            except ValueError as e:
+                results[i] = e
+                continue
+            by_worker.setdefault(session.worker, []).append((i, session.slot, nbytes))
+
+        async def run(worker, entries):
+            try:
+                replies = await worker.request("batch", [(slot, n) for _, slot, n in entries])
+            except Exception as e:
+                replies = [e] * len(entries)
+            for (i, _, _), reply in zip(entries, replies):
+                results[i] = _unpack(reply)
+
+        await asyncio.gather(*(run(w, entries) for w, entries in by_worker.items()))
+        return results
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
@@ -0,0 +1,156 @@
+import math
+
+import numpy as np
+
+from landmarks import VISIBILITY
+
+# =====================================================================
+# --- Landmark Smoothing ---
+# =====================================================================
+# One shared stage between pose inference and the exercise processors,
+# filtering x, y, z of all 33 landmarks at once (visibility passes through).
+#
+#   "one_euro": One-Euro filter: a low-pass whose cutoff rises with speed,
+#               so holds are steady and fast reps don't lag
+#   "kalman":   constant-velocity Kalman filter per coordinate; a landmark's
+#               measurement noise grows as its visibility drops
+#
+# Filter state lives in arrays allocated once per session. Both filters
+# restart from the raw landmarks after a frame with nobody in view or a
+# gap longer than `max_gap`, rather than dragging stale state along.
+FILTERS = ("one_euro", "kalman")
+DEFAULT_FILTER = "one_euro"
+
+# Coordinates are normalized to the frame, so speeds are in frame sizes per second
+DEFAULT_PARAMS = {
+    "one_euro": {"min_cutoff": 1.0, "beta": 50.0, "d_cutoff": 1.0},
+    "kalman": {"process_noise": 0.3, "measurement_noise": 2.5e-5},
+}
+# Above the slowest frame interval backpressure can push a client to (1 s, plus
+# send and queueing time), so throttled sessions stay smoothed
+DEFAULT_MAX_GAP = 1.5  # seconds
+
+_COORDS = (33, VISIBILITY)
+
+
+def make_filter(kind, **params):
+    """A fresh filter of `kind` (None for "none" / empty), with `params` over DEFAULT_PARAMS."""
+    if not kind or kind == "none":
+        return None
+    if kind not in FILTERS:
+        raise ValueError(f"Unknown landmark filter {kind!r} (expected one of {', '.join(FILTERS)}, or none)")
+    cls = OneEuroFilter if kind == "one_euro" else KalmanFilter
+    return cls(**{**DEFAULT_PARAMS[kind], **params})
+
+
+class _LandmarkFilter:
+    def __init__(self, max_gap=DEFAULT_MAX_GAP):
+        self.max_gap = max_gap
+        self._t = None
+
+    def __call__(self, landmarks, t):
+        """
+        Returns a smoothed copy of a (33, 4) landmark array (or None) seen at
+        time `t` (seconds). The input array is left untouched.
+        """
+        if landmarks is None:
+            self._t = None
+            return None
+        out = landmarks.copy()
+        dt = None if self._t is None else t - self._t
+        if dt is None or not 0 < dt <= self.max_gap:
+            self._start(landmarks)
+        else:
+            self._step(landmarks, dt)
+            out[:, :VISIBILITY] = self._x
+        self._t = t
+        return out
+
+
+class OneEuroFilter(_LandmarkFilter):
+    def __init__(self, min_cutoff, beta, d_cutoff, max_gap=DEFAULT_MAX_GAP):
+        super().__init__(max_gap)
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self._x = np.zeros(_COORDS, dtype=np.float32)   # filtered position
+        self._dx = np.zeros(_COORDS, dtype=np.float32)  # filtered velocity
+        self._raw_dx = np.empty(_COORDS, dtype=np.float32)
+        self._alpha = np.empty(_COORDS, dtype=np.float32)
+
+    def _start(self, landmarks):
+        self._x[:] = landmarks[:, :VISIBILITY]
+        self._dx[:] = 0
+
+    def _step(self, landmarks, dt):
+        raw = landmarks[:, :VISIBILITY]
+        raw_dx, alpha = self._raw_dx, self._alpha
+
+        # Smoothed speed, at the fixed derivative cutoff
+        np.subtract(raw, self._x, out=raw_dx)
+        raw_dx /= dt
+        self._dx += _alpha(self.d_cutoff, dt) * (raw_dx - self._dx)
+
+        # Per-coordinate cutoff from that speed -> alpha = 1 / (1 + 1 / (2 pi fc dt))
+        np.abs(self._dx, out=alpha)
+        alpha *= self.beta
+        alpha += self.min_cutoff
+        alpha *= 2 * math.pi * dt
+        np.reciprocal(alpha, out=alpha)
+        alpha += 1
+        np.reciprocal(alpha, out=alpha)
+
+        np.subtract(raw, self._x, out=raw_dx)
+        raw_dx *= alpha
+        self._x += raw_dx
+
+
+def _alpha(cutoff, dt):
+    return 1.0 / (1.0 + 1.0 / (2 * math.pi * cutoff * dt))
+
+
+class KalmanFilter(_LandmarkFilter):
+    def __init__(self, process_noise, measurement_noise, max_gap=DEFAULT_MAX_GAP):
+        super().__init__(max_gap)
+        self.process_noise = process_noise          # white-noise acceleration density
+        self.measurement_noise = measurement_noise  # variance of a fully visible landmark
+        self._x = np.zeros(_COORDS, dtype=np.float32)
+        self._v = np.zeros(_COORDS, dtype=np.float32)
+        # Covariance [[p00, p01], [p01, p11]], shared by a landmark's x, y, z
+        self._p00 = np.empty((33, 1), dtype=np.float32)
+        self._p01 = np.empty((33, 1), dtype=np.float32)
+        self._p11 = np.empty((33, 1), dtype=np.float32)
+        self._r = np.empty((33, 1), dtype=np.float32)
+        self._innovation = np.empty(_COORDS, dtype=np.float32)
+
+    def _start(self, landmarks):
+        self._x[:] = landmarks[:, :VISIBILITY]
+        self._v[:] = 0
+        self._p00[:] = self.measurement_noise
+        self._p01[:] = 0
+        self._p11[:] = self.process_noise
+
+    def _step(self, landmarks, dt):
+        q = self.process_noise
+        p00, p01, p11 = self._p00, self._p01, self._p11
+
+        # Predict
+        self._x += self._v * dt
+        p00 += dt * (2 * p01 + dt * p11) + q * dt ** 3 / 3
+        p01 += dt * p11 + q * dt ** 2 / 2
+        p11 += q * dt
+
+        # Update; a landmark at visibility 0.5 counts as twice as noisy
+        r = self._r
+        np.maximum(landmarks[:, VISIBILITY:], 0.05, out=r)
+        np.reciprocal(r, out=r)
+        r *= self.measurement_noise
+        r += p00
+        k0 = p00 / r
+        k1 = p01 / r
+        innovation = np.subtract(landmarks[:, :VISIBILITY], self._x, out=self._innovation)
+        self._x += k0 * innovation
+        self._v += k1 * innovation
+        p11 -= k1 * p01
+        p01 *= 1 - k0
+        p00 *= 1 - k0
@@ -0,0 +1,52 @@
+import numpy as np
+
+from landmarks import VISIBILITY
+
+# Never extrapolate further than this past the last inferred frame
+DEFAULT_MAX_GAP = 0.5  # seconds
+
+
+class LandmarkPredictor:
+    """
+    Lets a session run pose inference on only every `cadence`-th frame.
+    The frames in between get landmarks extrapolated linearly from the last
+    two inferred frames (x, y, z; visibility is carried over), so the
+    processors still see, and answer, every frame.
+
+    Inference always runs when there is no recent landmark history: at the
+    start, after a frame with nobody in view, or after a gap of `max_gap`.
+    """
+
+    def __init__(self, cadence, max_gap=DEFAULT_MAX_GAP):
+        self.cadence = cadence
+        self.max_gap = max_gap
+        self._last = None
+        self._last_t = 0.0
+        self._velocity = None  # per-second change of x, y, z
+        self._skipped = 0
+
+    def skip(self, t):
+        """True if the frame at time `t` can use `predict` instead of inference."""
+        return (self._last is not None and
+                self._skipped < self.cadence - 1 and
+                0 <= t - self._last_t <= self.max_gap)
+
+    def predict(self, t):
+        self._skipped += 1
+        landmarks = self._last.copy()
+        if self._velocity is not None:
+            landmarks[:, :VISIBILITY] += self._velocity * np.float32(t - self._last_t)
+        return landmarks
+
+    def observe(self, landmarks, t):
+        """Records the result of an inferred frame (None = nobody in view)."""
+        self._skipped = 0
+        if landmarks is None:
+            self._last = self._velocity = None
+            return
+        if self._last is not None and t > self._last_t:
+            self._velocity = (landmarks[:, :VISIBILITY] - self._last[:, :VISIBILITY]) / np.float32(t - self._last_t)
+        else:
+            self._velocity = None
+        self._last = landmarks.copy()
+        self._last_t = t
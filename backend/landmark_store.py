@@ -0,0 +1,108 @@
+import json
+import os
+import time
+
+import numpy as np
+
+from background_writer import BackgroundWriter
+from landmarks import NUM_LANDMARKS
+
+# =====================================================================
+# --- On-disk Layout ---
+# =====================================================================
+# <store>/<session_id>/
+#   meta.json      exercise, start time
+#   landmarks.f32  (N, 33, 4) float32, NaN rows for frames with nobody in view
+#   frames.f64     (N, 2) float64: frame seq, timestamp (seconds)
+# Both data files are plain row-major arrays, so readers memory-map them.
+LANDMARKS_FILE = "landmarks.f32"
+FRAMES_FILE = "frames.f64"
+META_FILE = "meta.json"
+
+_EMPTY_FRAME = np.full((NUM_LANDMARKS, 4), np.nan, dtype=np.float32).tobytes()
+
+
+class LandmarkWriter:
+    """
+    Writes one session's per-frame landmark arrays to the store. An existing
+    session directory is overwritten, unless `append` (a resumed session
+    continuing where its previous connection stopped). Frames are written
+    by a background thread; `close()` blocks until they are on disk.
+    """
+
+    def __init__(self, directory, session_id, exercise, append=False):
+        self.path = os.path.join(directory, session_id)
+        os.makedirs(self.path, exist_ok=True)
+        self.frames = 0
+
+        meta_path = os.path.join(self.path, META_FILE)
+        if not (append and os.path.isfile(meta_path)):
+            with open(meta_path, "w") as f:
+                json.dump({'session_id': session_id, 'exercise': exercise, 'started_at': time.time()}, f)
+
+        mode = "ab" if append else "wb"
+        files = [open(os.path.join(self.path, name), mode) for name in (LANDMARKS_FILE, FRAMES_FILE)]
+        self._writer = BackgroundWriter(files, name="landmark-writer")
+
+    def append(self, seq, timestamp, landmarks):
+        if landmarks is None:
+            row = _EMPTY_FRAME
+        else:
+            row = np.ascontiguousarray(landmarks, dtype=np.float32).tobytes()
+        self._writer.write(row, np.array((seq, timestamp), dtype=np.float64).tobytes())
+        self.frames += 1
+
+    def close(self):
+        self._writer.close()
+
+
+class StoredSession:
+    """Read-only, memory-mapped view of one stored session."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            self.meta = json.load(f)
+
+        frames = _map(os.path.join(path, FRAMES_FILE), np.float64)
+        landmarks = _map(os.path.join(path, LANDMARKS_FILE), np.float32)
+
+        # A crash can leave a partial trailing row; only keep complete frames
+        count = min(len(frames) // 2, len(landmarks) // (NUM_LANDMARKS * 4))
+        self.frames = frames[:count * 2].reshape(count, 2)
+        self.landmarks = landmarks[:count * NUM_LANDMARKS * 4].reshape(count, NUM_LANDMARKS, 4)
+
+    @property
+    def session_id(self):
+        return self.meta['session_id']
+
+    @property
+    def exercise(self):
+        return self.meta['exercise']
+
+    def __len__(self):
+        return len(self.frames)
+
+    def __iter__(self):
+        """Yields (seq, timestamp, landmarks or None) per frame."""
+        present = ~np.isnan(self.landmarks[:, 0, 0])
+        for i in range(len(self.frames)):
+            seq, timestamp = self.frames[i]
+            yield int(seq), float(timestamp), (self.landmarks[i] if present[i] else None)
+
+
+def _map(path, dtype):
+    # np.memmap refuses empty files (session closed before its first frame)
+    if os.path.getsize(path) == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r")
+
+
+def list_sessions(directory):
+    """Session directories in the store, oldest first."""
+    sessions = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if os.path.isfile(os.path.join(path, META_FILE)):
+            sessions.append(path)
+    return sessions
@@ -0,0 +1,71 @@
+import numpy as np
+
+# =====================================================================
+# --- Landmark Index Table ---
+# =====================================================================
+# Static copy of mediapipe.solutions.pose.PoseLandmark, so the exercise
+# modules can index the landmark array without importing mediapipe.
+NOSE = 0
+LEFT_EYE_INNER = 1
+LEFT_EYE = 2
+LEFT_EYE_OUTER = 3
+RIGHT_EYE_INNER = 4
+RIGHT_EYE = 5
+RIGHT_EYE_OUTER = 6
+LEFT_EAR = 7
+RIGHT_EAR = 8
+MOUTH_LEFT = 9
+MOUTH_RIGHT = 10
+LEFT_SHOULDER = 11
+RIGHT_SHOULDER = 12
+LEFT_ELBOW = 13
+RIGHT_ELBOW = 14
+LEFT_WRIST = 15
+RIGHT_WRIST = 16
+LEFT_PINKY = 17
+RIGHT_PINKY = 18
+LEFT_INDEX = 19
+RIGHT_INDEX = 20
+LEFT_THUMB = 21
+RIGHT_THUMB = 22
+LEFT_HIP = 23
+RIGHT_HIP = 24
+LEFT_KNEE = 25
+RIGHT_KNEE = 26
+LEFT_ANKLE = 27
+RIGHT_ANKLE = 28
+LEFT_HEEL = 29
+RIGHT_HEEL = 30
+LEFT_FOOT_INDEX = 31
+RIGHT_FOOT_INDEX = 32
+
+NUM_LANDMARKS = 33
+
+# Each landmark's counterpart on the other side of the body (the nose is its own)
+MIRROR = (
+    NOSE,
+    RIGHT_EYE_INNER, RIGHT_EYE, RIGHT_EYE_OUTER,
+    LEFT_EYE_INNER, LEFT_EYE, LEFT_EYE_OUTER,
+    RIGHT_EAR, LEFT_EAR,
+    MOUTH_RIGHT, MOUTH_LEFT,
+) + tuple(i + 1 if i % 2 else i - 1 for i in range(LEFT_SHOULDER, NUM_LANDMARKS))
+
+# Columns of the landmark array
+X, Y, Z, VISIBILITY = 0, 1, 2, 3
+
+
+# =====================================================================
+# --- Extraction ---
+# =====================================================================
+def landmarks_to_array(pose_landmarks, out=None):
+    """
+    Converts MediaPipe `results.pose_landmarks` into a (33, 4) float32 array
+    of x, y, z, visibility. Returns None when no body was detected.
+    """
+    if not pose_landmarks:
+        return None
+
+    if out is None:
+        out = np.empty((NUM_LANDMARKS, 4), dtype=np.float32)
+    out[:] = [(lm.x, lm.y, lm.z, lm.visibility) for lm in pose_landmarks.landmark]
+    return out
@@ -0,0 +1,190 @@
+"""
+Replay / load generator for the WebSocket server.
+
+Drives N concurrent clients with frames from a .gbrec recording (see
+RECORD_DIR in server.py) and reports frame-to-feedback latency, dropped
+frames and server CPU:
+
+    python loadgen.py recordings/squats.gbrec --clients 20 --fps 15 --duration 60 --server-pid 1234
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import time
+
+import websockets
+
+from frame_protocol import encode_binary_frame
+from session_recorder import read_recording
+
+
+class ClientStats:
+    def __init__(self):
+        self.sent = 0
+        self.responses = 0
+        self.server_dropped = 0
+        self.backpressure_hints = 0
+        self.latencies = []
+        self.errors = 0
+
+
+# =====================================================================
+# --- Server CPU (Linux /proc) ---
+# =====================================================================
+def process_tree_cpu_seconds(pid):
+    """User + system CPU of a process and its direct children (inference workers)."""
+    pids = {pid}
+    for children in glob.glob(f"/proc/{pid}/task/*/children"):
+        with open(children) as f:
+            pids.update(int(child) for child in f.read().split())
+
+    ticks = 0
+    for p in pids:
+        try:
+            with open(f"/proc/{p}/stat") as f:
+                fields = f.read().rsplit(")", 1)[1].split()
+            ticks += int(fields[11]) + int(fields[12])  # utime, stime
+        except (FileNotFoundError, IndexError):
+            continue
+    return ticks / os.sysconf("SC_CLK_TCK")
+
+
+# =====================================================================
+# --- Synthetic Client ---
+# =====================================================================
+async def run_client(url, exercise, frames, fps, duration, stats):
+    loop = asyncio.get_running_loop()
+    sent_at = {}
+
+    async with websockets.connect(url, max_size=None) as websocket:
+        await websocket.send(json.dumps({'exercise': exercise, 'protocol': 'binary'}))
+
+        async def receive():
+            async for message in websocket:
+                data = json.loads(message)
+                if 'seq' in data:
+                    t = sent_at.pop(data['seq'], None)
+                    if t is not None:
+                        stats.latencies.append(time.perf_counter() - t)
+                    stats.responses += 1
+                elif 'backpressure' in data:
+                    stats.backpressure_hints += 1
+                    stats.server_dropped += data['backpressure']['dropped']
+
+        receiver = asyncio.create_task(receive())
+
+        # --- Send at a fixed rate, or at the recorded pace when fps == 0 ---
+        start = loop.time()
+        loop_length = frames[-1][0] + (1 / 30)
+        seq = 0
+        while loop.time() - start < duration:
+            t, width, height, jpeg = frames[seq % len(frames)]
+            sent_at[seq] = time.perf_counter()
+            await websocket.send(encode_binary_frame(jpeg, width, height, seq, int(time.time() * 1000)))
+            stats.sent += 1
+            seq += 1
+
+            if fps > 0:
+                next_send = start + seq / fps
+            else:
+                laps, index = divmod(seq, len(frames))
+                next_send = start + laps * loop_length + frames[index][0]
+            await asyncio.sleep(max(0.0, next_send - loop.time()))
+
+        # Give the last in-flight frames a moment to come back
+        await asyncio.sleep(1.0)
+        receiver.cancel()
+
+
+async def run_load(args):
+    header, frames = read_recording(args.recording)
+    if not frames:
+        raise SystemExit("Recording has no frames")
+    exercise = args.exercise or header['exercise']
+
+    stats = [ClientStats() for _ in range(args.clients)]
+    cpu_start = process_tree_cpu_seconds(args.server_pid) if args.server_pid else None
+    wall_start = time.perf_counter()
+
+    async def client(i):
+        await asyncio.sleep(i * args.ramp / max(1, args.clients))
+        try:
+            await run_client(args.url, exercise, frames, args.fps, args.duration, stats[i])
+        except Exception as e:
+            stats[i].errors += 1
+            print(f"Client {i} failed: {e}")
+
+    await asyncio.gather(*(client(i) for i in range(args.clients)))
+
+    wall = time.perf_counter() - wall_start
+    server_cpu = None
+    if args.server_pid:
+        server_cpu = (process_tree_cpu_seconds(args.server_pid) - cpu_start) / wall * 100
+    return build_report(exercise, args, stats, wall, server_cpu)
+
+
+# =====================================================================
+# --- Report ---
+# =====================================================================
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def build_report(exercise, args, stats, wall, server_cpu):
+    latencies = sorted(l for s in stats for l in s.latencies)
+    sent = sum(s.sent for s in stats)
+    responses = sum(s.responses for s in stats)
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 1)
+
+    return {
+        'exercise': exercise,
+        'clients': args.clients,
+        'target_fps': args.fps,
+        'duration_s': round(wall, 1),
+        'frames_sent': sent,
+        'frames_answered': responses,
+        'frames_dropped': sent - responses,
+        'drop_rate': round((sent - responses) / sent, 4) if sent else 0,
+        'server_reported_drops': sum(s.server_dropped for s in stats),
+        'backpressure_hints': sum(s.backpressure_hints for s in stats),
+        'throughput_fps': round(responses / wall, 1),
+        'latency_ms': {
+            'p50': ms(percentile(latencies, 50)),
+            'p95': ms(percentile(latencies, 95)),
+            'p99': ms(percentile(latencies, 99)),
+            'max': ms(latencies[-1] if latencies else None),
+        },
+        'server_cpu_percent': None if server_cpu is None else round(server_cpu, 1),
+        'client_errors': sum(s.errors for s in stats),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session against the server with N clients.")
+    parser.add_argument("recording", help=".gbrec file captured with RECORD_DIR")
+    parser.add_argument("--url", default="ws://localhost:8765")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--fps", type=float, default=15, help="Frames/sec per client (0 = recorded pace)")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds each client sends for")
+    parser.add_argument("--ramp", type=float, default=2, help="Seconds over which clients connect")
+    parser.add_argument("--exercise", help="Override the recorded exercise")
+    parser.add_argument("--server-pid", type=int, help="Measure CPU of this server process (Linux)")
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    report = asyncio.run(run_load(args))
+    print(json.dumps(report, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+import asyncio
+import bisect
+import functools
+import json
+import threading
+
+# =====================================================================
+# --- Metric Types (Prometheus text format, no external dependency) ---
+# =====================================================================
+REGISTRY = []
+
+# Seconds; frame stages range from sub-millisecond JSON work to ~100 ms inference
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.25, 0.5, 1.0, 2.5)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._lock = threading.Lock()  # observed from inference threads too
+        REGISTRY.append(self)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        super().__init__(name, help_text)
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {value}" for key, value in items]
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def __init__(self, name, help_text, function=None):
+        super().__init__(name, help_text)
+        self._values = {}
+        self._function = function  # evaluated at scrape time when set
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function):
+        self._function = function
+
+    def _samples(self):
+        if self._function is not None:
+            return [f"{self.name} {self._function()}"]
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {value}" for key, value in items]
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label key -> [bucket counts..., sum, count]
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def _samples(self):
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+
+        lines = []
+        for key, series in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(key, [('le', '+Inf')])} {series[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {series[-2]}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {series[-1]}")
+        return lines
+
+
+def render_all():
+    return "\n".join(metric.render() for metric in REGISTRY) + "\n"
+
+
+# =====================================================================
+# --- Frame Pipeline Metrics ---
+# =====================================================================
+STAGE_SECONDS = Histogram(
+    "gymbro_stage_seconds",
+    "Per-frame latency of each pipeline stage (parse, decode, pose, inference, logic, send)",
+)
+FRAMES = Counter("gymbro_frames_total", "Frames processed, by exercise")
+FRAMES_DROPPED = Counter("gymbro_frames_dropped_total", "Frames replaced in the mailbox before inference, by exercise")
+FEEDBACK_BYTES = Counter("gymbro_feedback_bytes_total", "Feedback message bytes sent to clients, by feedback mode")
+FEEDBACK_SKIPPED = Counter("gymbro_feedback_skipped_total", "Steady frames that needed no feedback message (delta mode)")
+FRAMES_EXTRAPOLATED = Counter(
+    "gymbro_frames_extrapolated_total", "Frames answered from extrapolated landmarks instead of inference, by exercise"
+)
+NO_LANDMARKS = Counter("gymbro_no_landmarks_total", "Frames where nobody was detected, by exercise")
+DECODE_FAILURES = Counter("gymbro_decode_failures_total", "Frames that could not be parsed or JPEG-decoded")
+FRAME_ERRORS = Counter("gymbro_frame_errors_total", "Unexpected errors while processing a frame")
+ACTIVE_SESSIONS = Gauge("gymbro_active_sessions", "Connected sessions streaming frames, by exercise")
+REJECTED_SESSIONS = Counter("gymbro_rejected_sessions_total", "Sessions refused because the pose pool was exhausted")
+RESUMED_SESSIONS = Counter("gymbro_resumed_sessions_total", "Sessions restored from a checkpoint on reconnect, by exercise")
+POOL_AVAILABLE = Gauge("gymbro_pose_pool_available", "Idle pose estimators / worker slots")
+POOL_WAITING = Gauge("gymbro_pose_pool_waiting", "Sessions waiting for a pose estimator")
+EXECUTOR_QUEUE = Gauge("gymbro_executor_queue_depth", "Jobs queued in the default thread pool (thread engine)")
+SCHEDULER_QUEUE = Gauge("gymbro_scheduler_queue_depth", "Frames waiting in the micro-batching scheduler")
+QUALITY_LEVEL = Gauge("gymbro_quality_level", "Current adaptive quality level (0 = full quality)")
+TRACKED_PEOPLE = Gauge("gymbro_tracked_people", "People tracked across multi-person sessions")
+COLD_START_SECONDS = Gauge(
+    "gymbro_cold_start_seconds",
+    "Seconds from process start to serving, by phase (imports, warmup, total)",
+)
+
+
+def default_executor_queue_depth():
+    # asyncio keeps its default executor private; read its work queue if it exists
+    executor = getattr(asyncio.get_running_loop(), "_default_executor", None)
+    work_queue = getattr(executor, "_work_queue", None)
+    return work_queue.qsize() if work_queue is not None else 0
+
+
+# =====================================================================
+# --- HTTP Endpoint ---
+# =====================================================================
+async def _handle_http(reader, writer, status=None, ready=None):
+    try:
+        request_line = await reader.readline()
+        # Drain headers; we only care about the path
+        while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+            pass
+
+        parts = request_line.decode(errors="replace").split()
+        path = parts[1] if len(parts) > 1 else "/"
+        content_type = "text/plain; version=0.0.4"
+        if path == "/metrics":
+            code, body = "200 OK", render_all()
+        elif path == "/status" and status is not None:
+            code, body = "200 OK", json.dumps(status())
+            content_type = "application/json"
+        elif path == "/ready" and ready is not None:
+            code, body = ("200 OK", "ready\n") if ready() else ("503 Service Unavailable", "warming up\n")
+        else:
+            code, body = "404 Not Found", "not found\n"
+
+        payload = body.encode()
+        writer.write(
+            f"HTTP/1.1 {code}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: close\r\n\r\n".encode() + payload
+        )
+        await writer.drain()
+    finally:
+        writer.close()
+
+
+async def start_metrics_server(host, port, status=None, ready=None):
+    """
+    Serves GET /metrics on a plain HTTP port next to the WebSocket server,
+    plus GET /status (the JSON returned by `status()`) and GET /ready
+    (200 once `ready()` is true, 503 before) when given.
+    """
+    return await asyncio.start_server(functools.partial(_handle_http, status=status, ready=ready), host, port)
@@ -0,0 +1,248 @@
+import asyncio
+import math
+
+import cv2 as cv
+import numpy as np
+
+from landmarks import LEFT_SHOULDER, VISIBILITY, landmarks_to_array
+from roi_tracker import DEFAULT_PADDING, MIN_CROP_PIXELS, MIN_VISIBILITY
+from metrics import TRACKED_PEOPLE
+
+# =====================================================================
+# --- Multi-person Pose (one camera, several people) ---
+# =====================================================================
+# MediaPipe Pose finds one body per image, so each person gets their own
+# Pose estimator (a PosePool slot) running on a crop around them:
+#
+#   1. decode the frame once
+#   2. every `detect_interval` frames, OpenCV's HOG people detector
+#      proposes boxes; boxes that overlap no tracked person start a track
+#      (while nobody is tracked, one Pose on the full frame also looks for
+#      anyone, which finds people HOG misses, e.g. lying down for a plank)
+#   3. all tracks run Pose on their crops concurrently, one thread each;
+#      a track's crop then follows its landmarks, like RoiTracker
+#
+# Decode and detection are shared and each person costs one Pose call on
+# a crop, run in parallel, so a frame's latency stays close to one
+# person's as the class grows (up to the free estimators / cores).
+# A track gets its id once Pose confirms a body in it and keeps it until
+# it is missed for MAX_MISSES frames in a row.
+DETECT_INTERVAL = 10   # frames between HOG passes
+DETECT_WIDTH = 480     # HOG runs on the frame downscaled to this width
+DETECT_MIN_WEIGHT = 0.5
+MATCH_IOU = 0.3        # a detection overlapping a track this much is that person
+DUPLICATE_IOU = 0.6    # two tracks overlapping this much have latched onto one person
+MAX_MISSES = 15        # frames without landmarks before a track is dropped
+
+
+def _iou(a, b):
+    w = min(a[2], b[2]) - max(a[0], b[0])
+    h = min(a[3], b[3]) - max(a[1], b[1])
+    if w <= 0 or h <= 0:
+        return 0.0
+    inter = w * h
+    return inter / ((a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter)
+
+
+def _padded(box, padding):
+    x0, y0, x1, y1 = box
+    pad = padding * max(x1 - x0, y1 - y0)
+    return (max(0.0, x0 - pad), max(0.0, y0 - pad), min(1.0, x1 + pad), min(1.0, y1 + pad))
+
+
+class PersonDetector:
+    """OpenCV's built-in HOG + linear SVM pedestrian detector; boxes normalized to the frame."""
+
+    def __init__(self, width=DETECT_WIDTH):
+        self.width = width
+        self._hog = cv.HOGDescriptor()
+        self._hog.setSVMDetector(cv.HOGDescriptor_getDefaultPeopleDetector())
+
+    def detect(self, rgb):
+        h, w = rgb.shape[:2]
+        gray = cv.cvtColor(rgb, cv.COLOR_RGB2GRAY)
+        if w > self.width:
+            gray = cv.resize(gray, (self.width, round(h * self.width / w)), interpolation=cv.INTER_AREA)
+        rects, weights = self._hog.detectMultiScale(gray, winStride=(8, 8), padding=(8, 8), scale=1.1)
+        if len(rects) == 0:
+            return []
+        weights = np.asarray(weights, dtype=np.float32).ravel()
+        keep = cv.dnn.NMSBoxes(rects.tolist(), weights.tolist(), DETECT_MIN_WEIGHT, 0.4)
+        gh, gw = gray.shape
+        return [(x / gw, y / gh, (x + rw) / gw, (y + rh) / gh)
+                for x, y, rw, rh in (rects[i] for i in np.ravel(keep))]
+
+
+class Track:
+    """One person: a PosePool slot's estimators and the crop it runs on."""
+
+    def __init__(self, poses, pose, box, padding=DEFAULT_PADDING):
+        self.id = None  # assigned once Pose confirms a body
+        self.poses = poses
+        self.pose = pose
+        self.box = box    # crop, normalized to the full frame
+        self.body = box   # bounding box of the last visible landmarks
+        self.padding = padding
+        self.misses = 0
+
+    def run(self, img):
+        """Runs Pose on this track's crop of `img`; returns full-frame landmarks or None."""
+        h, w = img.shape[:2]
+        x0, y0, x1, y1 = self.box
+        px0, py0, px1, py1 = int(x0 * w), int(y0 * h), math.ceil(x1 * w), math.ceil(y1 * h)
+        # Grow tiny crops (people far from the camera) around their center
+        if px1 - px0 < MIN_CROP_PIXELS:
+            px0 = max(0, min((px0 + px1 - MIN_CROP_PIXELS) // 2, w - MIN_CROP_PIXELS))
+            px1 = min(w, px0 + MIN_CROP_PIXELS)
+        if py1 - py0 < MIN_CROP_PIXELS:
+            py0 = max(0, min((py0 + py1 - MIN_CROP_PIXELS) // 2, h - MIN_CROP_PIXELS))
+            py1 = min(h, py0 + MIN_CROP_PIXELS)
+
+        results = self.pose.process(np.ascontiguousarray(img[py0:py1, px0:px1]))
+        landmarks = landmarks_to_array(results.pose_landmarks)
+        if landmarks is None:
+            return None
+        # Crop-relative -> full frame (z shares the x scale)
+        landmarks[:, 0] = landmarks[:, 0] * ((px1 - px0) / w) + px0 / w
+        landmarks[:, 1] = landmarks[:, 1] * ((py1 - py0) / h) + py0 / h
+        landmarks[:, 2] *= (px1 - px0) / w
+        return landmarks if self._follow(landmarks) else None
+
+    def _follow(self, landmarks):
+        """
+        Moves the crop when the body nears its edge; the Pose is reset when it
+        does. Returns False if these landmarks belong to someone else.
+        """
+        if landmarks[LEFT_SHOULDER:, VISIBILITY].mean() < MIN_VISIBILITY:
+            return True
+        visible = landmarks[landmarks[:, VISIBILITY] >= MIN_VISIBILITY, :2]
+        (x0, y0), (x1, y1) = visible.min(axis=0).tolist(), visible.max(axis=0).tolist()
+        body = (x0, y0, x1, y1)
+        # A confirmed person's body can't jump clear of where it was a frame
+        # ago: their crop has picked up a neighbour after they left it
+        if self.id is not None and _iou(body, self.body) == 0.0:
+            self.pose.reset()
+            return False
+        self.body = body
+
+        bx0, by0, bx1, by1 = self.box
+        margin = self.padding / 2 * max(x1 - x0, y1 - y0)
+        if ((bx0 == 0.0 or x0 - bx0 > margin) and (by0 == 0.0 or y0 - by0 > margin) and
+                (bx1 == 1.0 or bx1 - x1 > margin) and (by1 == 1.0 or by1 - y1 > margin)):
+            return True
+        self.box = _padded(self.body, self.padding)
+        self.pose.reset()  # tracking state refers to the old crop
+        return True
+
+
+class MultiPoseSession:
+    """
+    Estimator for a camera on several people, with PoseSession's interface:
+    `process` returns {track id: (33, 4) landmarks} (empty with nobody in view).
+
+    Starts with one checked-out pool slot; each further person takes an idle
+    slot from `checkout` (no slot free: that person isn't tracked), and slots
+    of people who leave go back through `release`.
+    """
+
+    def __init__(self, slot, checkout, release, build, complexity, decoder,
+                 max_people, detect_interval=DETECT_INTERVAL, detector=None):
+        self.complexity = complexity
+        self.decoder = decoder
+        self.max_people = max_people
+        self.detect_interval = detect_interval
+        self.detector = detector or PersonDetector()
+        self.tracks = []
+        self._spare = [slot]  # held slots not tracking anyone (the session keeps at least one)
+        self._checkout = checkout
+        self._release = release
+        self._build = build
+        self._next_id = 1
+        self._frames = 0
+
+    def _prepare(self, jpeg):
+        """Decodes the frame and, when due, runs the person detector (worker thread)."""
+        img, _ = self.decoder.decode(jpeg)
+        candidates = self.detector.detect(img) if self._frames % self.detect_interval == 0 else []
+        if not self.tracks and not candidates:
+            candidates = [(0.0, 0.0, 1.0, 1.0)]
+        self._frames += 1
+        return img, candidates
+
+    async def _start_tracks(self, candidates):
+        """Turns detections that overlap no track into new (unconfirmed) tracks."""
+        for box in candidates:
+            if len(self.tracks) >= self.max_people:
+                break
+            if any(_iou(box, track.body) >= MATCH_IOU for track in self.tracks):
+                continue
+            slot = self._spare.pop() if self._spare else self._checkout()
+            if slot is None:
+                break
+            pose = slot.get(self.complexity)
+            if pose is None:
+                pose = slot[self.complexity] = await asyncio.to_thread(self._build, self.complexity)
+            self.tracks.append(Track(slot, pose, _padded(box, DEFAULT_PADDING)))
+
+    async def process(self, jpeg):
+        img, candidates = await asyncio.to_thread(self._prepare, jpeg)
+        await self._start_tracks(candidates)
+        tracks = list(self.tracks)
+        results = await asyncio.gather(*(asyncio.to_thread(track.run, img) for track in tracks))
+
+        people = {}
+        found = []
+        lost = []
+        # Oldest tracks first, so when two latch onto one person the newer one goes
+        for track, landmarks in sorted(zip(tracks, results), key=lambda pair: pair[0].id or math.inf):
+            if landmarks is None:
+                track.misses += 1
+                # Unconfirmed tracks (a detection Pose saw nobody in) go straight away
+                if track.id is None or track.misses > MAX_MISSES:
+                    lost.append(track)
+                continue
+            if any(_iou(track.body, other.body) >= DUPLICATE_IOU for other in found):
+                lost.append(track)
+                continue
+            track.misses = 0
+            if track.id is None:
+                track.id = self._next_id
+                self._next_id += 1
+                TRACKED_PEOPLE.inc()
+            found.append(track)
+            people[track.id] = landmarks
+        for track in lost:
+            await self._drop(track)
+        return people
+
+    async def _drop(self, track):
+        self.tracks.remove(track)
+        if track.id is not None:
+            TRACKED_PEOPLE.dec()
+        await asyncio.to_thread(track.pose.reset)
+        if self._spare:
+            await self._release(track.poses)
+        else:
+            self._spare.append(track.poses)
+
+    async def set_complexity(self, complexity):
+        """Switches every tracked person's Pose, building models on first use (see PoseSession)."""
+        if complexity == self.complexity:
+            return
+        for track in self.tracks:
+            pose = track.poses.get(complexity)
+            if pose is None:
+                pose = track.poses[complexity] = await asyncio.to_thread(self._build, complexity)
+            else:
+                await asyncio.to_thread(pose.reset)
+            track.pose = pose
+        self.complexity = complexity
+
+    def close(self):
+        """Ends every track; returns all slots the session holds, for the pool to take back."""
+        for track in self.tracks:
+            if track.id is not None:
+                TRACKED_PEOPLE.dec()
+        slots = self._spare + [track.poses for track in self.tracks]
+        self.tracks, self._spare = [], []
+        return slots
@@ -0,0 +1,213 @@
+import asyncio
+import contextlib
+import time
+from frame_decoder import FrameDecoder
+from landmarks import landmarks_to_array
+from roi_tracker import RoiTracker
+from multi_person import MultiPoseSession, DETECT_INTERVAL
+from metrics import STAGE_SECONDS
+from warmup import warm_up, warmup_jpeg
+
+# Settings used for every Pose estimator (live server and offline analysis)
+DEFAULT_POSE_KWARGS = {'min_detection_confidence': 0.6, 'min_tracking_confidence': 0.6}
+
+
+class PoolExhausted(Exception):
+    """Raised when no Pose estimator can be checked out for a new session."""
+
+
+class EstimatorLost(Exception):
+    """Raised when a session's estimator can no longer run frames (its worker process died)."""
+
+
+class PoseSession:
+    """A Pose estimator checked out by one session, driven from threads."""
+
+    def __init__(self, poses, complexity, build, decoder, roi=None):
+        self.poses = poses  # model_complexity -> Pose, owned by the pool slot
+        self.complexity = complexity
+        self.pose = poses[complexity]
+        self.decoder = decoder
+        self.roi = roi  # RoiTracker, or None to always run on the full frame
+        self._build = build
+
+    def _run(self, jpeg):
+        start = time.perf_counter()
+        imgRGB, window = self.decoder.decode(jpeg, self.roi)
+        decoded = time.perf_counter()
+
+        results = self.pose.process(imgRGB)
+        landmarks = landmarks_to_array(results.pose_landmarks)
+        if self.roi and self.roi.update(landmarks, window):
+            self.pose.reset()  # tracking state refers to the old crop
+
+        STAGE_SECONDS.observe(decoded - start, stage="decode")
+        STAGE_SECONDS.observe(time.perf_counter() - decoded, stage="pose")
+        return landmarks
+
+    async def process(self, jpeg):
+        """
+        Decodes one JPEG frame and runs pose detection off the event loop.
+        Returns a (33, 4) landmark array, or None when nobody is in frame.
+        """
+        return await asyncio.to_thread(self._run, jpeg)
+
+    async def set_complexity(self, complexity):
+        """
+        Switches to a Pose with another model_complexity. The first switch
+        builds it (a model load); it then stays with the slot for reuse.
+        """
+        if complexity == self.complexity:
+            return
+        pose = self.poses.get(complexity)
+        if pose is None:
+            pose = self.poses[complexity] = await asyncio.to_thread(self._build, complexity)
+        else:
+            await asyncio.to_thread(pose.reset)
+        self.pose = pose
+        self.complexity = complexity
+        if self.roi:
+            self.roi.reset()  # the new model has no tracking yet: start full-frame
+
+
+class PosePool:
+    """
+    Bounded pool of MediaPipe Pose estimators.
+
+    Each estimator keeps temporal tracking state, so it is checked out by
+    exactly one session at a time and reset before the next session gets it.
+    With `roi_padding` set, every session crops frames to the body (RoiTracker).
+    `jpeg_decoder` / `decode_width` configure each session's FrameDecoder.
+    """
+
+    def __init__(self, size, max_waiters=0, acquire_timeout=10.0, roi_padding=None,
+                 jpeg_decoder="opencv", decode_width=None, **pose_kwargs):
+        self.size = max(1, size)
+        self.max_waiters = max_waiters
+        self.acquire_timeout = acquire_timeout
+        self.roi_padding = roi_padding
+        self.jpeg_decoder = jpeg_decoder
+        self.decode_width = decode_width
+        self.pose_kwargs = pose_kwargs
+        self.complexity = pose_kwargs.get('model_complexity', 1)
+
+        self._idle = None
+        self._waiters = 0
+
+    # --- Startup ---
+    async def start(self, complexities=(), jpeg=None):
+        """
+        Builds every estimator and warms it up (see warmup.py) on `jpeg`
+        (default: a synthetic frame). Each slot also gets a warm Pose for
+        every model_complexity in `complexities`, so switching quality
+        levels later costs no model load.
+        """
+        FrameDecoder(self.jpeg_decoder, self.decode_width)  # fail now if the decoder is unavailable
+        self._idle = asyncio.Queue()
+        jpeg = jpeg or warmup_jpeg()
+        complexities = sorted({self.complexity, *complexities})
+
+        # One slot per thread, all at once: its estimators by model_complexity (others are built on demand)
+        slots = await asyncio.gather(
+            *(asyncio.to_thread(self._build_and_warm, complexities, jpeg) for _ in range(self.size))
+        )
+        for poses in slots:
+            self._idle.put_nowait(poses)
+
+    def _build(self, complexity):
+        import mediapipe as mp  # deferred: loading it is most of the server's import time
+        return mp.solutions.pose.Pose(**{**self.pose_kwargs, 'model_complexity': complexity})
+
+    def _build_and_warm(self, complexities, jpeg):
+        decoder = FrameDecoder(self.jpeg_decoder, self.decode_width)
+        poses = {}
+        for complexity in complexities:
+            poses[complexity] = self._build(complexity)
+            warm_up(poses[complexity], decoder, jpeg)
+        return poses
+
+    # --- Checkout ---
+    @property
+    def healthy(self):
+        """Whether the pool can serve frames (estimators here live as long as the process)."""
+        return self._idle is not None
+
+    @property
+    def available(self):
+        return self._idle.qsize() if self._idle else 0
+
+    @property
+    def waiting(self):
+        return self._waiters
+
+    async def _acquire(self):
+        if self._idle.empty() and self._waiters >= self.max_waiters:
+            raise PoolExhausted("All pose estimators are busy")
+
+        self._waiters += 1
+        try:
+            return await asyncio.wait_for(self._idle.get(), self.acquire_timeout)
+        except asyncio.TimeoutError:
+            raise PoolExhausted("Timed out waiting for a pose estimator")
+        finally:
+            self._waiters -= 1
+
+    def _try_acquire(self):
+        # Extra people only get spare estimators: sessions waiting in line come first
+        if self._waiters or self._idle.empty():
+            return None
+        return self._idle.get_nowait()
+
+    async def _release(self, poses):
+        # Drop the previous user's tracking state before handing it out again
+        for pose in poses.values():
+            await asyncio.to_thread(pose.reset)
+        self._idle.put_nowait(poses)
+
+    @contextlib.asynccontextmanager
+    async def session(self):
+        """
+        Checks out one estimator for the lifetime of a client session.
+        Raises PoolExhausted if the waiting line is full or the wait times out.
+        """
+        poses = await self._acquire()
+        roi = RoiTracker(self.roi_padding) if self.roi_padding else None
+        decoder = FrameDecoder(self.jpeg_decoder, self.decode_width)
+        try:
+            yield PoseSession(poses, self.complexity, self._build, decoder, roi)
+        finally:
+            await self._release(poses)
+
+    @contextlib.asynccontextmanager
+    async def people_session(self, max_people, detect_interval=DETECT_INTERVAL):
+        """
+        Like `session`, for a camera on several people (MultiPoseSession). The
+        first estimator is checked out as usual; each further person tracked
+        takes an idle one only if there is one, and gives it back on leaving.
+        """
+        poses = await self._acquire()
+        # Full-size decoding: people far from the camera need every pixel of their crop
+        decoder = FrameDecoder(self.jpeg_decoder)
+        people = MultiPoseSession(poses, self._try_acquire, self._release, self._build, self.complexity,
+                                  decoder, max_people, detect_interval)
+        try:
+            yield people
+        finally:
+            for slot in people.close():
+                await self._release(slot)
+
+    async def process_batch(self, items):
+        """
+        Runs a list of (session, jpeg) pairs, for InferenceScheduler. Each frame
+        still takes its own thread, so batching gains nothing on this engine
+        (server.py doesn't batch with it). Failed frames come back as exceptions.
+        """
+        return await asyncio.gather(
+            *(session.process(jpeg) for session, jpeg in items),
+            return_exceptions=True,
+        )
+
+    def close(self):
+        while self._idle and not self._idle.empty():
+            for pose in self._idle.get_nowait().values():
+                pose.close()
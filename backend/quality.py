@@ -0,0 +1,94 @@
+import asyncio
+import logging
+from collections import namedtuple
+
+from metrics import QUALITY_LEVEL
+
+logger = logging.getLogger(__name__)
+
+# =====================================================================
+# --- Quality Ladder ---
+# =====================================================================
+# Level 0 is what every session got before the controller existed: the
+# default Pose model on 480px / q60 JPEGs. Each step down is cheaper for
+# the server (smaller frames to decode and convert, then the lite model)
+# and for the client (smaller resize + encode).
+QualityLevel = namedtuple("QualityLevel", "model_complexity max_width jpeg_quality")
+
+QUALITY_LEVELS = (
+    QualityLevel(1, 480, 60),
+    QualityLevel(1, 384, 55),
+    QualityLevel(0, 384, 55),
+    QualityLevel(0, 320, 50),
+    QualityLevel(0, 256, 45),
+)
+
+# Recover only once p95 latency is well under target, so a step back up
+# doesn't land straight over it again
+RECOVER_RATIO = 0.6
+
+
+class QualityController:
+    """
+    Picks one quality level for the whole server from the p95 server-side
+    frame latency (mailbox wait + parse + inference + logic + send) and the
+    inference backlog, re-evaluated every `interval` seconds.
+
+    Over target (or backlog above `max_backlog`): drop one level.
+    Under RECOVER_RATIO x target for `recover_after` intervals in a row:
+    go back up one level. Sessions pick up the new level on their next frame.
+    """
+
+    def __init__(self, target=0.15, interval=2.0, levels=QUALITY_LEVELS,
+                 recover_after=3, backlog=None, max_backlog=0):
+        self.target = target
+        self.interval = interval
+        self.levels = levels
+        self.recover_after = recover_after
+        self.backlog = backlog  # callable -> frames queued for inference, or None
+        self.max_backlog = max_backlog
+
+        self.level = 0
+        self._samples = []
+        self._calm = 0
+
+    @property
+    def current(self):
+        return self.levels[self.level]
+
+    def observe(self, seconds):
+        """Records one frame's server-side latency (event loop only)."""
+        self._samples.append(seconds)
+
+    def update(self):
+        """Closes the current window; returns True if the level changed."""
+        samples, self._samples = self._samples, []
+        p95 = 0.0
+        if samples:
+            samples.sort()
+            p95 = samples[int(0.95 * (len(samples) - 1))]
+        backlog = self.backlog() if self.backlog else 0
+
+        previous = self.level
+        if p95 > self.target or (self.max_backlog and backlog > self.max_backlog):
+            self._calm = 0
+            self.level = min(self.level + 1, len(self.levels) - 1)
+        elif p95 < self.target * RECOVER_RATIO:
+            self._calm += 1
+            if self._calm >= self.recover_after and self.level > 0:
+                self._calm = 0
+                self.level -= 1
+        else:
+            self._calm = 0
+
+        if self.level == previous:
+            return False
+        QUALITY_LEVEL.set(self.level)
+        logger.info("Quality level %d -> %d (p95 %.0f ms over %d frames, backlog %d): %s",
+                    previous, self.level, p95 * 1000, len(samples), backlog, self.current)
+        return True
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            self.update()
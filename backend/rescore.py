@@ -0,0 +1,126 @@
+"""
+Re-score stored landmark sessions without re-running pose inference.
+
+Replays sessions saved with LANDMARK_STORE_DIR (server.py) or
+--landmarks-dir (analyze_videos.py) through the exercise processors,
+optionally with overridden thresholds:
+
+    python rescore.py landmark_store/ --set pushups_logic.ELBOW_DOWN_THRESHOLD=85
+    python rescore.py landmark_store/ --set squats_logic.KNEE_DOWN=105 --out squats.jsonl
+"""
+import argparse
+import importlib
+import json
+import logging
+import os
+import time
+from collections import Counter
+
+from exercises import get_exercise, landmark_filter
+from landmark_filter import DEFAULT_FILTER, FILTERS
+from rule_engine import recompile_all
+from landmark_store import StoredSession, list_sessions
+
+
+def apply_overrides(overrides):
+    """Applies `module.CONSTANT=value` overrides to the logic modules."""
+    for override in overrides:
+        target, _, raw_value = override.partition("=")
+        module_name, _, attr = target.rpartition(".")
+        if not module_name or not raw_value:
+            raise SystemExit(f"Bad override {override!r}, expected module.CONSTANT=value")
+
+        module = importlib.import_module(module_name)
+        if not hasattr(module, attr):
+            raise SystemExit(f"{module_name} has no constant {attr}")
+        try:
+            value = json.loads(raw_value)
+        except ValueError:
+            raise SystemExit(f"Bad override {override!r}, the value must be JSON (e.g. 105, 0.5, true)") from None
+
+        # Numbers go in as given (KNEE_DOWN=107.5 must not become 107); flags and names are coerced
+        current = getattr(module, attr)
+        if isinstance(current, (bool, str)):
+            value = type(current)(value)
+        elif isinstance(current, (int, float)) and (isinstance(value, bool) or not isinstance(value, (int, float))):
+            raise SystemExit(f"{module_name}.{attr} is a number, got {raw_value!r}")
+        setattr(module, attr, value)
+
+    # Rule-based exercises baked their thresholds in at import time
+    recompile_all()
+
+
+def rescore_session(session, exercise_name=None, frame_sink=None, smoothing=DEFAULT_FILTER):
+    """Replays one stored session through its processor. Returns a summary dict."""
+    exercise_name = exercise_name or session.exercise
+    frame_processor, state = get_exercise(exercise_name)
+    if frame_processor is None:
+        raise ValueError(f"Unknown exercise: {exercise_name}")
+    # Stored landmarks are raw; smooth them on the stored clock, like the server did
+    smoother = landmark_filter(exercise_name, smoothing)
+
+    errors = Counter()
+    perfect_reps = 0
+    feedback = None
+
+    start = time.perf_counter()
+    for seq, timestamp, landmarks in session:
+        if smoother:
+            landmarks = smoother(landmarks, timestamp)
+        feedback, state = frame_processor(landmarks, state, now=timestamp)
+        if feedback['error']:
+            errors[feedback['error']] += 1
+        if feedback['perfect_rep']:
+            perfect_reps += 1
+        if frame_sink:
+            frame_sink.write(json.dumps({'session': session.session_id, 'seq': seq, 't': timestamp, **feedback}) + "\n")
+    elapsed = time.perf_counter() - start
+
+    return {
+        'session': session.session_id,
+        'exercise': exercise_name,
+        'frames': len(session),
+        'reps': feedback['reps'] if feedback else 0,
+        'perfect_rep_frames': perfect_reps,
+        'error_frames': dict(errors.most_common()),
+        'fps': round(len(session) / elapsed) if elapsed > 0 else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-run exercise logic over stored landmarks.")
+    parser.add_argument("store", help="Landmark store directory, or a single session directory")
+    parser.add_argument("sessions", nargs="*", help="Session ids to re-score (default: all)")
+    parser.add_argument("--exercise", help="Score as this exercise instead of the recorded one")
+    parser.add_argument("--set", action="append", default=[], metavar="MODULE.CONSTANT=VALUE",
+                        help="Override a threshold, e.g. squats_logic.KNEE_DOWN=105")
+    parser.add_argument("--out", help="Write per-frame feedback as JSONL to this file")
+    parser.add_argument("--smoothing", choices=[*FILTERS, "none"], default=DEFAULT_FILTER,
+                        help="Landmark filter, as the server's LANDMARK_FILTER")
+    args = parser.parse_args()
+
+    # Keep the processors' per-frame warnings out of the report
+    logging.basicConfig(level=logging.ERROR)
+    apply_overrides(args.set)
+
+    if os.path.isfile(os.path.join(args.store, "meta.json")):
+        paths = [args.store]
+    else:
+        paths = list_sessions(args.store)
+        if args.sessions:
+            paths = [p for p in paths if os.path.basename(p) in args.sessions]
+    if not paths:
+        raise SystemExit("No stored sessions found")
+
+    frame_sink = open(args.out, "w") if args.out else None
+    try:
+        for path in paths:
+            summary = rescore_session(StoredSession(path), args.exercise, frame_sink, args.smoothing)
+            print(json.dumps(summary))
+    finally:
+        if frame_sink:
+            frame_sink.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+import numpy as np
+
+from landmarks import LEFT_SHOULDER, VISIBILITY
+
+# Defaults for RoiTracker (server.py exposes the padding as ROI_PADDING)
+DEFAULT_PADDING = 0.3       # Added around the landmark box, as a fraction of its larger side
+MIN_VISIBILITY = 0.5        # Mean body-landmark visibility below this falls back to full frame
+MAX_CROP_FRACTION = 0.8     # Crops covering more of the frame than this aren't worth it
+MIN_CROP_PIXELS = 96        # Never hand Pose a crop narrower/shorter than this
+
+
+class RoiTracker:
+    """
+    Crops each frame to the region the previous frame's landmarks occupied,
+    so Pose converts and scans fewer pixels.
+
+    The crop only moves when the body gets close to its edge (hysteresis),
+    which keeps the image MediaPipe tracks across frames stable. When the
+    crop moves, the caller resets the estimator and the next frame runs on
+    the new crop with fresh detection. When confidence drops (or nobody is
+    found), the next frame is processed full-frame.
+    """
+
+    def __init__(self, padding=DEFAULT_PADDING, min_visibility=MIN_VISIBILITY):
+        self.padding = padding
+        self.min_visibility = min_visibility
+        self.box = None  # (x0, y0, x1, y1) normalized to the full frame; None = full frame
+        self._scale = np.ones(4, dtype=np.float32)
+        self._offset = np.zeros(4, dtype=np.float32)
+
+    def reset(self):
+        self.box = None
+
+    def crop(self, img):
+        """
+        Returns (image to run Pose on, window). Pass the window to `update`
+        with the landmarks Pose found in that image.
+        """
+        if self.box is None:
+            return img, None
+
+        h, w = img.shape[:2]
+        x0, y0, x1, y1 = self.box
+        px0, py0 = int(x0 * w), int(y0 * h)
+        px1, py1 = int(np.ceil(x1 * w)), int(np.ceil(y1 * h))
+        if px1 - px0 < MIN_CROP_PIXELS or py1 - py0 < MIN_CROP_PIXELS:
+            self.box = None
+            return img, None
+        return img[py0:py1, px0:px1], (px0, py0, px1, py1, w, h)
+
+    def update(self, landmarks, window):
+        """
+        Maps crop-relative landmarks back to full-frame coordinates (in place)
+        and picks the crop for the next frame: the new box, or the full frame
+        when confidence is too low for one.
+        Returns True when the crop changed, i.e. the estimator should be reset
+        because its tracking state refers to a different image.
+        """
+        if landmarks is not None and window is not None:
+            px0, py0, px1, py1, w, h = window
+            scale, offset = self._scale, self._offset
+            scale[0] = scale[2] = (px1 - px0) / w  # z uses the same scale as x
+            scale[1] = (py1 - py0) / h
+            offset[0], offset[1] = px0 / w, py0 / h
+            landmarks *= scale
+            landmarks += offset
+
+        previous = self.box
+        self.box = self._next_box(landmarks)
+        return self.box != previous
+
+    def _next_box(self, landmarks):
+        if landmarks is None:
+            return None
+        body = landmarks[LEFT_SHOULDER:]
+        if body[:, VISIBILITY].mean() < self.min_visibility:
+            return None
+
+        visible = landmarks[landmarks[:, VISIBILITY] >= self.min_visibility]
+        x0, y0 = visible[:, :2].min(axis=0).tolist()
+        x1, y1 = visible[:, :2].max(axis=0).tolist()
+
+        # Keep the current crop while the body stays well inside it
+        if self.box is not None:
+            bx0, by0, bx1, by1 = self.box
+            margin = self.padding / 2 * max(x1 - x0, y1 - y0)
+            # (an edge already at the frame border can't move any further out)
+            if ((bx0 == 0.0 or x0 - bx0 > margin) and (by0 == 0.0 or y0 - by0 > margin) and
+                    (bx1 == 1.0 or bx1 - x1 > margin) and (by1 == 1.0 or by1 - y1 > margin)):
+                return self.box
+
+        pad = self.padding * max(x1 - x0, y1 - y0)
+        box = (max(0.0, x0 - pad), max(0.0, y0 - pad), min(1.0, x1 + pad), min(1.0, y1 + pad))
+        if (box[2] - box[0]) * (box[3] - box[1]) > MAX_CROP_FRACTION:
+            return None
+        return box
@@ -0,0 +1,526 @@
+import ast
+import logging
+import math
+import time
+
+import numpy as np
+
+from session_state import SessionState
+from landmarks import LEFT_SHOULDER, VISIBILITY, MIRROR
+
+logger = logging.getLogger(__name__)
+
+# =====================================================================
+# --- Spec Format ---
+# =====================================================================
+# An exercise spec is a plain dict:
+#
+#   'angles':      {name: (a, b, c)}   joint angle at b, landmark indices
+#   'tilts':       {name: (p, q)}      abs(degrees) of the line q - p
+#   'coords':      {name: (p, axis)}   x (axis 0) or y (axis 1) of landmark p
+#   'distances':   {name: (p, q)}      distance between p and q (x, y)
+#   'absdiffs':    {name: (f1, f2)}    abs(f1 - f2) of two earlier features
+#   'mirror':      landmarks above are the left side's; frames where the right
+#                  shoulder is more visible use the right side's instead. A dict
+#                  {'by': landmark, 'ties': 'left' | 'right'} compares another
+#                  landmark pair and picks the side equal visibilities go to
+#   'values':      {name: initial}  per-session values (latched positions,
+#                  running extremes) that conditions can read and transitions set
+#   'visible':     {'landmarks', 'min', 'error'}  any of these landmarks below
+#                  'min' visibility: report 'error', skip the rules and restart
+#                  any debounce
+#   'errors':      [(message, condition[, stages]), ...]  priority order, first
+#                  hit wins; 'stages' limits a check to frames starting in them
+#   'tempo':       {'error', 'stage', 'min_interval'}  "too fast" check after the errors
+#   'initial_stage': stage name
+#   'transitions': [{'from', 'to', 'when', 'rep', 'frames', 'errors', 'otherwise', 'cue'}, ...]
+#                  first hit wins; 'from' = a stage or a list of them (omitted =
+#                  any stage), 'rep' counts a rep,
+#                  'frames' = frames 'when' must hold (debounce, default 1),
+#                  'errors' = checks that judge the rep instead of the frame's
+#                  errors (a hit is shown and spoils perfect_rep), 'otherwise' =
+#                  checks for frames in 'from' where it doesn't fire (shown if
+#                  the frame has no other error), 'cue' = feedback on the frame
+#                  it fires if there is no error (or [(cue, condition), ..., cue]:
+#                  the first that holds), 'set' = {value: expression} applied when
+#                  it fires, 'gate_on_errors' = only fires on error-free frames,
+#                  'timer': 'resume' = restarts a 'timer' spec's clock
+#   'debounce':    how 'frames' are counted: "consecutive" (default; a miss
+#                  restarts the count) or "decay" (a frame where no transition
+#                  holds takes one off every count, a hit clears the others')
+#   'gate_on_errors': only move between stages on error-free frames
+#   'cues':        {stage: feedback}  shown when there is no error ("Good Form" otherwise)
+#   'not_tracking': (error, feedback) with nobody in view (default NOT_TRACKING)
+#   'timer':       {'paused': stage}  a timed hold instead of reps: 'reps' reports
+#                  the whole seconds spent outside the paused stage, which pauses
+#                  the clock when entered (from a transition, or on a frame with
+#                  nobody in view or a landmark error) and is left by transitions
+#                  marked 'timer': 'resume'; perfect_rep is set on every
+#                  error-free frame. The clock lives in the TIMER_VALUES values
+#
+# Conditions are Python expressions over feature and value names and numbers,
+# using <, <=, >, >= (chains allowed), +, -, *, /, and, or, not, abs, min and
+# max (and/or short-circuit on None values like Python's). UPPER_CASE names
+# are looked up in the namespace given to ExerciseRules (the exercise
+# module), so thresholds stay overridable module constants (rescore.py
+# --set); so are 'min', 'min_interval' and 'frames' when given as names.
+NOT_TRACKING = ("Not tracking. Are you in frame?", "Not tracking")
+OUT_OF_FRAME = "Make sure you are fully in frame"
+DEFAULT_CUE = "Good Form"
+TIMER_VALUES = {'start_time': 0, 'pause_start_time': 0, 'total_paused_time': 0, 'last_elapsed_time': 0}
+
+# np.degrees is exactly x * (180 / pi), so tilts can finish on Python floats
+RAD2DEG = 180.0 / math.pi
+# After the arctan2 pass an angle is plain float64 arithmetic, which Python
+# floats do bit for bit like numpy: same operation order as calculate_angle
+ANGLE = "abs(({c} - {a}) * 180.0 / PI)"
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub,
+    ast.Compare, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Name, ast.Load, ast.Constant,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.Call,
+)
+_FUNCTIONS = ('abs', 'min', 'max')
+
+_REGISTRY = []
+
+
+# =====================================================================
+# --- Condition Compiler ---
+# =====================================================================
+class _Thresholds(ast.NodeTransformer):
+    """Inlines UPPER_CASE constants from the exercise module as literals."""
+
+    def __init__(self, features, namespace, source):
+        self.features = features
+        self.namespace = namespace
+        self.source = source
+
+    def visit_Name(self, node):
+        if node.id in self.features or node.id in _FUNCTIONS:
+            return node
+        if node.id in self.namespace:
+            return ast.copy_location(ast.Constant(float(self.namespace[node.id])), node)
+        raise ValueError(f"Unknown name {node.id!r} in condition {self.source!r}")
+
+
+def _condition(source, features, namespace):
+    """Validates a condition and returns it as Python source over the feature locals."""
+    tree = ast.parse(source, mode='eval')
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise ValueError(f"Unsupported {type(node).__name__} in condition {source!r}")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise ValueError(f"Unsupported constant in condition {source!r}")
+        if isinstance(node, ast.Call) and not (
+                isinstance(node.func, ast.Name) and node.func.id in _FUNCTIONS and not node.keywords):
+            raise ValueError(f"Unsupported call in condition {source!r}")
+    tree = ast.fix_missing_locations(_Thresholds(features, namespace, source).visit(tree))
+    return f"({ast.unparse(tree.body)})"
+
+
+def _constant(value, namespace):
+    """A spec number, or the name of a module constant holding it."""
+    return namespace[value] if isinstance(value, str) else value
+
+
+# =====================================================================
+# --- Session State ---
+# =====================================================================
+class RuleState(SessionState):
+    """
+    State for ExerciseRules. Specs with 'values' subclass it with a slot per
+    value and pass the initial values (ExerciseRules.values) on.
+    """
+    __slots__ = ('rep_counter', 'stage', 'last_rep_time', 'pending')
+
+    def __init__(self, stage=None, values=None):
+        self.rep_counter = 0
+        self.stage = stage
+        self.last_rep_time = 0
+        self.pending = None  # debounced specs: frames counted per transition
+        for name, value in (values or {}).items():
+            setattr(self, name, value)
+
+
+# =====================================================================
+# --- Compiled Exercise ---
+# =====================================================================
+class ExerciseRules:
+    """
+    Compiles an exercise spec once into a fast per-frame evaluator:
+    the geometry (every angle and tilt) is one vectorized gather/arctan2
+    pass over the (33, 4) landmark array (with a gather table per side for
+    'mirror' specs), and the thresholds, error priorities and transition
+    conditions become one generated Python function over the resulting
+    floats (a handful of float compares is far cheaper than a numpy call
+    per comparison at this size; the angles finish there too).
+
+    `process` has the same signature and output as the hand-written
+    processors: (landmarks or None, state, now=None) -> (feedback dict, state),
+    where state is a RuleState from `new_state()` (or the exercise's
+    subclass, for specs with 'values'), updated in place.
+    """
+
+    def __init__(self, name, spec, namespace):
+        self.name = name
+        self.spec = spec
+        self.namespace = namespace
+        self.compile()
+        _REGISTRY.append(self)
+
+    def compile(self):
+        spec, namespace = self.spec, self.namespace
+        angles = spec.get('angles', {})
+        tilts = spec.get('tilts', {})
+        coords = spec.get('coords', {})
+        distances = spec.get('distances', {})
+        absdiffs = spec.get('absdiffs', {})
+        self.values = dict(spec.get('values', {}))
+        self._timer = spec.get('timer')
+        if self._timer:
+            self.values.update(TIMER_VALUES)
+        self.feature_names = list(angles) + list(tilts) + list(coords) + list(distances) + list(absdiffs)
+        features = set(self.feature_names) | set(self.values)
+        for name in [*self.feature_names, *self.values]:
+            if not name.isidentifier() or name.isupper():
+                raise ValueError(f"Feature and value names must be lower_case identifiers, got {name!r}")
+
+        # --- Geometry: one gather / subtract / arctan2 for angles and tilts ---
+        # Laid out as [end x | end y | start x | start y] like AngleEngine; the
+        # ends are the angle c points, the angle a points, then the tilt q points.
+        # Coordinates, distance endpoints and then 'visible' visibilities come
+        # from one more gather.
+        mirror = spec.get('mirror', False)
+        self._mirror = None
+        if mirror:
+            mirror = {} if mirror is True else mirror
+            by = mirror.get('by', LEFT_SHOULDER)
+            self._mirror = (by, MIRROR[by], mirror.get('ties', 'left') == 'right')
+        self._gathers, self._coord_gathers = [], []
+        visible = spec.get('visible')
+        for side in ((lambda i: i), MIRROR.__getitem__)[:2 if self._mirror else 1]:
+            table = np.asarray([[side(i) for i in t] for t in angles.values()], dtype=np.intp).reshape(-1, 3)
+            lines = np.asarray([[side(i) for i in t] for t in tilts.values()], dtype=np.intp).reshape(-1, 2)
+            ends = np.concatenate([table[:, 2], table[:, 0], lines[:, 1]])
+            starts = np.concatenate([table[:, 1], table[:, 1], lines[:, 0]])
+            self._gathers.append(np.concatenate([ends * 4, ends * 4 + 1, starts * 4, starts * 4 + 1]))
+            points = [side(p) * 4 + axis for p, axis in coords.values()]
+            for p, q in distances.values():
+                points += [side(p) * 4, side(p) * 4 + 1, side(q) * 4, side(q) * 4 + 1]
+            if visible:
+                points += [side(p) * 4 + VISIBILITY for p in visible['landmarks']]
+            self._coord_gathers.append(np.asarray(points, dtype=np.intp))
+        k = len(angles)
+        n = 2 * k + len(tilts)
+        self._k, self._n = k, n
+        self._points = np.empty(4 * n, dtype=np.float32)
+        self._coords = np.empty(len(self._coord_gathers[0]), dtype=np.float32)
+        self._deltas = np.empty(2 * n, dtype=np.float64)
+        self._atan = np.empty(n, dtype=np.float64)
+        # Views made once: slicing per frame costs as much as the ufuncs themselves
+        self._ends, self._starts = self._points[:2 * n], self._points[2 * n:]
+        self._dy, self._dx = self._deltas[n:], self._deltas[:n]
+        self._visible = None
+        if visible:
+            self._visible = (float(_constant(visible['min'], namespace)), visible['error'], len(visible['landmarks']))
+
+        # --- Rules: one generated function, features as locals ---
+        lines_src = ["def evaluate(atan, coords, stage, values):"]
+        if self.values:
+            lines_src.append(f"    {', '.join(self.values)}, = values")
+        for i, name in enumerate(angles):
+            lines_src.append(f"    {name} = {ANGLE.format(c=f'atan[{i}]', a=f'atan[{k + i}]')}")
+            lines_src.append(f"    if {name} > 180.0:")
+            lines_src.append(f"        {name} = 360 - {name}")
+        for j, name in enumerate(tilts):
+            lines_src.append(f"    {name} = abs(atan[{2 * k + j}] * RAD2DEG)")
+        for j, name in enumerate(coords):
+            lines_src.append(f"    {name} = coords[{j}]")
+        for j, name in enumerate(distances):
+            j = len(coords) + 4 * j  # x, y of p, then x, y of q
+            lines_src.append(f"    {name} = dist((coords[{j}], coords[{j + 1}]), (coords[{j + 2}], coords[{j + 3}]))")
+        for name, (a, b) in absdiffs.items():
+            lines_src.append(f"    {name} = abs({a} - {b})")
+
+        def first_hit(variable, checks):
+            lines_src.append(f"    {variable} = -1")
+            for i, (_, source, *stages) in enumerate(checks):
+                keyword = "if" if i == 0 else "elif"
+                condition = _condition(source, features, namespace)
+                if stages:
+                    stages = (stages[0],) if isinstance(stages[0], str) else tuple(stages[0])
+                    condition = f"stage in {stages!r} and {condition}"
+                lines_src.append(f"    {keyword} {condition}:")
+                lines_src.append(f"        {variable} = {i}")
+
+        errors = spec.get('errors', [])
+        first_hit("error", errors)
+        transitions = spec.get('transitions', [])
+        cues, updates = [], []
+        for i, t in enumerate(transitions):
+            first_hit(f"verdict{i}", t.get('errors', []))
+            first_hit(f"other{i}", t.get('otherwise', []))
+            lines_src.append(f"    hit{i} = {_condition(t['when'], features, namespace)}")
+            # Cue choice and value updates only matter on frames where it holds
+            cue, sets = t.get('cue'), t.get('set', {})
+            cues.append(f"cue{i}" if isinstance(cue, list) else "-1")
+            updates.append(f"update{i}" if sets else "None")
+            if not (isinstance(cue, list) or sets):
+                continue
+            lines_src.append(f"    cue{i}, update{i} = -1, None")
+            lines_src.append(f"    if hit{i}:")
+            if sets:
+                expressions = [
+                    _condition(value, features, namespace) if isinstance(value, str) else repr(value)
+                    for value in sets.values()
+                ]
+                lines_src.append(f"        update{i} = ({', '.join(expressions)},)")
+            if isinstance(cue, list):
+                for j, entry in enumerate(cue):
+                    if isinstance(entry, str):
+                        if j != len(cue) - 1:
+                            raise ValueError(f"Only the last cue of a list can be unconditional, got {entry!r}")
+                        lines_src.append(f"        {'else' if j else 'if True'}:")
+                    else:
+                        keyword = "if" if j == 0 else "elif"
+                        lines_src.append(f"        {keyword} {_condition(entry[1], features, namespace)}:")
+                    lines_src.append(f"            cue{i} = {j}")
+        hits = "".join(f"hit{i}, " for i in range(len(transitions)))
+        verdicts = "".join(f"verdict{i}, " for i in range(len(transitions)))
+        others = "".join(f"other{i}, " for i in range(len(transitions)))
+        lines_src.append(f"    return error, ({hits}), ({verdicts}), ({others}), "
+                         f"({''.join(c + ', ' for c in cues)}), ({''.join(u + ', ' for u in updates)})")
+        self.source = "\n".join(lines_src)
+
+        scope = {'RAD2DEG': RAD2DEG, 'PI': math.pi, 'dist': math.dist}
+        exec(compile(self.source, f"<rules {self.name}>", "exec"), scope)
+        self._evaluate = scope['evaluate']
+
+        self._error_messages = [message for message, *_ in errors]
+        def stages(value):
+            return None if value is None else (value,) if isinstance(value, str) else tuple(value)
+
+        def cue_messages(cue):
+            if isinstance(cue, list):
+                return [entry if isinstance(entry, str) else entry[0] for entry in cue]
+            return cue
+
+        self._transitions = [
+            (stages(t.get('from')), t['to'], t.get('rep', False), int(_constant(t.get('frames', 1), namespace)),
+             [message for message, *_ in t.get('errors', [])], cue_messages(t.get('cue')),
+             tuple(t.get('set', {})), t.get('gate_on_errors', False), t.get('timer') == 'resume')
+            for t in transitions
+        ]
+        self._otherwise = [
+            (i, stages(t.get('from')), [message for message, *_ in t['otherwise']])
+            for i, t in enumerate(transitions) if t.get('otherwise')
+        ]
+        self._debounced = any(t[3] > 1 for t in self._transitions)
+        self._decay = spec.get('debounce', 'consecutive') == 'decay'
+        if spec.get('debounce', 'consecutive') not in ('consecutive', 'decay'):
+            raise ValueError(f"Unknown debounce {spec['debounce']!r} in {self.name}")
+
+        tempo = spec.get('tempo')
+        self._tempo = None
+        if tempo:
+            self._tempo = (tempo['error'], tempo['stage'], _constant(tempo['min_interval'], namespace))
+
+        self.initial_stage = spec['initial_stage']
+        self._gate_on_errors = spec.get('gate_on_errors', False)
+        self._cues = spec.get('cues', {})
+        self._not_tracking = spec.get('not_tracking', NOT_TRACKING)
+
+    def side(self, landmarks):
+        """0 for the spec's own landmarks, 1 for the mirrored side ('mirror' specs)."""
+        if self._mirror is None:
+            return 0
+        own, other, ties_other = self._mirror
+        own, other = landmarks[own, VISIBILITY], landmarks[other, VISIBILITY]
+        return int(own <= other if ties_other else own < other)
+
+    def evaluate(self, landmarks, stage=None, side=0, values=()):
+        """
+        (index of the first error that holds or -1, tuple of transition hits,
+        tuple of each transition's first rep error or -1, of its first
+        'otherwise' check or -1, of its chosen cue or -1, and of its 'set'
+        results or None) for one frame, or None when one of the spec's
+        'visible' landmarks is under its threshold.
+        """
+        flat = landmarks.ravel()
+        # The method with mode='clip' skips np.take's dispatch and output buffering (indices are always valid)
+        flat.take(self._coord_gathers[side], out=self._coords, mode='clip')
+        coords = self._coords.tolist()
+        if self._visible is not None:
+            threshold, _, count = self._visible
+            if min(coords[-count:]) < threshold:
+                return None
+
+        flat.take(self._gathers[side], out=self._points, mode='clip')
+        np.subtract(self._ends, self._starts, out=self._deltas, dtype=np.float64)
+        np.arctan2(self._dy, self._dx, out=self._atan)
+        return self._evaluate(self._atan.tolist(), coords, stage, values)
+
+    def angles(self):
+        """The joint angles of the last frame evaluated, by name (for debug logs)."""
+        atan, k = self._atan.tolist(), self._k
+        angles = {}
+        for i, name in enumerate(self.feature_names[:k]):
+            angle = abs((atan[i] - atan[k + i]) * 180.0 / math.pi)
+            angles[name] = round(min(angle, 360 - angle), 1)
+        return angles
+
+    def new_state(self):
+        return RuleState(self.initial_stage, self.values)
+
+    def process(self, landmarks, state, now=None):
+        rep_counter = state.rep_counter
+        stage = state.stage
+        last_rep_time = state.last_rep_time
+        pending = state.pending
+
+        current_error = ""
+        visual_feedback = DEFAULT_CUE
+        perfect_rep = False
+        current_time = time.time() if now is None else now
+        if self._timer:
+            elapsed_time = self._elapsed(state, stage, current_time)
+
+        try:
+            result = None
+            if landmarks is not None:
+                values = tuple(getattr(state, name) for name in self.values)
+                result = self.evaluate(landmarks, stage, self.side(landmarks), values)
+            if landmarks is None:
+                current_error, visual_feedback = self._not_tracking
+                if self._timer:
+                    stage = self._pause(state, stage, current_time)
+            elif result is None:
+                current_error = visual_feedback = self._visible[1]
+                pending = None
+            else:
+                error, hits, verdicts, others, cues, updates = result
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("%s angles: %s", self.name, self.angles())
+
+                # --- Prioritized errors ---
+                if error >= 0:
+                    current_error = self._error_messages[error]
+
+                if self._tempo and not current_error:
+                    message, tempo_stage, min_interval = self._tempo
+                    if stage == tempo_stage and (current_time - last_rep_time) < min_interval:
+                        current_error = message
+
+                # --- Stage machine ---
+                cue = None
+                fired = -1
+                start_stage = stage
+                if not (self._gate_on_errors and current_error):
+                    if self._debounced:
+                        pending = self._count(pending, hits)
+                    for i, (from_stages, to_stage, rep, frames, rep_errors, fired_cue, sets,
+                            gated, resume) in enumerate(self._transitions):
+                        if not hits[i] or (from_stages is not None and stage not in from_stages):
+                            continue
+                        if gated and current_error:
+                            continue
+                        if frames > 1 and pending[i] < frames:
+                            break
+                        fired = i
+                        if self._timer:
+                            if resume:
+                                self._resume(state, current_time)
+                            to_stage = self._pause(state, stage, current_time, to_stage)
+                        stage = to_stage
+                        cue = fired_cue
+                        if isinstance(cue, list):
+                            cue = cue[cues[i]] if cues[i] >= 0 else None
+                        for name, value in zip(sets, updates[i] or ()):
+                            setattr(state, name, value)
+                        if rep:
+                            rep_counter += 1
+                            last_rep_time = current_time
+                            if rep_errors:
+                                perfect_rep = verdicts[i] < 0
+                                if not perfect_rep:
+                                    current_error = rep_errors[verdicts[i]]
+                            else:
+                                perfect_rep = not current_error
+                        break
+
+                if not current_error:
+                    for i, from_stages, messages in self._otherwise:
+                        if i != fired and others[i] >= 0 and (from_stages is None or start_stage in from_stages):
+                            current_error = messages[others[i]]
+                            break
+
+                if current_error:
+                    visual_feedback = current_error
+                elif cue is not None:
+                    visual_feedback = cue
+                else:
+                    visual_feedback = self._cues.get(stage, DEFAULT_CUE)
+
+        except Exception as e:
+            logger.warning("Landmark error (%s): %s", self.name, e)
+            current_error = OUT_OF_FRAME
+            visual_feedback = OUT_OF_FRAME
+            perfect_rep = False
+            if self._timer:
+                stage = self._pause(state, stage, current_time)
+
+        if self._timer:
+            perfect_rep = not current_error
+            state.last_elapsed_time = elapsed_time
+
+        feedback_data = {
+            "reps": int(elapsed_time) if self._timer else rep_counter,
+            "error": current_error,
+            "adjustment": visual_feedback,
+            "perfect_rep": perfect_rep,
+        }
+        state.rep_counter = rep_counter
+        state.stage = stage
+        state.last_rep_time = last_rep_time
+        state.pending = pending
+        return feedback_data, state
+
+    def _elapsed(self, state, stage, now):
+        """Seconds on the clock at the start of this frame (a 'timer' spec)."""
+        if state.start_time <= 0:
+            return 0
+        # The pause in progress, if resting, comes off too
+        paused = self._timer['paused']
+        current_pause = now - state.pause_start_time if stage == paused and state.pause_start_time > 0 else 0
+        elapsed = now - state.start_time - state.total_paused_time - current_pause
+        # Negative right after a resume: keep the last reading
+        return state.last_elapsed_time if elapsed < 0 else elapsed
+
+    def _resume(self, state, now):
+        if state.start_time == 0:
+            state.start_time = now
+        else:
+            state.total_paused_time += now - state.pause_start_time
+
+    def _pause(self, state, stage, now, to_stage=None):
+        """Moves to `to_stage` (default: the paused stage), noting when the clock stopped."""
+        paused = self._timer['paused']
+        to_stage = paused if to_stage is None else to_stage
+        if to_stage == paused and stage != paused:
+            state.pause_start_time = now
+        return to_stage
+
+    def _count(self, counts, hits):
+        """Per-transition frame counts for 'frames' debouncing, after this frame's hits."""
+        if counts is None or len(counts) != len(hits):
+            counts = [0] * len(hits)
+        if self._decay and not any(hits):
+            return [max(0, count - 1) for count in counts]
+        return [count + 1 if hit else 0 for count, hit in zip(counts, hits)]
+
+
+def recompile_all():
+    """Re-reads thresholds from every spec's namespace (after constant overrides)."""
+    for rules in _REGISTRY:
+        rules.compile()
@@ -1,31 +1,391 @@
+# ruff: noqa: E402
+import time
+
+# --- Cold Start Clock ---
+# Read before every other import: the pose and exercise modules below are a
+# large part of a cold start (see main), hence the imports after a statement.
+STARTED = time.perf_counter()
+
 import asyncio
+import os
+import uuid
 import websockets
-import cv2 as cv
-import mediapipe as mp
-import numpy as np
 import json
-import base64
-import traceback
+import logging
 
 # --- Import our new logic modules ---
-from shoulder_press_logic import process_shoulder_press
-from barbell_curl_logic import process_barbell_curl
-from plank_logic import process_plank
-from pushups_logic import process_pushups
-from squats_logic import process_squats
+from exercises import get_exercise, get_people_exercise, inference_cadence, landmark_filter
+from pose_pool import PosePool, PoolExhausted, EstimatorLost, DEFAULT_POSE_KWARGS
+from inference_scheduler import InferenceScheduler
+from frame_protocol import decode_frame, negotiate_protocol, FrameFormatError, PROTOCOL_BINARY
+from feedback_encoder import FeedbackEncoder, negotiate_feedback
+from frame_mailbox import FrameMailbox, read_into_mailbox
+from session_recorder import SessionRecorder
+from landmark_store import LandmarkWriter
+from session_store import SessionStore
+from quality import QualityController
+from landmark_predictor import LandmarkPredictor
+from landmark_filter import DEFAULT_FILTER, make_filter
+from warmup import warmup_jpeg
+from structured_log import SESSION_ID, configure_logging, forget_session, shutdown_logging
+from metrics import (
+    start_metrics_server, default_executor_queue_depth,
+    STAGE_SECONDS, FRAMES, FRAMES_DROPPED, FRAMES_EXTRAPOLATED, NO_LANDMARKS, FEEDBACK_BYTES, FEEDBACK_SKIPPED, DECODE_FAILURES, FRAME_ERRORS,
+    ACTIVE_SESSIONS, REJECTED_SESSIONS, RESUMED_SESSIONS, POOL_AVAILABLE, POOL_WAITING, EXECUTOR_QUEUE, SCHEDULER_QUEUE,
+    QUALITY_LEVEL, COLD_START_SECONDS,
+)
+
+logger = logging.getLogger("server")  # not __name__: this module runs as __main__
+
+# --- Listen Address ---
+# Several nodes can run on one host behind gateway.py, each on its own
+# PORT / METRICS_PORT.
+HOST = os.environ.get("HOST", "0.0.0.0")
+PORT = int(os.environ.get("PORT", 8765))
+
+# --- Pose Pool Configuration ---
+# INFERENCE_ENGINE: "threads" (one process) or "processes" (one Pose per slot in N worker processes)
+INFERENCE_ENGINE = os.environ.get("INFERENCE_ENGINE", "threads").lower()
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", os.cpu_count() or 1))
+POSE_POOL_SIZE = int(os.environ.get("POSE_POOL_SIZE", os.cpu_count() or 1))
+POSE_POOL_MAX_WAITERS = int(os.environ.get("POSE_POOL_MAX_WAITERS", 4))
+POSE_POOL_ACQUIRE_TIMEOUT = float(os.environ.get("POSE_POOL_ACQUIRE_TIMEOUT", 10))
+
+# --- Startup Warm-up ---
+# Every estimator runs a few frames before the server accepts sessions, and
+# /ready on METRICS_PORT answers 503 until then. WARMUP_IMAGE: a JPEG of a
+# person to warm up on (default: a synthetic frame, which leaves the landmark
+# model cold until the first real frame; see warmup.py).
+WARMUP_IMAGE = os.environ.get("WARMUP_IMAGE")
+
+# --- Region-of-interest Cropping ---
+# Run Pose on a crop around the previous frame's landmarks, padded by
+# ROI_PADDING x the body's larger side, instead of the full frame (0 disables).
+ROI_PADDING = float(os.environ.get("ROI_PADDING", 0.3))
+
+# --- JPEG Decoding ---
+# JPEG_DECODER: "opencv" or "turbojpeg" (PyTurboJPEG + libturbojpeg). Frames at
+# least twice DECODE_TARGET_WIDTH wide are decoded at 1/2, 1/4 or 1/8 scale,
+# never below that width (0 always decodes at full size).
+JPEG_DECODER = os.environ.get("JPEG_DECODER", "opencv").lower()
+DECODE_TARGET_WIDTH = int(os.environ.get("DECODE_TARGET_WIDTH", 480))
+
+# --- Frame Skipping ---
+# Exercises with an inference cadence (exercises.INFERENCE_CADENCE) run Pose on
+# every Nth frame and extrapolate landmarks in between; 0 infers every frame.
+FRAME_SKIPPING = int(os.environ.get("FRAME_SKIPPING", 1))
+
+# --- Landmark Smoothing ---
+# LANDMARK_FILTER: "one_euro", "kalman" or "none". Smooths every exercise's
+# landmarks before its processor, tuned per exercise (exercises.LANDMARK_SMOOTHING).
+LANDMARK_FILTER = os.environ.get("LANDMARK_FILTER", DEFAULT_FILTER).lower()
+
+# --- Multi-person Mode ---
+# Clients that send 'people': true in their hello (e.g. a wall camera on a
+# class) get every person tracked and scored separately, up to MULTI_PERSON_MAX
+# people per session, each using one pose estimator while one is free (0
+# disables; needs INFERENCE_ENGINE=threads). New people are looked for every
+# MULTI_PERSON_DETECT_INTERVAL frames.
+MULTI_PERSON_MAX = int(os.environ.get("MULTI_PERSON_MAX", 4))
+MULTI_PERSON_DETECT_INTERVAL = int(os.environ.get("MULTI_PERSON_DETECT_INTERVAL", 10))
+
+# --- Session Recording (for loadgen.py replays) ---
+# When set, every session's frame stream is saved to a .gbrec file in this directory.
+RECORD_DIR = os.environ.get("RECORD_DIR")
+
+# --- Landmark Store (for rescore.py) ---
+# When set, every session's per-frame landmark arrays are persisted here.
+LANDMARK_STORE_DIR = os.environ.get("LANDMARK_STORE_DIR")
+
+# --- Session Checkpoints (resume after reconnects / restarts) ---
+# SQLite file holding each session's state; empty disables resume. State is
+# checkpointed at most every SESSION_CHECKPOINT_INTERVAL seconds per session
+# and on disconnect, and kept for SESSION_TTL seconds.
+SESSION_STORE = os.environ.get("SESSION_STORE", "sessions.db")
+SESSION_CHECKPOINT_INTERVAL = float(os.environ.get("SESSION_CHECKPOINT_INTERVAL", 1.0))
+SESSION_TTL = float(os.environ.get("SESSION_TTL", 6 * 3600))
+
+# --- Micro-batching ---
+# INFERENCE_BATCH_SIZE > 1 groups frames from different sessions that arrive
+# within INFERENCE_BATCH_WAIT_MS into a single dispatch to the engine.
+# Only the process engine gains from it (one IPC round trip per worker);
+# the thread engine runs each frame in its own thread either way.
+INFERENCE_BATCH_SIZE = int(os.environ.get("INFERENCE_BATCH_SIZE", 1))
+INFERENCE_BATCH_WAIT_MS = float(os.environ.get("INFERENCE_BATCH_WAIT_MS", 5))
+
+# --- Adaptive Quality ---
+# Keeps p95 server-side frame latency under QUALITY_TARGET_MS by moving every
+# session down a quality ladder (lite Pose model; smaller, lower-quality JPEGs
+# from clients that send 'quality' in their hello) and back up once load
+# drops. Re-evaluated every QUALITY_INTERVAL seconds; 0 disables.
+QUALITY_TARGET_MS = float(os.environ.get("QUALITY_TARGET_MS", 150))
+QUALITY_INTERVAL = float(os.environ.get("QUALITY_INTERVAL", 2.0))
+
+# --- Feedback Encoding ---
+# Clients that ask for 'feedback': 'delta' only get changed fields (nothing on
+# steady frames), plus the full feedback every FEEDBACK_KEYFRAME_INTERVAL seconds.
+FEEDBACK_KEYFRAME_INTERVAL = float(os.environ.get("FEEDBACK_KEYFRAME_INTERVAL", 1.0))
+
+# --- Logging ---
+# LOG_FORMAT: "text" or "json". LOG_RATE_LIMIT: seconds between repeats of the
+# same message per session (0 disables; errors are never rate limited).
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text").lower()
+LOG_RATE_LIMIT = float(os.environ.get("LOG_RATE_LIMIT", 1.0))
+
+# --- Metrics ---
+# Prometheus-style text metrics on http://<host>:METRICS_PORT/metrics (0 disables),
+# the node's capacity as JSON on /status (polled by gateway.py), and /ready
+# for container health checks.
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 8766))
+
+# --- Backpressure ---
+# A hint is sent at most every BACKPRESSURE_INTERVAL seconds while frames are
+# being dropped or wait longer than BACKPRESSURE_MAX_AGE before inference.
+BACKPRESSURE_INTERVAL = float(os.environ.get("BACKPRESSURE_INTERVAL", 2.0))
+BACKPRESSURE_MAX_AGE = float(os.environ.get("BACKPRESSURE_MAX_AGE", 0.1))
 
 # --- MediaPipe Initialization (Global) ---
-mpPose = mp.solutions.pose
-pose = mpPose.Pose(min_detection_confidence=0.6, min_tracking_confidence=0.6)
+# One estimator per active session; warmed up in main() before serving.
+# MediaPipe itself is only imported where estimators are built.
+if INFERENCE_ENGINE == "processes":
+    from inference_workers import WorkerPool
+    pose_pool = WorkerPool(
+        INFERENCE_WORKERS,
+        POSE_POOL_SIZE,
+        max_waiters=POSE_POOL_MAX_WAITERS,
+        acquire_timeout=POSE_POOL_ACQUIRE_TIMEOUT,
+        roi_padding=ROI_PADDING or None,
+        jpeg_decoder=JPEG_DECODER,
+        decode_width=DECODE_TARGET_WIDTH or None,
+        **DEFAULT_POSE_KWARGS,
+    )
+else:
+    pose_pool = PosePool(
+        POSE_POOL_SIZE,
+        max_waiters=POSE_POOL_MAX_WAITERS,
+        acquire_timeout=POSE_POOL_ACQUIRE_TIMEOUT,
+        roi_padding=ROI_PADDING or None,
+        jpeg_decoder=JPEG_DECODER,
+        decode_width=DECODE_TARGET_WIDTH or None,
+        **DEFAULT_POSE_KWARGS,
+    )
+
+# Fail at startup on a bad LANDMARK_FILTER rather than in every session
+make_filter(LANDMARK_FILTER)
+
+scheduler = None
+if INFERENCE_BATCH_SIZE > 1 and INFERENCE_ENGINE == "processes":
+    scheduler = InferenceScheduler(pose_pool, INFERENCE_BATCH_SIZE, INFERENCE_BATCH_WAIT_MS / 1000)
+
+quality_controller = None
+if QUALITY_TARGET_MS > 0:
+    # More frames queued for inference than there are estimators counts as overload too
+    quality_controller = QualityController(
+        QUALITY_TARGET_MS / 1000,
+        QUALITY_INTERVAL,
+        backlog=lambda: default_executor_queue_depth() + (scheduler.queue_depth if scheduler else 0),
+        max_backlog=pose_pool.size,
+    )
+
+# Opened in main() (SESSION_STORE)
+session_store = None
+
+# Sessions currently streaming: id -> (websocket, exercise, state, mailbox, finished).
+# A client that reconnects before the server notices its old socket dropped takes
+# over from here: it stops the old frame loop through its mailbox and waits on
+# `finished` (set once the old handler has returned its estimator to the pool).
+live_sessions = {}
+
+# =====================================================================
+# --- Frame Loop ---
+# =====================================================================
+async def stream_frames(websocket, estimator, exercise_name, frame_processor, connection_state, encoder,
+                        recorder=None, landmark_writer=None, checkpoint=None, quality_hints=False, people=False,
+                        mailbox=None):
+    # --- Ingestion: reader task keeps only the newest frame ---
+    mailbox = mailbox or FrameMailbox()
+    reader = asyncio.create_task(read_into_mailbox(websocket, mailbox, recorder))
+
+    processed = 0
+    dropped_reported = 0
+    last_checkpoint = time.time()
+    window_start = time.monotonic()
+    window_processed = 0
+    window_dropped = 0
+    quality_level = 0  # sessions start at full quality, like the client's defaults
+    # Multi-person landmarks come keyed by person; process_people smooths each one
+    cadence = inference_cadence(exercise_name) if FRAME_SKIPPING and not people else 1
+    predictor = LandmarkPredictor(cadence) if cadence > 1 else None
+    smoother = landmark_filter(exercise_name, LANDMARK_FILTER) if not people else None
+
+    try:
+        # --- Process Subsequent Frames (Video Stream) ---
+        while True:
+            item = await mailbox.get()
+            if item is None:
+                break
+            message, queue_age = item
+
+            try:
+                # A. Parse Frame (binary header + JPEG, or legacy base64-in-JSON)
+                t_start = time.perf_counter()
+                frame = decode_frame(message)
+                if frame is None:
+                    continue
+                t_parsed = time.perf_counter()
+
+                # B. Decode JPEG + Run Pose Detection (off the event loop),
+                #    or extrapolate on frames the exercise's cadence skips
+                frame_time = frame.timestamp_ms / 1000 if frame.timestamp_ms else t_parsed
+                extrapolated = predictor is not None and predictor.skip(frame_time)
+                if extrapolated:
+                    landmarks = predictor.predict(frame_time)
+                    FRAMES_EXTRAPOLATED.inc(exercise=exercise_name)
+                else:
+                    try:
+                        landmarks = await estimator.process(frame.jpeg)
+                    except ValueError as e:
+                        DECODE_FAILURES.inc()
+                        logger.warning("Frame decode failed: %s", e)
+                        continue
+                    if predictor:
+                        predictor.observe(landmarks, frame_time)
+                    if landmarks is None:
+                        NO_LANDMARKS.inc(exercise=exercise_name)
+                t_inferred = time.perf_counter()
+
+                # C. Smooth + Run Exercise Logic (one clock reading, so stored sessions replay exactly)
+                now = time.time()
+                smoothed = smoother(landmarks, now) if smoother else landmarks
+                feedback, connection_state = frame_processor(smoothed, connection_state, now=now)
+                if landmark_writer:
+                    landmark_writer.append(processed if frame.seq is None else frame.seq, now, landmarks)
+                if checkpoint and now - last_checkpoint >= SESSION_CHECKPOINT_INTERVAL:
+                    checkpoint(connection_state)
+                    last_checkpoint = now
+                response = encoder.encode(feedback, frame.seq, now)
+                t_logic = time.perf_counter()
+
+                # D. Send Feedback (delta clients get nothing on steady frames)
+                if response is not None:
+                    await websocket.send(response)
+                    FEEDBACK_BYTES.inc(len(response), mode=encoder.mode)
+                else:
+                    FEEDBACK_SKIPPED.inc()
+                t_sent = time.perf_counter()
+                processed += 1
+                window_processed += 1
+
+                STAGE_SECONDS.observe(t_parsed - t_start, stage="parse")
+                STAGE_SECONDS.observe(t_inferred - t_parsed, stage="extrapolate" if extrapolated else "inference")
+                STAGE_SECONDS.observe(t_logic - t_inferred, stage="logic")
+                STAGE_SECONDS.observe(t_sent - t_logic, stage="send")
+                FRAMES.inc(exercise=exercise_name)
+                if mailbox.dropped != dropped_reported:
+                    FRAMES_DROPPED.inc(mailbox.dropped - dropped_reported, exercise=exercise_name)
+                    dropped_reported = mailbox.dropped
+
+                # E. Adaptive Quality (follow the server-wide level)
+                if quality_controller:
+                    quality_controller.observe(queue_age + t_sent - t_start)
+                    if quality_controller.level != quality_level:
+                        quality_level = quality_controller.level
+                        level = quality_controller.current
+                        await estimator.set_complexity(level.model_complexity)
+                        if quality_hints:
+                            await websocket.send(json.dumps({'quality': {
+                                'level': quality_level,
+                                'max_width': level.max_width,
+                                'jpeg_quality': level.jpeg_quality,
+                            }}))
+
+                # F. Backpressure Hint (ask the client to slow down)
+                tick = time.monotonic()
+                elapsed = tick - window_start
+                if elapsed >= BACKPRESSURE_INTERVAL:
+                    dropped = mailbox.dropped - window_dropped
+                    if dropped > 0 or queue_age > BACKPRESSURE_MAX_AGE:
+                        await websocket.send(json.dumps({'backpressure': {
+                            'dropped': dropped,
+                            'queue_age_ms': int(queue_age * 1000),
+                            'max_fps': round(window_processed / elapsed, 1),
+                        }}))
+                    window_start = tick
+                    window_processed = 0
+                    window_dropped = mailbox.dropped
+
+            except FrameFormatError as e:
+                DECODE_FAILURES.inc()
+                logger.warning("Bad frame from client: %s", e)
+            except (websockets.exceptions.ConnectionClosed, EstimatorLost):
+                raise
+            except Exception as e:
+                FRAME_ERRORS.inc()
+                logger.exception("Error processing frame: %s", e)
+    finally:
+        if not reader.done():
+            reader.cancel()
+        logger.info("Session frames: received %d, processed %d, dropped %d, max queue age %.0f ms",
+                    mailbox.received, processed, mailbox.dropped, mailbox.max_queue_age * 1000)
+
+    # Surface a ConnectionClosed raised by the reader to the handler (a takeover cancelled it)
+    if not mailbox.stopped:
+        await reader
 
 # =====================================================================
 # --- WebSocket Handler ---
 # =====================================================================
+def new_session_id():
+    # Sortable by start time; the random part makes it unguessable as a resume token
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:16]}"
+
+
+async def resume_session(session_id, exercise_name, frame_processor, fresh_state):
+    """Returns the latest state for `session_id`, or None if it can't be resumed."""
+    if not isinstance(session_id, str):
+        return None
+
+    live = live_sessions.get(session_id)
+    if live is not None and live[1] == exercise_name:
+        old_websocket, _, state, old_mailbox, old_finished = live
+        del live_sessions[session_id]  # the old handler no longer owns (or checkpoints) it
+        # Stop the old frame loop and wait for it to hand its estimator back, so a
+        # full pool doesn't turn this client away (the close unblocks a stuck send)
+        old_mailbox.stop()
+        asyncio.create_task(old_websocket.close(reason="Session resumed on another connection"))
+        try:
+            await asyncio.wait_for(old_finished.wait(), POSE_POOL_ACQUIRE_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning("Old connection still holds its estimator; resuming anyway")
+        frame_processor(None, state, now=time.time())
+        return type(state).restore(state.snapshot())
+
+    if not session_store:
+        return None
+    saved = await asyncio.to_thread(session_store.load, session_id)
+    if saved is None or saved[0] != exercise_name:
+        return None
+    return type(fresh_state).restore(saved[1])
+
+
 async def handler(websocket):
-    print(f"Client connected from {websocket.remote_address}")
+    session_id = new_session_id()
+    SESSION_ID.set(session_id)  # tags every log line from this connection
+    logger.info("Client connected from %s", websocket.remote_address)
 
-    connection_state = {}
+    exercise_name = None
+    connection_state = None
     frame_processor = None
+    recorder = None
+    landmark_writer = None
+    mailbox = FrameMailbox()
+    finished = asyncio.Event()
+
+    def checkpoint(state):
+        # Skipped once a reconnect has taken the session over
+        if live_sessions.get(session_id, (None,))[0] is websocket:
+            session_store.checkpoint(session_id, exercise_name, state)
 
     try:
         # --- 1. Wait for the FIRST message (Exercise Selection) ---
@@ -34,108 +394,187 @@ async def handler(websocket):
 
         if 'exercise' in data:
             exercise_name = data['exercise'].upper().strip()
-            print(f"Client selected exercise: {exercise_name}")
+            logger.info("Client selected exercise: %s", exercise_name)
 
             # --- Router Logic ---
-            if exercise_name == "SHOULDER PRESS":
-                frame_processor = process_shoulder_press
-                connection_state = {'rep_counter': 0, 'stage': 'DOWN', 'last_print_time': 0}
-            elif exercise_name == "BARBELL CURLS":
-                frame_processor = process_barbell_curl
-                connection_state = {'rep_counter': 0, 'stage': 'DOWN', 'last_rep_time': 0, 'last_print_time': 0}
-            elif exercise_name == "PLANK":
-                frame_processor = process_plank
-                connection_state = {
-                    'stage': 'resting',
-                    'start_time': 0,
-                    'pause_start_time': 0,
-                    'total_paused_time': 0,
-                    'last_elapsed_time': 0
-                }
-            elif exercise_name == "PUSHUPS":
-                frame_processor = process_pushups
-                connection_state = {
-                    'stage': 'UP',
-                    'counter': 0,
-                    'down_frames': 0,
-                    'up_frames': 0,
-                    'smoothed_coords': {}
-                }
-            elif exercise_name == "SQUATS":
-                frame_processor = process_squats
-                connection_state = {
-                    'counter': 0,
-                    'stage': 'up'
-                }
-            else:
-                print(f"Unknown exercise: {exercise_name}")
+            frame_processor, connection_state = get_exercise(exercise_name)
+            if frame_processor is None:
+                logger.warning("Unknown exercise: %s", exercise_name)
                 await websocket.close(reason="Unknown exercise")
                 return
 
         if not frame_processor:
-            print("No exercise selected by client. Closing connection.")
+            logger.warning("No exercise selected by client. Closing connection.")
             await websocket.close(reason="No exercise selected")
             return
 
-        # --- 2. Process Subsequent Frames (Video Stream) ---
-        async for message in websocket:
-            try:
-                # A. Parse JSON
-                data = json.loads(message)
-
-                # B. Get Base64 string
-                b64_string = data.get('frame')
-                if not b64_string:
-                    continue
-
-                # C. Decode Base64 -> Bytes -> Numpy Array
-                img_data = base64.b64decode(b64_string)
-                nparr = np.frombuffer(img_data, np.uint8)
-
-                # D. Decode JPEG -> OpenCV Image (Fixes the crash)
-                img_bgr = cv.imdecode(nparr, cv.IMREAD_COLOR)
-
-                if img_bgr is None:
-                    print("Error: Failed to decode image frame")
-                    continue
-
-                # E. Convert BGR to RGB for MediaPipe
-                imgRGB = cv.cvtColor(img_bgr, cv.COLOR_BGR2RGB)
+        # --- Protocol Negotiation (old clients never ask, so they stay on JSON) ---
+        if negotiate_protocol(data) == PROTOCOL_BINARY:
+            await websocket.send(json.dumps({'protocol': PROTOCOL_BINARY}))
+        feedback_mode, feedback_encoding = negotiate_feedback(data)
+        if 'feedback' in data or 'encoding' in data:
+            await websocket.send(json.dumps({'feedback': feedback_mode, 'encoding': feedback_encoding}))
+        encoder = FeedbackEncoder(feedback_mode, feedback_encoding, FEEDBACK_KEYFRAME_INTERVAL)
 
-                # F. Run Pose Detection (in a thread to allow other clients)
-                results = await asyncio.to_thread(pose.process, imgRGB)
+        # --- Multi-person (one camera on a group; feedback is keyed by person) ---
+        people = bool(data.get('people')) and MULTI_PERSON_MAX > 0 and INFERENCE_ENGINE != "processes"
+        if 'people' in data:
+            await websocket.send(json.dumps({'people': people}))
+        if people:
+            frame_processor, connection_state = get_people_exercise(exercise_name, LANDMARK_FILTER)
 
-                # G. Run Exercise Logic
-                response_json, connection_state = frame_processor(results, connection_state)
+        # --- Resume (clients that send 'session_id', even null, get their id back) ---
+        # Multi-person sessions always start fresh: their track ids don't survive a reconnect
+        resumed_state = None
+        if not people:
+            resumed_state = await resume_session(data.get('session_id'), exercise_name, frame_processor, connection_state)
+        if resumed_state is not None:
+            forget_session(session_id)
+            session_id = data['session_id']
+            SESSION_ID.set(session_id)
+            connection_state = resumed_state
+            RESUMED_SESSIONS.inc(exercise=exercise_name)
+            logger.info("Resumed session: %r", connection_state)
+        if not people:
+            live_sessions[session_id] = (websocket, exercise_name, connection_state, mailbox, finished)
+        if 'session_id' in data:
+            await websocket.send(json.dumps({'session': session_id, 'resumed': resumed_state is not None}))
 
-                # H. Send Feedback
-                await websocket.send(response_json)
+        if RECORD_DIR:
+            recorder = SessionRecorder(RECORD_DIR, exercise_name, websocket.remote_address)
+            logger.info("Recording session to %s", recorder.path)
+        if LANDMARK_STORE_DIR and not people:
+            landmark_writer = LandmarkWriter(LANDMARK_STORE_DIR, session_id, exercise_name,
+                                             append=resumed_state is not None)
 
-            except json.JSONDecodeError:
-                print("Failed to decode JSON from client")
-            except Exception as e:
-                print(f"Error processing frame: {e}")
-                # traceback.print_exc()
+        # --- 2. Check out a Pose estimator for this session ---
+        try:
+            if people:
+                estimator_session = pose_pool.people_session(MULTI_PERSON_MAX, MULTI_PERSON_DETECT_INTERVAL)
+            else:
+                estimator_session = pose_pool.session()
+            async with estimator_session as estimator:
+                if scheduler and not people:
+                    estimator = scheduler.bind(estimator)
+                ACTIVE_SESSIONS.inc(exercise=exercise_name)
+                try:
+                    await stream_frames(websocket, estimator, exercise_name, frame_processor,
+                                        connection_state, encoder, recorder, landmark_writer,
+                                        checkpoint if session_store and not people else None,
+                                        quality_hints=bool(data.get('quality')), people=people,
+                                        mailbox=mailbox)
+                finally:
+                    ACTIVE_SESSIONS.dec(exercise=exercise_name)
+        except PoolExhausted as e:
+            REJECTED_SESSIONS.inc()
+            logger.warning("Rejecting client: %s", e)
+            await websocket.close(code=1013, reason="Server busy, try again later")
+        except EstimatorLost as e:
+            logger.error("Ending session: %s", e)
+            await websocket.close(code=1011, reason="Inference engine failed")
 
     except websockets.exceptions.ConnectionClosed as e:
-        print(f"Client disconnected: {e.code} {e.reason}")
+        logger.info("Client disconnected: %s %s", e.code, e.reason)
     except Exception as e:
-        print(f"Handler error: {e}")
-        traceback.print_exc()
+        logger.exception("Handler error: %s", e)
     finally:
-        print(f"Connection closed for {websocket.remote_address}")
+        if live_sessions.get(session_id, (None,))[0] is websocket:
+            if session_store:
+                # Treat the gap like nobody in view (pauses the plank timer), then save
+                frame_processor(None, connection_state, now=time.time())
+                checkpoint(connection_state)
+            del live_sessions[session_id]
+        # Their last frames are flushed off the loop; a takeover of this session
+        # waits for `finished`, so its appends land after ours
+        for writer in (recorder, landmark_writer):
+            if writer:
+                await asyncio.to_thread(writer.close)
+        forget_session(session_id)
+        finished.set()
+        logger.info("Connection closed for %s", websocket.remote_address)
 
 # =====================================================================
 # --- Main Server Function ---
 # =====================================================================
+ready = False  # set once estimators are warm and the WebSocket port is open
+
+
+def is_ready():
+    """Serving, and the inference engine still has live estimators."""
+    return ready and pose_pool.healthy
+
+
+def node_status():
+    """Capacity report for gateway.py health checks / routing."""
+    return {
+        'ready': is_ready(),
+        'capacity': pose_pool.size,
+        'available': pose_pool.available,
+        'waiting': pose_pool.waiting,
+        'sessions': len(live_sessions),
+        'quality_level': quality_controller.level if quality_controller else 0,
+    }
+
+
 async def main():
-    host = "0.0.0.0"
-    port = 8765
-    print(f"Starting MAIN WebSocket server on ws://{host}:{port}")
+    host = HOST
+    port = PORT
+    imported = time.perf_counter()
+
+    global session_store, ready
+    if SESSION_STORE:
+        session_store = SessionStore(SESSION_STORE, ttl=SESSION_TTL)
+
+    # Up before warm-up, so health checks see "warming up" rather than nothing
+    if METRICS_PORT:
+        POOL_AVAILABLE.set_function(lambda: pose_pool.available)
+        POOL_WAITING.set_function(lambda: pose_pool.waiting)
+        EXECUTOR_QUEUE.set_function(default_executor_queue_depth)
+        SCHEDULER_QUEUE.set_function(lambda: scheduler.queue_depth if scheduler else 0)
+        QUALITY_LEVEL.set(0)
+        await start_metrics_server(host, METRICS_PORT, status=node_status, ready=is_ready)
+        logger.info("Metrics on http://%s:%d/metrics", host, METRICS_PORT)
+
+    # Every model_complexity the quality ladder can switch to is loaded up front
+    complexities = {level.model_complexity for level in quality_controller.levels} if quality_controller else ()
+    logger.info("Warming up %d pose estimator(s) (%s)...", pose_pool.size, INFERENCE_ENGINE)
+    await pose_pool.start(complexities, warmup_jpeg(WARMUP_IMAGE))
+    warmed = time.perf_counter()
+    if scheduler:
+        scheduler.start()
+    elif INFERENCE_BATCH_SIZE > 1:
+        logger.warning("INFERENCE_BATCH_SIZE has no effect with INFERENCE_ENGINE=%s; not batching", INFERENCE_ENGINE)
+
+    quality_task = None
+    if quality_controller:
+        quality_task = asyncio.create_task(quality_controller.run())
+
+    logger.info("Starting MAIN WebSocket server on ws://%s:%d", host, port)
 
     # max_size=None fixes the "Message too big" crash
-    async with websockets.serve(handler, host, port, max_size=None):
-        await asyncio.Future()  # Run forever
+    try:
+        async with websockets.serve(handler, host, port, max_size=None):
+            ready = True
+            total = time.perf_counter() - STARTED
+            COLD_START_SECONDS.set(round(imported - STARTED, 3), phase="imports")
+            COLD_START_SECONDS.set(round(warmed - imported, 3), phase="warmup")
+            COLD_START_SECONDS.set(round(total, 3), phase="total")
+            logger.info("Ready after %.2fs (imports %.2fs, warm-up %.2fs)",
+                        total, imported - STARTED, warmed - imported)
+            await asyncio.Future()  # Run forever
+    finally:
+        ready = False
+        if quality_task:
+            quality_task.cancel()
+        if scheduler:
+            scheduler.stop()
+        pose_pool.close()
+        if session_store:
+            session_store.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    configure_logging(LOG_LEVEL, LOG_FORMAT, LOG_RATE_LIMIT)
+    try:
+        asyncio.run(main())
+    finally:
+        shutdown_logging()
\ No newline at end of file
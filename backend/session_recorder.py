@@ -0,0 +1,70 @@
+import json
+import os
+import struct
+import time
+
+from background_writer import BackgroundWriter
+from frame_protocol import decode_frame, FrameFormatError
+
+# =====================================================================
+# --- Recording File Format (.gbrec) ---
+# =====================================================================
+# magic line, one JSON header line, then one record per frame:
+#   t (d, seconds since session start) | width (H) | height (H) | length (I) | JPEG bytes
+RECORDING_MAGIC = b"GBREC1\n"
+RECORD_HEADER = struct.Struct("<dHHI")
+
+
+class SessionRecorder:
+    """
+    Appends every frame a client sends to a compact .gbrec file. Frames are
+    written by a background thread; `close()` blocks until they are on disk.
+    """
+
+    def __init__(self, directory, exercise, remote=None):
+        os.makedirs(directory, exist_ok=True)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{exercise.lower().replace(' ', '_')}-{os.getpid()}-{id(self):x}.gbrec"
+        self.path = os.path.join(directory, name)
+        self.frames = 0
+        self._start = time.monotonic()
+
+        self._file = open(self.path, "wb")
+        self._file.write(RECORDING_MAGIC)
+        header = {'exercise': exercise, 'started_at': time.time(), 'remote': str(remote)}
+        self._file.write(json.dumps(header).encode() + b"\n")
+        self._writer = BackgroundWriter([self._file], name="session-recorder")
+
+    def write_message(self, message):
+        """Records one raw client message (either wire format); ignores non-frames."""
+        try:
+            frame = decode_frame(message)
+        except FrameFormatError:
+            return
+        if frame is None:
+            return
+        self.write(frame.jpeg, frame.width or 0, frame.height or 0)
+
+    def write(self, jpeg, width=0, height=0):
+        t = time.monotonic() - self._start
+        self._writer.write(RECORD_HEADER.pack(t, width, height, len(jpeg)) + jpeg)
+        self.frames += 1
+
+    def close(self):
+        self._writer.close()
+
+
+def read_recording(path):
+    """Returns (header, frames) where frames is a list of (t, width, height, jpeg)."""
+    with open(path, "rb") as f:
+        if f.readline() != RECORDING_MAGIC:
+            raise ValueError(f"{path} is not a .gbrec recording")
+        header = json.loads(f.readline())
+
+        frames = []
+        while True:
+            raw = f.read(RECORD_HEADER.size)
+            if len(raw) < RECORD_HEADER.size:
+                break
+            t, width, height, length = RECORD_HEADER.unpack(raw)
+            frames.append((t, width, height, f.read(length)))
+    return header, frames
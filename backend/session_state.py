@@ -0,0 +1,36 @@
+import copy
+
+
+class SessionState:
+    """
+    Base for the per-exercise session state classes. Subclasses declare
+    `__slots__` and set defaults in `__init__`; processors mutate one
+    instance in place for the whole session instead of rebuilding a dict
+    every frame.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def fields(cls):
+        """Every slot, including those declared by base state classes."""
+        return tuple(name for klass in reversed(cls.__mro__) for name in klass.__dict__.get('__slots__', ()))
+
+    def snapshot(self):
+        """Plain-dict copy of every field (safe to keep while the session goes on)."""
+        return {
+            name: copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+            for name, value in ((name, getattr(self, name)) for name in self.fields())
+        }
+
+    @classmethod
+    def restore(cls, snapshot):
+        """Builds a state from `snapshot()` output; unknown keys are ignored."""
+        state = cls()
+        for name in cls.fields():
+            if name in snapshot:
+                setattr(state, name, snapshot[name])
+        return state
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.fields())
+        return f"{type(self).__name__}({fields})"
@@ -0,0 +1,113 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# =====================================================================
+# --- Session Checkpoint Store ---
+# =====================================================================
+# One SQLite row per session: exercise name + SessionState.snapshot() as
+# JSON. Checkpoints are buffered in memory (latest per session wins) and
+# written by a background thread in one transaction per flush, so the
+# event loop never waits on disk. The same thread deletes expired rows
+# every EXPIRE_INTERVAL seconds.
+EXPIRE_INTERVAL = 60.0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    exercise   TEXT NOT NULL,
+    state      TEXT NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+class SessionStore:
+    def __init__(self, path, flush_interval=1.0, ttl=6 * 3600):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.ttl = ttl
+
+        self._pending = {}  # session id -> (exercise, state json, updated_at)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+
+        # WAL keeps readers (resume lookups) from blocking on the writer thread
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(SCHEMA)
+        self._db.commit()
+        self._db_lock = threading.Lock()
+        self.expire()
+
+        self._writer = threading.Thread(target=self._run, name="session-store", daemon=True)
+        self._writer.start()
+
+    def checkpoint(self, session_id, exercise, state):
+        """Queues `state` (a SessionState) for the next batched write."""
+        row = (exercise, json.dumps(state.snapshot()), time.time())
+        with self._lock:
+            self._pending[session_id] = row
+
+    def load(self, session_id):
+        """
+        Returns (exercise, snapshot dict) for a live session, or None.
+        Blocks on SQLite; call it from a thread, not the event loop.
+        """
+        with self._lock:
+            row = self._pending.get(session_id)
+        if row is None:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT exercise, state, updated_at FROM sessions WHERE session_id = ?", (session_id,)
+                ).fetchone()
+        if row is None or row[2] < time.time() - self.ttl:
+            return None
+        return row[0], json.loads(row[1])
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        rows = [(session_id, *row) for session_id, row in pending.items()]
+        try:
+            with self._db_lock, self._db:
+                self._db.executemany("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?, ?)", rows)
+        except sqlite3.Error as e:
+            logger.error("Session checkpoint failed (%d sessions): %s", len(rows), e)
+
+    def expire(self):
+        """Deletes sessions not checkpointed within the TTL."""
+        try:
+            with self._db_lock, self._db:
+                deleted = self._db.execute(
+                    "DELETE FROM sessions WHERE updated_at < ?", (time.time() - self.ttl,)
+                ).rowcount
+        except sqlite3.Error as e:
+            logger.error("Session expiry failed: %s", e)
+            return
+        if deleted:
+            logger.info("Expired %d stored sessions", deleted)
+
+    def _run(self):
+        last_expired = time.monotonic()
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self.flush()
+            if time.monotonic() - last_expired >= EXPIRE_INTERVAL:
+                self.expire()
+                last_expired = time.monotonic()
+
+    def close(self):
+        self._closed = True
+        self._wakeup.set()
+        self._writer.join()
+        self.flush()
+        self._db.close()
@@ -0,0 +1,157 @@
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+
+# =====================================================================
+# --- Session Context ---
+# =====================================================================
+# Set once per connection in server.handler; asyncio tasks and
+# asyncio.to_thread copy it, so log calls from the processors and the
+# inference threads are tagged with the right session without passing it around.
+SESSION_ID = contextvars.ContextVar("session_id", default=None)
+
+
+# =====================================================================
+# --- Per-session Rate Limiting ---
+# =====================================================================
+class SessionRateLimitFilter(logging.Filter):
+    """
+    Lets one record per (session, logger, message template) through every
+    `interval` seconds. Suppressed repeats are counted and reported on the
+    next record that gets through, so a per-frame warning becomes one line
+    per interval instead of 30 lines a second per client. Records logged
+    outside any session (startup, gateway, quality controller) always pass.
+    """
+
+    def __init__(self, interval=1.0):
+        super().__init__()
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._sessions = {}  # session id -> {(logger, msg): [last_emit, suppressed]}
+
+    def filter(self, record):
+        session = SESSION_ID.get()
+        record.session = session
+        record.suppressed = 0
+        if session is None or self.interval <= 0 or record.levelno >= logging.ERROR:
+            return True
+
+        key = (record.name, record.msg)
+        now = record.created
+        with self._lock:
+            entries = self._sessions.setdefault(session, {})
+            entry = entries.get(key)
+            if entry is None:
+                entries[key] = [now, 0]
+                return True
+            if now - entry[0] < self.interval:
+                entry[1] += 1
+                return False
+            record.suppressed = entry[1]
+            entry[0] = now
+            entry[1] = 0
+            return True
+
+    def forget(self, session):
+        with self._lock:
+            self._sessions.pop(session, None)
+
+
+# =====================================================================
+# --- Formatters ---
+# =====================================================================
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for log shippers."""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        if getattr(record, 'session', None):
+            entry['session'] = record.session
+        if getattr(record, 'suppressed', 0):
+            entry['suppressed'] = record.suppressed
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s%(session_tag)s: %(message)s%(suppressed_tag)s")
+
+    def format(self, record):
+        session = getattr(record, 'session', None)
+        suppressed = getattr(record, 'suppressed', 0)
+        record.session_tag = f" [{session}]" if session else ""
+        record.suppressed_tag = f" (+{suppressed} suppressed)" if suppressed else ""
+        return super().format(record)
+
+
+# =====================================================================
+# --- Queue Handler ---
+# =====================================================================
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # The stock prepare() folds the traceback into msg; keep it separate
+        # (exc_text) so the JSON formatter can emit it as its own field.
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+# =====================================================================
+# --- Setup ---
+# =====================================================================
+_rate_limit = None
+_listener = None
+
+
+def configure_logging(level="INFO", fmt="text", rate_limit=1.0):
+    """
+    Routes the root logger through a QueueHandler: callers (the event loop,
+    inference threads) only filter and enqueue; a QueueListener thread does
+    the formatting and the blocking write to stderr.
+    """
+    global _rate_limit, _listener
+
+    _rate_limit = SessionRateLimitFilter(rate_limit)
+    queue_handler = _QueueHandler(queue.SimpleQueue())
+    queue_handler.addFilter(_rate_limit)
+
+    stream_handler = logging.StreamHandler(sys.stderr)
+    stream_handler.setFormatter(JsonFormatter() if fmt == "json" else TextFormatter())
+    _listener = logging.handlers.QueueListener(queue_handler.queue, stream_handler)
+    _listener.start()
+
+    root = logging.getLogger()
+    root.handlers[:] = [queue_handler]
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+
+
+def forget_session(session):
+    """Drops the rate limiter's bookkeeping for a finished session."""
+    if _rate_limit:
+        _rate_limit.forget(session)
+
+
+def shutdown_logging():
+    """Flushes queued records; call on server exit."""
+    global _listener
+    if _listener:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,159 @@
+"""
+The hand-written plank processor the rule-engine spec replaced, kept as
+the reference the spec is checked against.
+"""
+import time
+import logging
+from utils import calculate_angle
+from session_state import SessionState
+from landmarks import (
+    LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST, LEFT_HIP, LEFT_ANKLE,
+    RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST, RIGHT_HIP, RIGHT_ANKLE,
+    VISIBILITY,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class PlankState(SessionState):
+    __slots__ = ('stage', 'start_time', 'pause_start_time', 'total_paused_time', 'last_elapsed_time')
+
+    def __init__(self):
+        self.stage = 'resting'
+        self.start_time = 0
+        self.pause_start_time = 0
+        self.total_paused_time = 0
+        self.last_elapsed_time = 0
+
+
+def process_plank(landmarks, state, now=None):
+    """
+    Processes a (33, 4) landmark array (or None) for Plank.
+    `now` overrides the wall clock (used when scoring recorded video).
+    `state` is a PlankState, updated in place.
+    """
+    
+    # --- Unpack state variables ---
+    stage = state.stage
+    start_time = state.start_time
+    pause_start_time = state.pause_start_time
+    total_paused_time = state.total_paused_time
+    
+    # --- Frame variables ---
+    current_time = time.time() if now is None else now
+    elapsed_time = 0
+    current_error = ""
+    visual_feedback = "Get into plank position"
+    perfect_rep = False # We'll use this to mean "Good Form"
+
+    # --- Calculate elapsed time ---
+    if start_time > 0:
+        # Calculate time paused *this* frame, if we are resting
+        current_paused_time = current_time - pause_start_time if stage == "resting" and pause_start_time > 0 else 0
+        # Total time is now - start - total paused - current pause
+        elapsed_time = current_time - start_time - total_paused_time - current_paused_time
+        
+        # If we just resumed, current_paused_time will be large, so cap elapsed_time at its last known value
+        if elapsed_time < 0:
+             elapsed_time = state.last_elapsed_time
+
+
+    try:
+        # --- Crash-Proof Landmark Access ---
+        if landmarks is not None:
+            lm = landmarks.tolist()
+            
+            # --- Automatic Side Detection ---
+            left_hip_visibility = lm[LEFT_HIP][VISIBILITY]
+            right_hip_visibility = lm[RIGHT_HIP][VISIBILITY]
+            
+            if left_hip_visibility > right_hip_visibility:
+                # Get LEFT side landmarks
+                shoulder, elbow, wrist, hip, ankle = (
+                    lm[LEFT_SHOULDER][:2],
+                    lm[LEFT_ELBOW][:2],
+                    lm[LEFT_WRIST][:2],
+                    lm[LEFT_HIP][:2],
+                    lm[LEFT_ANKLE][:2]
+                )
+            else:
+                # Get RIGHT side landmarks
+                shoulder, elbow, wrist, hip, ankle = (
+                    lm[RIGHT_SHOULDER][:2],
+                    lm[RIGHT_ELBOW][:2],
+                    lm[RIGHT_WRIST][:2],
+                    lm[RIGHT_HIP][:2],
+                    lm[RIGHT_ANKLE][:2]
+                )
+
+            # --- Angle Calculations for Form Analysis ---
+            body_angle = calculate_angle(shoulder, hip, ankle)
+            arm_pit_angle = calculate_angle(hip, shoulder, elbow) # Measures if elbows are under shoulders
+            elbow_angle = calculate_angle(shoulder, elbow, wrist) # Measures forearm angle
+
+            # --- State Machine for Form and Timer ---
+            if body_angle > 160: # Body is straight enough
+                if stage == "resting":
+                    # Transitioning from resting to planking
+                    if start_time == 0: start_time = current_time
+                    else: total_paused_time += current_time - pause_start_time
+                
+                stage = "planking"
+                
+                # --- Prioritized Form Feedback ---
+                if arm_pit_angle < 75 or arm_pit_angle > 105:
+                    current_error = "Align shoulders over elbows"
+                elif elbow_angle < 75 or elbow_angle > 105:
+                    current_error = "Keep forearms flat"
+                else:
+                    current_error = "" # Good Form!
+            
+            elif 140 < body_angle <= 160: # Hips are slightly sagging
+                stage = "warning"
+                current_error = "Warning: Hips are sagging"
+            
+            else: # body_angle <= 140, COMPLETE STOP
+                if stage != "resting": 
+                    pause_start_time = current_time # Record time we started resting
+                stage = "resting"
+                current_error = "Timer Paused - Get Back Up!"
+
+        else: # No landmarks detected
+            current_error = "Not tracking. Are you in frame?"
+            if stage != "resting": 
+                pause_start_time = current_time # Pause timer if person walks away
+            stage = "resting"
+            perfect_rep = False
+
+    except Exception as e:
+        logger.warning("Landmark error (Plank): %s", e)
+        current_error = "Make sure you are fully in frame"
+        if stage != "resting": 
+            pause_start_time = current_time
+        stage = "resting"
+        perfect_rep = False
+
+    # --- Set final feedback ---
+    if current_error:
+        visual_feedback = current_error
+        perfect_rep = False
+    else:
+        visual_feedback = "Good Form!"
+        perfect_rep = True
+
+    # --- Prepare Response ---
+    feedback_data = {
+        "reps": int(elapsed_time), # <-- Sending elapsed time as "reps"
+        "error": current_error,
+        "adjustment": visual_feedback,
+        "perfect_rep": perfect_rep
+    }
+
+    # --- Update State ---
+    state.stage = stage
+    state.start_time = start_time
+    state.pause_start_time = pause_start_time
+    state.total_paused_time = total_paused_time
+    state.last_elapsed_time = elapsed_time # Save last good time
+
+    return feedback_data, state
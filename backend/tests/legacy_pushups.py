@@ -0,0 +1,223 @@
+"""
+The hand-written pushups processor the rule-engine spec replaced, kept
+as the reference the spec is checked against.
+"""
+import logging
+import math
+from utils import calculate_angle
+from session_state import SessionState
+from landmarks import (
+    LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE,
+    RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST, RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE,
+    VISIBILITY,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# --- Algorithm thresholds ---
+VIS_THRESHOLD = 0.5
+ELBOW_DOWN_THRESHOLD = 90
+ELBOW_UP_THRESHOLD = 160
+BODY_ANGLE_MIN = 150      # RELAXED: 160 was too strict, 150 allows for natural movement
+KNEE_ANGLE_MIN = 160
+ELBOW_TORSO_FLARE = 100
+ELBOW_TORSO_TUCK = 50
+MIN_CONSECUTIVE = 2
+
+# New Thresholds
+HANDS_FORWARD_RATIO = 0.3 
+
+
+class PushupsState(SessionState):
+    __slots__ = ('stage', 'counter', 'down_frames', 'up_frames')
+
+    def __init__(self):
+        self.stage = 'UP'
+        self.counter = 0
+        self.down_frames = 0
+        self.up_frames = 0
+
+
+def process_pushups(landmarks, state, now=None):
+    """
+    Processes a (33, 4) landmark array (or None) for Pushups.
+    `state` is a PushupsState, updated in place.
+    """
+    
+    # --- Unpack state ---
+    stage = state.stage
+    counter = state.counter
+    down_frames = state.down_frames
+    up_frames = state.up_frames
+    
+    # --- Frame variables ---
+    current_error = ""
+    visual_feedback = "Good Form"
+    perfect_rep = False
+
+    try:
+        if landmarks is not None:
+            # One C call: 33 rows of [x, y, z, visibility] as Python floats
+            lm = landmarks.tolist()
+            
+            # --- Side Detection ---
+            use_left = lm[LEFT_SHOULDER][VISIBILITY] >= lm[RIGHT_SHOULDER][VISIBILITY]
+
+            if use_left:
+                idxs = {
+                    'shoulder': LEFT_SHOULDER,
+                    'elbow': LEFT_ELBOW,
+                    'wrist': LEFT_WRIST,
+                    'hip': LEFT_HIP,
+                    'knee': LEFT_KNEE,
+                    'ankle': LEFT_ANKLE,
+                }
+            else:
+                idxs = {
+                    'shoulder': RIGHT_SHOULDER,
+                    'elbow': RIGHT_ELBOW,
+                    'wrist': RIGHT_WRIST,
+                    'hip': RIGHT_HIP,
+                    'knee': RIGHT_KNEE,
+                    'ankle': RIGHT_ANKLE,
+                }
+            
+            # --- Visibility Check ---
+            vis_ok = True
+            coords = {}
+            for name, idx in idxs.items():
+                if lm[idx][VISIBILITY] < VIS_THRESHOLD:
+                    vis_ok = False
+                    break
+                coords[name] = lm[idx][:2]
+            
+            if not vis_ok:
+                current_error = "Come closer / step into frame"
+                visual_feedback = "Not tracking"
+                down_frames = 0
+                up_frames = 0
+            else:
+                # --- Get Coords (already smoothed by the shared landmark filter) ---
+                shoulder = coords['shoulder']
+                elbow = coords['elbow']
+                wrist = coords['wrist']
+                hip = coords['hip']
+                ankle = coords['ankle']
+                knee = coords['knee']
+
+                # --- Calculations ---
+                elbow_angle = calculate_angle(shoulder, elbow, wrist)
+                elbow_torso_angle = calculate_angle(shoulder, elbow, hip)
+                knee_angle = calculate_angle(hip, knee, ankle)
+                body_angle = calculate_angle(shoulder, hip, ankle)
+
+                # Helper: Calculate Torso Length
+                torso_len = math.dist(shoulder, hip)
+
+                # --- Debounce Logic ---
+                if elbow_angle < ELBOW_DOWN_THRESHOLD:
+                    down_frames += 1
+                    up_frames = 0
+                elif elbow_angle > ELBOW_UP_THRESHOLD:
+                    up_frames += 1
+                    down_frames = 0
+                else:
+                    down_frames = max(0, down_frames - 1)
+                    up_frames = max(0, up_frames - 1)
+
+                # --- State Machine & Error Checking ---
+                form_ok = True # Assume good form initially
+                
+                # 1. GLOBAL CHECKS
+                
+                # Check: Hands too far forward
+                shoulder_wrist_x_diff = abs(shoulder[0] - wrist[0])
+                if shoulder_wrist_x_diff > (torso_len * HANDS_FORWARD_RATIO):
+                    if stage == 'UP': 
+                        current_error = "Hands too far forward"
+                        form_ok = False
+
+                # Check: Hips too high (Piking)
+                if body_angle < BODY_ANGLE_MIN and current_error == "":
+                    midpoint_y = (shoulder[1] + ankle[1]) / 2
+                    if hip[1] < (midpoint_y - (0.1 * torso_len)): 
+                        current_error = "Hips too high"
+                        form_ok = False
+                    else:
+                        current_error = "Keep body straight"
+                        form_ok = False
+
+                # 2. STATE TRANSITIONS
+                if stage == 'UP':
+                    if down_frames >= MIN_CONSECUTIVE:
+                        stage = 'DOWN'
+                    
+                    elif knee_angle < KNEE_ANGLE_MIN and current_error == "":
+                        current_error = 'Straighten your legs'
+                        form_ok = False
+                        
+                elif stage == 'DOWN':
+                    if up_frames >= MIN_CONSECUTIVE:
+                        stage = 'UP'
+                        counter += 1 # FIX: Increment count REGARDLESS of form
+                        
+                        # Now validate if it was a "Perfect Rep"
+                        if body_angle < BODY_ANGLE_MIN:
+                            midpoint_y = (shoulder[1] + ankle[1]) / 2
+                            if hip[1] < midpoint_y:
+                                current_error = "Hips too high"
+                            else:
+                                current_error = "Keep body straight"
+                            form_ok = False
+                        
+                        elif knee_angle < KNEE_ANGLE_MIN:
+                            current_error = "Straighten your legs"
+                            form_ok = False
+                        
+                        if form_ok:
+                            perfect_rep = True
+                            visual_feedback = "Good Rep!"
+                        else:
+                            perfect_rep = False
+                            visual_feedback = current_error # Counted, but showed error
+                            
+                    # Check for flaring errors while in 'DOWN' state
+                    if current_error == "":
+                        if elbow_torso_angle > ELBOW_TORSO_FLARE:
+                            current_error = "Don't flare your elbows"
+                        elif elbow_torso_angle < ELBOW_TORSO_TUCK:
+                            current_error = "Tuck your elbows closer"
+        
+        else: 
+            current_error = "Not tracking. Are you in frame?"
+            visual_feedback = "Not tracking"
+
+    except Exception as e:
+        logger.warning("Landmark error (Pushups): %s", e)
+        current_error = "Make sure you are fully in frame"
+        visual_feedback = "Make sure you are fully in frame"
+    
+    # --- Final Feedback ---
+    if current_error:
+        visual_feedback = current_error
+        # perfect_rep stays False
+    elif perfect_rep:
+         visual_feedback = "Good Rep!"
+    else:
+         visual_feedback = "Good Form" # Default state
+
+    # --- Prepare Feedback & State ---
+    feedback_data = {
+        "reps": counter,
+        "error": current_error,
+        "adjustment": visual_feedback,
+        "perfect_rep": perfect_rep
+    }
+
+    state.stage = stage
+    state.counter = counter
+    state.down_frames = down_frames
+    state.up_frames = up_frames
+    
+    return feedback_data, state
\ No newline at end of file
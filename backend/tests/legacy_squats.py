@@ -0,0 +1,185 @@
+"""
+The hand-written squats processor the rule-engine spec replaced, kept as
+the reference the spec is checked against.
+"""
+import logging
+import numpy as np
+from utils import calculate_angle
+from session_state import SessionState
+from landmarks import (
+    LEFT_SHOULDER, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE,
+    RIGHT_SHOULDER, RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE,
+    VISIBILITY,
+)
+
+logger = logging.getLogger(__name__)
+
+
+# --- Algorithm thresholds (module level so rescore.py can override them) ---
+KNEE_DOWN = 110
+KNEE_UP = 150
+KNEE_DEEP = 70
+VIS_THRESH = 0.6
+DEPTH_THRESHOLD = 140 # Relaxed threshold
+
+
+class SquatsState(SessionState):
+    __slots__ = ('rep_counter', 'stage', 'ready', 'max_depth', 'init_ankle_y',
+                 'hip_start_y', 'sh_start_y', 'fixed_shin_len')
+
+    def __init__(self):
+        self.rep_counter = 0
+        self.stage = 'not ready'
+        self.ready = False
+        self.max_depth = 180
+        self.init_ankle_y = None
+        self.hip_start_y = None
+        self.sh_start_y = None
+        self.fixed_shin_len = None # Locked while standing straight
+
+
+def process_squats(landmarks, state, now=None):
+    """Processes a (33, 4) landmark array (or None); `state` is a SquatsState, updated in place."""
+    reps = state.rep_counter
+    stage = state.stage
+    ready = state.ready
+    max_depth = state.max_depth
+    init_ankle_y = state.init_ankle_y
+    hip_start_y = state.hip_start_y
+    sh_start_y = state.sh_start_y
+    
+    # --- NEW: Retrieve fixed shin length from state ---
+    fixed_shin_len = state.fixed_shin_len
+
+    feedback = ""
+    error = ""
+    perfect = False
+
+    if landmarks is not None:
+        lm = landmarks.tolist()
+        
+        l_vis = lm[LEFT_SHOULDER][VISIBILITY]
+        r_vis = lm[RIGHT_SHOULDER][VISIBILITY]
+        
+        if l_vis > r_vis:
+            s_idx = LEFT_SHOULDER
+            h_idx = LEFT_HIP
+            k_idx = LEFT_KNEE
+            a_idx = LEFT_ANKLE
+        else:
+            s_idx = RIGHT_SHOULDER
+            h_idx = RIGHT_HIP
+            k_idx = RIGHT_KNEE
+            a_idx = RIGHT_ANKLE
+
+        sh = lm[s_idx][:2]
+        hip = lm[h_idx][:2]
+        knee = lm[k_idx][:2]
+        ankle = lm[a_idx][:2]
+
+        # We calculate current length just for debugging/logging, 
+        # but we won't use it for math while moving.
+        current_shin_len = np.linalg.norm(np.array(knee) - np.array(ankle))
+
+        if lm[s_idx][VISIBILITY] < VIS_THRESH or lm[a_idx][VISIBILITY] < VIS_THRESH:
+            error = "Full body not visible"
+        else:
+            knee_ang = calculate_angle(hip, knee, ankle)
+
+            if not ready:
+                if knee_ang > 160:
+                    # --- LATCHING PHASE ---
+                    # Only set shin length when standing straight
+                    ready = True
+                    fixed_shin_len = current_shin_len 
+                    init_ankle_y = ankle[1]
+                    
+                    feedback = "Start Squat"
+                    stage = "up"
+                    logger.info("System ready, shin length locked at %.4f", fixed_shin_len)
+                else:
+                    feedback = "Stand Straight"
+            else:
+                # Use the LOCKED shin length for all error checks
+                reference_len = fixed_shin_len if fixed_shin_len else current_shin_len
+
+                # --- 1. DETECT ERRORS ---
+                if knee_ang < 160: # Only check errors when actually moving
+                    logger.debug("knee-ankle x offset %.3f", abs(knee[0] - ankle[0]))
+                    # Knees Caving (Fixed logic)
+                    if abs(knee[0] - ankle[0]) < (0.1) and stage == "down":
+                        error = "Knees caving in"
+                        logger.debug(error)
+                    # Not Deep Enough
+                    # Heels Lifting (Using locked length)
+                    elif init_ankle_y and (init_ankle_y - ankle[1]) > (reference_len * 0.20) and stage == "down":
+                        error = "Heels lifting"
+                        logger.debug(error)
+                    
+                    # Hips Rising
+                    elif stage == "up" and hip_start_y and sh_start_y:
+                        hip_rise = hip_start_y - hip[1]
+                        sh_rise = sh_start_y - sh[1]
+                        if abs(sh_rise) > 0.01 and abs(hip_rise)/abs(sh_rise) > 1.5:
+                            error = "Hips rising too fast"
+
+                # --- 2. STATE MACHINE ---
+                if knee_ang < KNEE_DOWN:
+                    stage = "down"
+                    max_depth = min(max_depth, knee_ang)
+                    
+                    if not error:
+                        feedback = "Go Deeper"
+                        if knee_ang <= KNEE_DEEP: feedback = "Perfect Depth"
+                        elif 70 <= knee_ang <= 100: feedback = "Good Parallel"
+                    
+                    hip_start_y = hip[1]
+                    sh_start_y = sh[1]
+
+                # GOING UP (FINISHING REP)
+                elif knee_ang > KNEE_UP and stage == "down":
+                    stage = "up"
+                    
+                    # REPAIRED REP COUNTING LOGIC
+                    if error and error != "Not deep enough":
+                        # Count the rep but mark it imperfect
+                        reps += 1
+                        perfect = False
+                        feedback = f"Rep: {error}"
+                    else:
+                        if max_depth > DEPTH_THRESHOLD:
+                            feedback = "Squat Deeper!"
+                            perfect = False
+                        else:
+                            reps += 1
+                            perfect = True
+                            feedback = "Good Rep!"
+                    
+                    # Reset rep vars
+                    max_depth = 180
+                    hip_start_y = None
+                    sh_start_y = None
+
+    else:
+        error = "Not tracking"
+
+    final_feedback = feedback
+    if error:
+        final_feedback = error
+
+    data = { 
+        "reps": reps, 
+        "error": error, 
+        "adjustment": final_feedback, 
+        "perfect_rep": perfect 
+    }
+    
+    state.rep_counter = reps
+    state.stage = stage
+    state.ready = ready
+    state.max_depth = max_depth
+    state.init_ankle_y = init_ankle_y
+    state.hip_start_y = hip_start_y
+    state.sh_start_y = sh_start_y
+    state.fixed_shin_len = fixed_shin_len # Save the locked length to state
+    return data, state
\ No newline at end of file
@@ -0,0 +1,92 @@
+import numpy as np
+
+from utils import AngleEngine, calculate_angle
+from landmarks import (
+    LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE,
+    RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST, RIGHT_HIP,
+)
+
+
+def original_calculate_angle(a, b, c):
+    """calculate_angle as it was before the scalar fast path / AngleEngine."""
+    a = np.array(a); b = np.array(b); c = np.array(c)
+    radians = np.arctan2(c[1]-b[1], c[0]-b[0]) - np.arctan2(a[1]-b[1], a[0]-b[0])
+    angle = np.abs(radians*180.0/np.pi)
+    if angle > 180.0:
+        angle = 360-angle
+    return angle
+
+
+TRIPLES = [
+    (LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST),
+    (RIGHT_SHOULDER, RIGHT_ELBOW, RIGHT_WRIST),
+    (LEFT_HIP, LEFT_KNEE, LEFT_ANKLE),
+    (LEFT_SHOULDER, LEFT_HIP, LEFT_ANKLE),
+    (RIGHT_HIP, RIGHT_SHOULDER, RIGHT_ELBOW),
+]
+
+
+def random_landmarks(rng):
+    """(33, 4) float32 landmarks, like landmarks_to_array returns."""
+    landmarks = rng.random((33, 4), dtype=np.float32)
+    landmarks[:, :2] = rng.uniform(-0.2, 1.2, (33, 2)).astype(np.float32)
+    return landmarks
+
+
+def collinear_landmarks(rng, triple, straight):
+    """`triple`'s points on one line: 180 degrees if `straight`, else folded back to 0."""
+    a, b, c = triple
+    landmarks = random_landmarks(rng)
+    direction = rng.normal(size=2)
+    landmarks[a, :2] = landmarks[b, :2] - direction * rng.uniform(0.01, 0.5)
+    landmarks[c, :2] = landmarks[b, :2] + direction * rng.uniform(0.01, 0.5) * (1 if straight else -1)
+    return landmarks
+
+
+def aligned_landmarks(rng, triple, offset):
+    """`triple` straight along an axis: both arctan2 calls hit exact multiples of pi / 2."""
+    a, b, c = triple
+    landmarks = random_landmarks(rng)
+    landmarks[a, :2] = landmarks[b, :2] - np.float32(offset)
+    landmarks[c, :2] = landmarks[b, :2] + np.float32(offset)
+    return landmarks
+
+
+def expected(landmarks):
+    # The logic modules call calculate_angle on landmarks.tolist() rows
+    lm = landmarks.tolist()
+    return [original_calculate_angle(lm[a][:2], lm[b][:2], lm[c][:2]) for a, b, c in TRIPLES]
+
+
+def cases():
+    rng = np.random.default_rng(7)
+    for _ in range(2000):
+        yield random_landmarks(rng)
+    for triple in TRIPLES:
+        for _ in range(200):
+            yield collinear_landmarks(rng, triple, straight=True)
+            yield collinear_landmarks(rng, triple, straight=False)
+        for offset in ([0.25, 0.0], [-0.25, 0.0], [0.0, 0.25], [0.0, -0.25]):
+            yield aligned_landmarks(rng, triple, offset)
+
+
+def test_calculate_angle_matches_original_bit_for_bit():
+    for landmarks in cases():
+        lm = landmarks.tolist()
+        for (a, b, c), want in zip(TRIPLES, expected(landmarks)):
+            got = calculate_angle(lm[a][:2], lm[b][:2], lm[c][:2])
+            assert got == want, (a, b, c, got, want)
+
+
+def test_angle_engine_matches_original_bit_for_bit():
+    engine = AngleEngine(TRIPLES)
+    for landmarks in cases():
+        got = engine.angles(landmarks).tolist()
+        assert got == expected(landmarks)
+
+
+def test_axis_aligned_straight_triples_are_180_degrees():
+    rng = np.random.default_rng(7)
+    for i, triple in enumerate(TRIPLES):
+        landmarks = aligned_landmarks(rng, triple, [0.25, 0.0])
+        assert AngleEngine(TRIPLES).angles(landmarks)[i] == 180.0
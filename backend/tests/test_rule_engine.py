@@ -0,0 +1,290 @@
+import math
+
+import numpy as np
+import pytest
+
+import legacy_plank
+import legacy_pushups
+import legacy_squats
+import pushups_logic
+import squats_logic
+from landmarks import (
+    LEFT_SHOULDER, LEFT_ELBOW, LEFT_WRIST, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE, MIRROR, VISIBILITY,
+)
+from plank_logic import PlankState, process_plank
+from pushups_logic import PushupsState, process_pushups
+from squats_logic import SquatsState, process_squats
+
+
+def pushup_frame(elbow_angle, side="left"):
+    """A straight side-on body on the floor with the given elbow angle (degrees)."""
+    landmarks = np.zeros((33, 4), dtype=np.float32)
+    landmarks[:, VISIBILITY] = 0.9
+    points = {
+        LEFT_SHOULDER: (0.30, 0.50),
+        LEFT_HIP: (0.55, 0.50),
+        LEFT_KNEE: (0.72, 0.50),
+        LEFT_ANKLE: (0.90, 0.50),
+        LEFT_ELBOW: (0.30, 0.62),  # upper arm straight down
+    }
+    # Forearm from the elbow, rotated toward the feet as the elbow bends
+    bend = math.radians(180 - elbow_angle)
+    points[LEFT_WRIST] = (0.30 + 0.12 * math.sin(bend), 0.62 + 0.12 * math.cos(bend))
+    for index, xy in points.items():
+        landmarks[index if side == "left" else MIRROR[index], :2] = xy
+    if side == "right":
+        landmarks[LEFT_SHOULDER, VISIBILITY] = 0.6
+    return landmarks
+
+
+def run(frames):
+    state = PushupsState()
+    feedback = None
+    for t, landmarks in enumerate(frames):
+        feedback, state = process_pushups(landmarks, state, now=t / 15)
+    return feedback, state
+
+
+def test_stage_change_needs_consecutive_frames():
+    down, up, middle = pushup_frame(70), pushup_frame(175), pushup_frame(120)
+    _, state = run([down, middle, down, middle])
+    assert state.stage == 'UP'
+    _, state = run([down, down])
+    assert state.stage == 'DOWN'
+    _, state = run([down, down, up, middle, up])
+    assert (state.stage, state.rep_counter) == ('DOWN', 0)
+
+
+def test_rep_counts_after_consecutive_frames_at_the_top():
+    down, up = pushup_frame(70), pushup_frame(175)
+    feedback, state = run([down, down, up])
+    assert (state.stage, state.rep_counter) == ('DOWN', 0)
+    feedback, state = run([down, down, up, up])
+    assert (state.stage, state.rep_counter) == ('UP', 1)
+    assert feedback['perfect_rep'] and feedback['adjustment'] == "Good Rep!"
+
+
+def test_missing_frames_keep_the_count_and_hidden_joints_restart_it():
+    down = pushup_frame(70)
+    _, state = run([down, None, down])
+    assert state.stage == 'DOWN'
+    hidden = pushup_frame(70)
+    hidden[LEFT_WRIST, VISIBILITY] = 0.1
+    feedback, state = run([down, hidden, down])
+    assert state.stage == 'UP'
+    feedback, _ = run([hidden])
+    assert feedback['error'] == "Come closer / step into frame"
+
+
+def test_uses_the_side_facing_the_camera():
+    down, up = pushup_frame(70, side="right"), pushup_frame(175, side="right")
+    _, state = run([down, down, up, up])
+    assert state.rep_counter == 1
+
+
+def test_restores_checkpoints_from_the_hand_written_processor():
+    state = PushupsState.restore({'stage': 'DOWN', 'counter': 4, 'down_frames': 2, 'up_frames': 0})
+    assert (state.stage, state.rep_counter) == ('DOWN', 4)
+    assert PushupsState.restore(state.snapshot()).snapshot() == state.snapshot()
+
+
+def pushups_workout(rng, frames=300):
+    """A noisy pushup set: reps of random depth, with sagging, bent knees, flared elbows and dropouts."""
+    speed, depth = rng.uniform(0.2, 0.8), rng.uniform(0.05, 0.25)
+    sag, knee_bend = rng.choice([0, 0, 0.05, -0.08, 0.12]), rng.choice([0, 0, 0.06, -0.06])
+    hands, flare = rng.choice([0, 0, 0.05, 0.12]), rng.choice([-1, 1])
+    noise, hide, side = rng.uniform(0, 0.02), rng.choice([0, 0.05, 0.2]), rng.integers(2)
+    for t in range(frames):
+        if rng.random() < 0.03:
+            yield None
+            continue
+        landmarks = rng.random((33, 4)).astype(np.float32)
+        landmarks[:, VISIBILITY] = rng.uniform(0.6, 1.0, 33)
+        top = 0.5 + 0.5 * np.sin(t * speed)
+        shoulder = np.array([0.3, 0.45 + 0.12 * (1 - top)])
+        hip = shoulder + [0.25, sag + rng.normal(0, noise)]
+        ankle = hip + [0.35, -sag / 2 + rng.normal(0, noise)]
+        wrist = np.array([0.3 + hands, 0.75])
+        points = {
+            LEFT_SHOULDER: shoulder, LEFT_HIP: hip, LEFT_ANKLE: ankle, LEFT_WRIST: wrist,
+            LEFT_KNEE: (hip + ankle) / 2 + [0, knee_bend],
+            LEFT_ELBOW: (shoulder + wrist) / 2 + [(1 - top) * depth * flare, 0],
+        }
+        for index, xy in points.items():
+            landmarks[index if side == 0 else MIRROR[index], :2] = xy + rng.normal(0, noise, 2)
+        if rng.random() < hide:
+            landmarks[rng.choice(list(points)), VISIBILITY] = 0.2
+        yield landmarks
+
+
+@pytest.mark.parametrize("min_consecutive", [2, 3])
+def test_matches_the_hand_written_processor(monkeypatch, min_consecutive):
+    monkeypatch.setattr(legacy_pushups, "MIN_CONSECUTIVE", min_consecutive)
+    monkeypatch.setattr(pushups_logic, "MIN_CONSECUTIVE", min_consecutive)
+    pushups_logic.PUSHUPS_RULES.compile()
+    try:
+        rng = np.random.default_rng(min_consecutive)
+        reps = 0
+        for _ in range(40):
+            old, new = legacy_pushups.PushupsState(), PushupsState()
+            for t, landmarks in enumerate(pushups_workout(rng)):
+                expected, _ = legacy_pushups.process_pushups(landmarks, old, now=t / 15)
+                assert process_pushups(landmarks, new, now=t / 15)[0] == expected
+            assert (new.stage, new.rep_counter) == (old.stage, old.counter)
+            reps += old.counter
+        assert reps > 40  # the sets really exercise the stage machine
+    finally:
+        monkeypatch.undo()
+        pushups_logic.PUSHUPS_RULES.compile()
+
+
+def squats_workout(rng, frames=300):
+    """A noisy squat set: reps of random depth, with caving knees, lifting heels and dropouts."""
+    speed, depth = rng.uniform(0.1, 0.6), rng.uniform(0.3, 1.3)
+    cave, heel = rng.choice([0.0, 0.0, 0.15]), rng.choice([0.0, 0.0, 0.05])
+    noise, hide, side = rng.uniform(0, 0.02), rng.choice([0, 0.05, 0.2]), rng.integers(2)
+    for t in range(frames):
+        if rng.random() < 0.03:
+            yield None
+            continue
+        landmarks = rng.random((33, 4)).astype(np.float32)
+        landmarks[:, VISIBILITY] = rng.uniform(0.5, 1.0, 33)
+        bend = depth * max(0.0, math.sin(t * speed))
+        ankle = np.array([0.5, 0.9 - heel * bend])
+        knee = ankle + [cave * bend if cave else 0.12 * math.sin(bend), -0.2 * math.cos(bend * 0.8)]
+        hip = knee + [-0.2 * math.sin(bend), -0.2 * math.cos(bend)]
+        points = {LEFT_ANKLE: ankle, LEFT_KNEE: knee, LEFT_HIP: hip, LEFT_SHOULDER: hip + [0.05 * bend, -0.3]}
+        for index, xy in points.items():
+            landmarks[index if side == 0 else MIRROR[index], :2] = xy + rng.normal(0, noise, 2)
+        if rng.random() < hide:
+            landmarks[rng.choice([LEFT_SHOULDER, LEFT_ANKLE, MIRROR[LEFT_SHOULDER]]), VISIBILITY] = 0.3
+        if rng.random() < 0.02:  # a tie goes to the right side
+            landmarks[MIRROR[LEFT_SHOULDER], VISIBILITY] = landmarks[LEFT_SHOULDER, VISIBILITY]
+        yield landmarks
+
+
+def test_squats_match_the_hand_written_processor():
+    rng = np.random.default_rng(0)
+    reps = 0
+    for _ in range(40):
+        old, new = legacy_squats.SquatsState(), SquatsState()
+        for t, landmarks in enumerate(squats_workout(rng)):
+            expected, _ = legacy_squats.process_squats(landmarks, old, now=t / 15)
+            assert process_squats(landmarks, new, now=t / 15)[0] == expected
+        assert (new.stage, new.rep_counter) == (old.stage, old.rep_counter)
+        assert new.fixed_shin_len == pytest.approx(old.fixed_shin_len)
+        reps += old.rep_counter
+    assert reps > 40
+
+
+def squat_frame(knee_angle):
+    """A side-on lifter with the given knee angle (degrees); the knees a little ahead of the ankles."""
+    landmarks = np.zeros((33, 4), dtype=np.float32)
+    landmarks[:, VISIBILITY] = 0.9
+    ankle, knee = np.array([0.40, 0.90]), np.array([0.52, 0.70])
+    shin = (knee - ankle) / np.linalg.norm(knee - ankle)
+    bend = math.radians(180 - knee_angle)
+    cos, sin = math.cos(bend), math.sin(bend)
+    hip = knee + 0.25 * np.array([shin[0] * cos - shin[1] * sin, shin[0] * sin + shin[1] * cos])
+    points = {LEFT_ANKLE: ankle, LEFT_KNEE: knee, LEFT_HIP: hip, LEFT_SHOULDER: hip + [0.0, -0.3]}
+    for index, xy in points.items():
+        landmarks[index, :2] = xy
+    landmarks[MIRROR[LEFT_SHOULDER], VISIBILITY] = 0.6  # facing left
+    return landmarks
+
+
+def run_squats(frames):
+    state = SquatsState()
+    feedback = None
+    for t, landmarks in enumerate(frames):
+        feedback, state = process_squats(landmarks, state, now=t / 15)
+    return feedback, state
+
+
+def test_squats_count_a_rep_and_debounce_when_asked(monkeypatch):
+    stand, squat = squat_frame(175), squat_frame(60)
+    feedback, state = run_squats([stand, squat, stand])
+    assert (state.stage, state.rep_counter) == ('up', 1)
+    assert feedback['adjustment'] == "Good Rep!"
+
+    monkeypatch.setattr(squats_logic, "MIN_CONSECUTIVE", 2)
+    squats_logic.SQUATS_RULES.compile()
+    try:
+        _, state = run_squats([stand, squat, stand, stand])
+        assert (state.stage, state.rep_counter) == ('up', 0)
+        _, state = run_squats([stand, squat, squat, stand, stand])
+        assert (state.stage, state.rep_counter) == ('up', 1)
+    finally:
+        monkeypatch.undo()
+        squats_logic.SQUATS_RULES.compile()
+
+
+def test_restores_checkpoints_from_the_hand_written_squats():
+    state = SquatsState.restore({'rep_counter': 3, 'stage': 'down', 'ready': True, 'max_depth': 85.0,
+                                 'init_ankle_y': 0.9, 'hip_start_y': 0.6, 'sh_start_y': 0.3,
+                                 'fixed_shin_len': 0.2})
+    assert (state.stage, state.rep_counter, state.max_depth, state.fixed_shin_len) == ('down', 3, 85.0, 0.2)
+
+
+def plank_workout(rng, frames=300):
+    """A noisy plank hold: sagging, dropping to the floor, bad elbows and dropouts."""
+    drift, elbow_error = rng.uniform(0.02, 0.2), rng.choice([0.0, 0.0, 0.1])
+    noise, side = rng.uniform(0, 0.02), rng.integers(2)
+    sag = 0.0
+    for t in range(frames):
+        if rng.random() < 0.03:
+            yield None
+            continue
+        sag = min(max(sag + rng.normal(0, drift), -0.05), 0.25)  # hip drop below the shoulder-ankle line
+        landmarks = rng.random((33, 4)).astype(np.float32)
+        landmarks[:, VISIBILITY] = rng.uniform(0.5, 1.0, 33)
+        shoulder, ankle = np.array([0.3, 0.5]), np.array([0.9, 0.55])
+        hip = (shoulder + ankle) / 2 + [0, sag]
+        elbow = shoulder + [elbow_error * rng.random(), 0.15]
+        points = {LEFT_SHOULDER: shoulder, LEFT_HIP: hip, LEFT_ANKLE: ankle,
+                  LEFT_ELBOW: elbow, LEFT_WRIST: elbow + [-0.15, rng.normal(0, 0.03)]}
+        for index, xy in points.items():
+            landmarks[index if side == 0 else MIRROR[index], :2] = xy + rng.normal(0, noise, 2)
+        if rng.random() < 0.02:  # a tie goes to the right side
+            landmarks[MIRROR[LEFT_HIP], VISIBILITY] = landmarks[LEFT_HIP, VISIBILITY]
+        yield landmarks
+
+
+def test_plank_matches_the_hand_written_processor():
+    rng = np.random.default_rng(0)
+    held = 0
+    for _ in range(40):
+        old, new = legacy_plank.PlankState(), PlankState()
+        for t, landmarks in enumerate(plank_workout(rng)):
+            expected, _ = legacy_plank.process_plank(landmarks, old, now=100 + t / 15)
+            assert process_plank(landmarks, new, now=100 + t / 15)[0] == expected
+        assert all(getattr(new, name) == getattr(old, name) for name in old.fields())
+        held += int(old.last_elapsed_time)
+    assert held > 40
+
+
+def plank_frame(hip_drop=0.0):
+    """A forearm plank facing left; `hip_drop` lowers the hips below the shoulder-ankle line."""
+    landmarks = np.zeros((33, 4), dtype=np.float32)
+    landmarks[:, VISIBILITY] = 0.9
+    points = {
+        LEFT_SHOULDER: (0.30, 0.50), LEFT_HIP: (0.60, 0.50 + hip_drop), LEFT_ANKLE: (0.90, 0.50),
+        LEFT_ELBOW: (0.30, 0.65), LEFT_WRIST: (0.15, 0.65),
+    }
+    for index, xy in points.items():
+        landmarks[index, :2] = xy
+    landmarks[MIRROR[LEFT_HIP], VISIBILITY] = 0.6
+    return landmarks
+
+
+def test_plank_timer_pauses_while_resting():
+    state = PlankState()
+    straight, down = plank_frame(), plank_frame(hip_drop=0.3)
+    for now, landmarks in [(10, straight), (13, straight), (14, down), (19, None), (20, straight)]:
+        feedback, state = process_plank(landmarks, state, now=now)
+    assert (state.stage, feedback['adjustment'], feedback['perfect_rep']) == ('planking', "Good Form!", True)
+    feedback, state = process_plank(straight, state, now=22)
+    assert feedback['reps'] == 6  # 10-14 and 20-22 held
+    feedback, state = process_plank(down, state, now=23)
+    assert (state.stage, feedback['error']) == ('resting', "Timer Paused - Get Back Up!")
+    assert process_plank(None, state, now=40)[0]['reps'] == 7
@@ -1,12 +1,69 @@
 import numpy as np
 
 def calculate_angle(a, b, c):
-    a = np.array(a); b = np.array(b); c = np.array(c)
+    """
+    Scalar fast path for a single joint angle at `b`, in degrees (0-180).
+    Plain float math around np.arctan2, which keeps the result bit-identical
+    to the array version (math.atan2 can differ in the last bit).
+    """
     radians = np.arctan2(c[1]-b[1], c[0]-b[0]) - np.arctan2(a[1]-b[1], a[0]-b[0])
-    angle = np.abs(radians*180.0/np.pi)
+    angle = abs(radians*180.0/np.pi)
     if angle > 180.0:
         angle = 360-angle
     return angle
 
 def calculate_distance(a, b):
-    return np.linalg.norm(np.array(a) - np.array(b))
\ No newline at end of file
+    return np.linalg.norm(np.array(a) - np.array(b))
+
+
+class AngleEngine:
+    """
+    Computes every joint angle an exercise needs in one vectorized pass over
+    the (33, 4) landmark array. `triples` is a precomputed (a, b, c) index
+    table; row i of the result is the angle at b of triple i.
+
+    Scratch buffers are reused between calls, so the returned array is only
+    valid until the next call on the same engine.
+    """
+
+    def __init__(self, triples, width=4):
+        table = np.asarray(triples, dtype=np.intp)
+        k = len(table)
+        self.size = k
+
+        # Flat indices into the row-major landmark array, laid out as
+        # [end x | end y | vertex x | vertex y], where the "ends" are the
+        # c points (rows 0..k-1) followed by the a points (rows k..2k-1).
+        # One take() gathers everything, one arctan2 covers both passes.
+        ends = np.concatenate([table[:, 2], table[:, 0]])
+        vertex = np.concatenate([table[:, 1], table[:, 1]])
+        self._gather = np.concatenate([
+            ends * width, ends * width + 1,
+            vertex * width, vertex * width + 1,
+        ])
+
+        self._points = np.empty(8 * k, dtype=np.float32)
+        self._deltas = np.empty(4 * k, dtype=np.float64)
+        self._atan = np.empty(2 * k, dtype=np.float64)
+        self._reflex = np.empty(k, dtype=np.float64)
+        self._out = np.empty(k, dtype=np.float64)
+
+    def angles(self, landmarks):
+        """Angles in degrees (0-180) for every triple, from x/y of `landmarks`."""
+        k = self.size
+        points, deltas, atan, out = self._points, self._deltas, self._atan, self._out
+
+        np.take(landmarks.ravel(), self._gather, out=points)
+        # float32 -> float64 is exact, so these match Python float subtraction
+        np.subtract(points[:4 * k], points[4 * k:], out=deltas, dtype=np.float64)
+        np.arctan2(deltas[2 * k:], deltas[:2 * k], out=atan)
+
+        # Same operation order as calculate_angle
+        np.subtract(atan[:k], atan[k:], out=out)
+        np.multiply(out, 180.0, out=out)
+        np.divide(out, np.pi, out=out)
+        np.abs(out, out=out)
+        # min(angle, 360 - angle) picks 360 - angle exactly when angle > 180
+        np.subtract(360, out, out=self._reflex)
+        np.minimum(out, self._reflex, out=out)
+        return out
@@ -0,0 +1,41 @@
+import cv2 as cv
+import numpy as np
+
+# =====================================================================
+# --- Estimator Warm-up ---
+# =====================================================================
+# A fresh MediaPipe Pose initializes its graph and TFLite interpreters on
+# its first frame, and the next few frames still run slower than steady
+# state. Both engines push WARMUP_FRAMES frames through every estimator
+# (and every model_complexity the quality ladder can switch to) along the
+# same JPEG decode path real frames take, before the server reports ready.
+#
+# The synthetic frame only exercises the person detector: nobody is found
+# in it, so the landmark model behind it first runs on a real frame.
+# WARMUP_IMAGE (a JPEG of a person) warms that stage too.
+WARMUP_FRAMES = 3
+WARMUP_SHAPE = (360, 480, 3)  # what clients send at full quality
+
+
+def warmup_jpeg(path=None, shape=WARMUP_SHAPE):
+    """JPEG bytes to warm up with: the file at `path`, or a synthetic frame."""
+    if path:
+        with open(path, "rb") as f:
+            return f.read()
+    # A gradient with noise, so the JPEG has real entropy-coded content to decode
+    h, w = shape[:2]
+    rng = np.random.default_rng(0)
+    img = np.linspace(0, 255, w, dtype=np.float32)[None, :, None] * np.ones(shape, dtype=np.float32)
+    img += rng.normal(0, 20, shape)
+    ok, jpeg = cv.imencode(".jpg", np.clip(img, 0, 255).astype(np.uint8), [cv.IMWRITE_JPEG_QUALITY, 60])
+    if not ok:
+        raise RuntimeError("Could not encode the warm-up frame")
+    return jpeg.tobytes()
+
+
+def warm_up(pose, decoder, jpeg, frames=WARMUP_FRAMES):
+    """Decodes `jpeg` and runs it through `pose` `frames` times, then resets its tracking."""
+    for _ in range(frames):
+        img, _ = decoder.decode(jpeg)
+        pose.process(img)
+    pose.reset()
@@ -3,6 +3,7 @@ import 'package:camera/camera.dart';
 import 'dart:async';
 import 'dart:convert';
 import 'dart:io';
+import 'dart:typed_data';
 import 'package:web_socket_channel/web_socket_channel.dart';
 import 'package:web_socket_channel/io.dart';
 import 'package:flutter/foundation.dart';
@@ -20,9 +21,28 @@ import 'package:flutter/services.dart'; // <--- ADD THIS LINE
 // BACKGROUND ISOLATE FUNCTIONS (Top Level)
 // ============================================================================
 
+/// Binary frame header (little-endian), followed by the raw JPEG bytes:
+/// magic "GBF1" | width (u16) | height (u16) | seq (u32) | timestamp ms (u64)
+const int _frameHeaderSize = 20;
+
+Uint8List _encodeBinaryFrame(List<int> jpeg, int width, int height, int seq, int timestampMs) {
+  final Uint8List bytes = Uint8List(_frameHeaderSize + jpeg.length);
+  final ByteData header = ByteData.view(bytes.buffer, 0, _frameHeaderSize);
+  bytes.setRange(0, 4, ascii.encode('GBF1'));
+  header.setUint16(4, width, Endian.little);
+  header.setUint16(6, height, Endian.little);
+  header.setUint32(8, seq, Endian.little);
+  header.setUint64(12, timestampMs, Endian.little);
+  bytes.setRange(_frameHeaderSize, bytes.length, jpeg);
+  return bytes;
+}
+
 /// Processes the camera frame for the AI Backend
-/// Resizes to 480px width to ensure speed and correct aspect ratio
-String _processFrameOnIsolate(Map<String, dynamic> params) {
+/// Resizes to params['maxWidth'] (480px unless the server asks for less)
+/// to ensure speed and correct aspect ratio
+/// Returns a binary frame (Uint8List) when params['binary'] is set,
+/// otherwise the legacy base64 JSON string. Returns null on failure.
+Object? _processFrameOnIsolate(Map<String, dynamic> params) {
   try {
     final int width = params['width'];
     final int height = params['height'];
@@ -65,16 +85,21 @@ String _processFrameOnIsolate(Map<String, dynamic> params) {
       image = img.Image.fromBytes(width: width, height: height, bytes: plane.buffer, order: img.ChannelOrder.bgra);
     }
 
-    if (image == null) return "";
+    if (image == null) return null;
 
     // 2. CRITICAL: Resize for AI (MediaPipe is faster with small images)
-    final img.Image smallImage = img.copyResize(image, width: 480);
+    final img.Image smallImage = img.copyResize(image, width: params['maxWidth'] ?? 480);
 
     // 3. Encode to JPEG with reduced quality for speed
-    final List<int> jpeg = img.encodeJpg(smallImage, quality: 60);
-    final String base64Image = base64Encode(jpeg);
+    final List<int> jpeg = img.encodeJpg(smallImage, quality: params['jpegQuality'] ?? 60);
 
-    // 4. Send the JSON
+    // 4a. Binary protocol: header + raw JPEG, no base64 overhead
+    if (params['binary'] == true) {
+      return _encodeBinaryFrame(jpeg, smallImage.width, smallImage.height, params['seq'], params['timestampMs']);
+    }
+
+    // 4b. Legacy: send the JSON
+    final String base64Image = base64Encode(jpeg);
     final Map<String, dynamic> frameData = {
       'frame': base64Image,
       'width': smallImage.width, // Send new dimensions
@@ -83,7 +108,7 @@ String _processFrameOnIsolate(Map<String, dynamic> params) {
 
     return jsonEncode(frameData);
   } catch (e) {
-    return "";
+    return null;
   }
 }
 
@@ -360,6 +385,18 @@ class _ExerciseWorkoutScreenState extends State<ExerciseWorkoutScreen> {
   Timer? _workoutTimer;
   int _timeInSeconds = 0;
   bool _isProcessingFrame = false;
+  bool _binaryProtocol = false; // Switched on once the server acks it
+  int _frameSeq = 0;
+  int _frameIntervalMs = 50; // Raised when the server reports backpressure
+  DateTime _lastBackpressure = DateTime.fromMillisecondsSinceEpoch(0);
+  int _maxWidth = 480; // Lowered by the server's quality controller under load
+  int _jpegQuality = 60;
+  // Delta feedback: the server only sends fields that changed, merged in here
+  final Map<String, dynamic> _feedbackFields = {};
+  String? _detectedExercise; // AUTO sessions: what the server recognised
+  String? _sessionId; // Assigned by the server; sent again to resume after a drop
+  Timer? _reconnectTimer;
+  int _reconnectAttempts = 0;
 
   Timer? _errorTimer;
   String _potentialError = "";
@@ -390,6 +427,7 @@ class _ExerciseWorkoutScreenState extends State<ExerciseWorkoutScreen> {
     _cameraController?.stopImageStream();
     _cameraController?.dispose();
     _channel?.sink.close();
+    _reconnectTimer?.cancel();
     _workoutTimer?.cancel();
     _errorTimer?.cancel();
     flutterTts.stop();
@@ -466,14 +504,25 @@ class _ExerciseWorkoutScreenState extends State<ExerciseWorkoutScreen> {
           'bytes': p.bytes,
           'bytesPerRow': p.bytesPerRow,
         }).toList(),
+        'binary': _binaryProtocol,
+        'maxWidth': _maxWidth,
+        'jpegQuality': _jpegQuality,
+        'seq': _frameSeq++ & 0xFFFFFFFF,
+        'timestampMs': DateTime.now().millisecondsSinceEpoch,
       };
 
-      compute(_processFrameOnIsolate, imageParams).then((jsonString) {
-        if (mounted && _channel != null && jsonString.isNotEmpty) {
-          _channel!.sink.add(jsonString);
+      compute(_processFrameOnIsolate, imageParams).then((frame) {
+        if (mounted && _channel != null && frame != null) {
+          _channel!.sink.add(frame);
+        }
+        // Recover the send rate once the server stops complaining
+        if (_frameIntervalMs > 50 &&
+            DateTime.now().difference(_lastBackpressure).inSeconds >= 5) {
+          _frameIntervalMs = (_frameIntervalMs * 0.8).round().clamp(50, 1000);
+          _lastBackpressure = DateTime.now();
         }
         // Small delay to prevent flooding the network
-        Future.delayed(const Duration(milliseconds: 50), () {
+        Future.delayed(Duration(milliseconds: _frameIntervalMs), () {
           _isProcessingFrame = false;
         });
       }).catchError((e) {
@@ -488,17 +537,70 @@ class _ExerciseWorkoutScreenState extends State<ExerciseWorkoutScreen> {
       final uri = Uri.parse('ws://${_backendIpAddress.trim()}:$_backendPort');
       _channel = IOWebSocketChannel.connect(uri);
       debugPrint("Attempting to connect to WebSocket: $uri");
-      _channel!.sink.add(jsonEncode({'exercise': widget.exerciseName}));
+      _binaryProtocol = false; // Until this connection acks it
+      _maxWidth = 480; // A new connection starts at full quality
+      _jpegQuality = 60;
+      _feedbackFields.clear(); // Its first feedback message is a full keyframe
+      _channel!.sink.add(jsonEncode({
+        'exercise': widget.exerciseName,
+        'protocol': 'binary',
+        'session_id': _sessionId,
+        'quality': true, // We follow the server's resolution / JPEG quality hints
+        'feedback': 'delta', // Only changed fields, nothing on steady frames
+      }));
 
       _channel!.stream.listen(
             (message) {
           if (mounted) {
             try {
               final Map<String, dynamic> data = jsonDecode(message);
+
+              // 0. Protocol ack: server understands binary frames
+              if (data.containsKey('protocol')) {
+                _binaryProtocol = data['protocol'] == 'binary';
+                return;
+              }
+
+              // 0a. Feedback mode ack (older servers never send one and keep sending full feedback)
+              if (data.containsKey('feedback')) {
+                return;
+              }
+
+              // 0b. Session id: keep it so a reconnect resumes reps / timers
+              if (data.containsKey('session')) {
+                _sessionId = data['session'];
+                _reconnectAttempts = 0;
+                if (data['resumed'] == true && _stableError.isNotEmpty) {
+                  setState(() {
+                    _stableError = '';
+                  });
+                }
+                return;
+              }
+
+              // 0c. Quality hint: server is overloaded (or recovered), resize / re-encode accordingly
+              if (data.containsKey('quality')) {
+                _maxWidth = data['quality']['max_width'] ?? 480;
+                _jpegQuality = data['quality']['jpeg_quality'] ?? 60;
+                return;
+              }
+
+              // 0d. Backpressure hint: server is dropping frames, send slower
+              if (data.containsKey('backpressure')) {
+                final num maxFps = data['backpressure']['max_fps'] ?? 0;
+                if (maxFps > 0) {
+                  _frameIntervalMs = (1000 / maxFps).round().clamp(50, 1000);
+                }
+                _lastBackpressure = DateTime.now();
+                return;
+              }
               
+              // 0e. Feedback: full keyframes or just the changed fields, merged
+              final Map<String, dynamic> fields = _feedbackFields..addAll(data);
+
               // 1. TRANSLATION LOGIC HERE
-              String rawError = data['error'] ?? '';
-              String rawAdjustment = data['adjustment'] ?? '';
+              String rawError = fields['error'] ?? '';
+              String rawAdjustment = fields['adjustment'] ?? '';
 
               String displayError = AppTranslations.translate(
                 rawError,
@@ -511,11 +613,11 @@ class _ExerciseWorkoutScreenState extends State<ExerciseWorkoutScreen> {
 
               // 2. Create Feedback object with TRANSLATED text
               final WorkoutFeedback newFeedback = WorkoutFeedback(
-                reps: data['reps'] ?? 0,
+                reps: fields['reps'] ?? 0,
                 time: _currentFeedback.time, // Keep local time
                 error: displayError,
                 adjustment: displayAdjustment,
-                perfectRep: data['perfect_rep'] ?? false,
+                perfectRep: fields['perfect_rep'] ?? false,
               );
 
               // 3. Error Logging & Screenshots
@@ -538,6 +640,7 @@ class _ExerciseWorkoutScreenState extends State<ExerciseWorkoutScreen> {
 
               setState(() {
                 _currentFeedback = newFeedback.copyWith(error: _stableError);
+                _detectedExercise = fields['exercise'];
               });
 
               // 4. Stabilization & TTS
@@ -577,6 +680,7 @@ class _ExerciseWorkoutScreenState extends State<ExerciseWorkoutScreen> {
             _stableError = 'CONNECTION LOST';
           });
           _speak("Connection Lost");
+          _scheduleReconnect();
         },
         onError: (error) {
           debugPrint('WebSocket error: $error');
@@ -598,6 +702,19 @@ class _ExerciseWorkoutScreenState extends State<ExerciseWorkoutScreen> {
     }
   }
 
+  // Reconnect with backoff (2s, 4s, ... 30s); the server resumes the session
+  void _scheduleReconnect() {
+    if (_isWorkoutEnding || !mounted || _sessionId == null) return;
+    _reconnectTimer?.cancel();
+    final int delaySeconds = (2 << _reconnectAttempts).clamp(2, 30);
+    _reconnectAttempts = (_reconnectAttempts + 1).clamp(0, 4);
+    _reconnectTimer = Timer(Duration(seconds: delaySeconds), () {
+      if (_isWorkoutEnding || !mounted) return;
+      _channel = null;
+      _connectWebSocket();
+    });
+  }
+
   void _captureErrorScreenshot(String error, String time, CameraImage cameraImage) {
     final imageParams = {
       'width': cameraImage.width,
@@ -694,6 +811,7 @@ class _ExerciseWorkoutScreenState extends State<ExerciseWorkoutScreen> {
     });
 
     await _cameraController?.stopImageStream();
+    _reconnectTimer?.cancel();
     _channel?.sink.close();
     _workoutTimer?.cancel();
     _errorTimer?.cancel();
@@ -795,7 +913,7 @@ class _ExerciseWorkoutScreenState extends State<ExerciseWorkoutScreen> {
           onPressed: () => Navigator.of(context).pop(),
         ),
         title: Text(
-          widget.exerciseName.toUpperCase(),
+          (_detectedExercise ?? widget.exerciseName).toUpperCase(),
           style: const TextStyle(
             color: Colors.white,
             fontSize: 20,
@@ -5,9 +5,9 @@ import  'ProfilePage.dart';
 
 class Exercise {
   final String name;
-  final String imagePath;
+  final String? imagePath; // null: icon placeholder
 
-  Exercise({required this.name, required this.imagePath});
+  Exercise({required this.name, this.imagePath});
 }
 
 // --- Main Menu Screen Widget ---
@@ -26,6 +26,8 @@ class _ExerciseMenuScreenState extends State<ExerciseMenuScreen> {
     Exercise(name: 'PLANK', imagePath: 'assets/plank.webp'),
     Exercise(name: 'SQUATS', imagePath: 'assets/squats.jpg'),
     Exercise(name: 'PUSHUPS', imagePath: 'assets/Pushup.webp'),
+    // The server recognises each exercise as you go and keeps separate counts
+    Exercise(name: 'AUTO'),
   ];
 
   String? _selectedExercise; // To track the currently selected exercise
@@ -160,14 +162,14 @@ class _ExerciseMenuScreenState extends State<ExerciseMenuScreen> {
 // --- Reusable Widget for Each Exercise Card ---
 class ExerciseCard extends StatelessWidget {
   final String title;
-  final String imagePath;
+  final String? imagePath;
   final bool isSelected;
   final VoidCallback onTap;
 
   const ExerciseCard({
     super.key,
     required this.title,
-    required this.imagePath,
+    this.imagePath,
     required this.isSelected,
     required this.onTap,
   });
@@ -199,21 +201,28 @@ class ExerciseCard extends StatelessWidget {
           children: [
             ClipRRect(
               borderRadius: BorderRadius.circular(10.0),
-              child: Image.asset(
-                imagePath,
-                width: 100,
-                height: 100,
-                fit: BoxFit.cover,
-                // Fallback in case image fails to load
-                errorBuilder: (context, error, stackTrace) {
-                  return Container(
-                    width: 150,
-                    height: 150,
-                    color: Colors.grey.shade800,
-                    child: const Icon(Icons.image, color: Colors.white54),
-                  );
-                },
-              ),
+              child: imagePath == null
+                  ? Container(
+                      width: 100,
+                      height: 100,
+                      color: Colors.grey.shade800,
+                      child: const Icon(Icons.auto_awesome, color: Colors.white54),
+                    )
+                  : Image.asset(
+                      imagePath!,
+                      width: 100,
+                      height: 100,
+                      fit: BoxFit.cover,
+                      // Fallback in case image fails to load
+                      errorBuilder: (context, error, stackTrace) {
+                        return Container(
+                          width: 150,
+                          height: 150,
+                          color: Colors.grey.shade800,
+                          child: const Icon(Icons.image, color: Colors.white54),
+                        );
+                      },
+                    ),
             ),
             const SizedBox(width: 20),
             Expanded(
@@ -58,6 +58,7 @@ class AppTranslations {
       'Good Form!': 'सही फॉर्म!',
       'Not tracking': 'ट्रैकिंग नहीं हो रही',
       'Make sure you are fully in frame': 'फ्रेम में पूरी तरह आएं',
+      'Detecting exercise...': 'व्यायाम पहचाना जा रहा है...',
       'Not tracking. Are you in frame?': 'ट्रैकिंग नहीं हो रही। क्या आप फ्रेम में हैं?'
     },
     'kn': {
@@ -100,7 +101,8 @@ class AppTranslations {
       'Good Form!': 'ಉತ್ತಮ ಭಂಗಿ!',
       'Not tracking': 'ಕಾಣಿಸುತ್ತಿಲ್ಲ',
       'Make sure you are fully in frame': 'ಕ್ಯಾಮರಾ ಫ್ರೇಮ್‌ನಲ್ಲಿ ಬನ್ನಿ',
-      'Not tracking. Are you in frame?': 'ಕಾಣಿಸುತ್ತಿಲ್ಲ. ನೀವು ಫ್ರೇಮ್‌ನಲ್ಲಿ ಇದ್ದೀರಾ?'
+      'Not tracking. Are you in frame?': 'ಕಾಣಿಸುತ್ತಿಲ್ಲ. ನೀವು ಫ್ರೇಮ್‌ನಲ್ಲಿ ಇದ್ದೀರಾ?',
+      'Detecting exercise...': 'ವ್ಯಾಯಾಮವನ್ನು ಗುರುತಿಸಲಾಗುತ್ತಿದೆ...'
     }
   };
 }
\ No newline at end of file